@@ -0,0 +1,579 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 고속도로 사망교통사고 분석 대시보드
+#
+#   gunicorn app:server
+#
+# create_app() builds the one dashboard app.  Importing this module stays
+# cheap: pandas, plotly.express and pydeck are only imported, and the cube,
+# figures and deck HTML only built, when first needed.  `python startup.py`
+# reports the cold-start numbers.  Under gunicorn the master prepares the
+# cube and maps once and the workers share them (shared.py).
+
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache, partial
+
+import dash
+import dash_auth
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+
+import build_cache
+import metrics
+import shared
+import year_maps
+from map_routes import DensityRoutes, LiveRoutes, MapRoutes, TileRoutes
+from startup import stage
+
+# Set up username and password
+VALID_USERNAME_PASSWORD_PAIRS = {'urban': '1012'}
+
+BLACK_SPOT_FILE = 'black spot {year}e,s.csv'
+
+
+def _black_spot_years(data_dir):
+    # datasets.black_spot_years(), listed without importing datasets (and
+    # pandas) with the app
+    pattern = re.compile('^' + re.escape(BLACK_SPOT_FILE).replace(r'\{year\}', r'(\d{4})') + '$')
+    matches = (pattern.match(name) for name in os.listdir(data_dir))
+    return tuple(sorted(int(match.group(1)) for match in matches if match))
+
+
+# One black-spot map per year file in the data directory; the change map
+# compares the first and the last
+BLACK_SPOT_YEARS = _black_spot_years(shared.DATA_DIR)
+CHANGE_YEARS = (BLACK_SPOT_YEARS[0], BLACK_SPOT_YEARS[-1]) if len(BLACK_SPOT_YEARS) > 1 else None
+
+# chart-dropdown 선택지 (analysis type -> options, default value)
+CHART_DROPDOWN_CHOICES = {
+    'black-spot': {
+        'options': [
+            *({'label': f'{year % 100:02d}년 블랙스팟', 'value': f'black-spot-{year}'} for year in BLACK_SPOT_YEARS),
+            *([{'label': '{:02d}→{:02d}년 블랙스팟 변화'.format(*(year % 100 for year in CHANGE_YEARS)),
+                'value': 'black-spot-change'}] if CHANGE_YEARS else []),
+            {'label': '실시간 VDS', 'value': 'live-vds'},
+            {'label': '사망지점 분석', 'value': 'death-analysis'},
+            {'label': '사망사고 밀도', 'value': 'death-density'},
+        ],
+        'value': [f'black-spot-{year}' for year in BLACK_SPOT_YEARS[:1]],
+    },
+    'death-analysis': {
+        'options': [
+            {'label': '파이차트', 'value': 'pie-chart'},
+            {'label': '시간대별 바차트', 'value': 'hourly-bar-chart'},
+            {'label': '요일별 바차트', 'value': 'weekday-bar-chart'},
+            {'label': '월별 바차트', 'value': 'monthly-bar-chart'},
+            {'label': '요일x시간대 히트맵', 'value': 'weekday-hour-heatmap'},
+        ],
+        'value': ['pie-chart'],
+    },
+}
+
+# 블랙스팟 지도: chart-dropdown value -> (Iframe id, height)
+MAP_IFRAMES = {
+    **{f'black-spot-{year}': (f'iframe-black-spot-{year}', '80vh') for year in BLACK_SPOT_YEARS},
+    **({'black-spot-change': ('iframe-black-spot-change', '80vh')} if CHANGE_YEARS else {}),
+    'live-vds': ('iframe-live-vds', '60vh'),
+    'death-analysis': ('deck-iframe', '50vh'),
+    'death-density': ('iframe-death-density', '80vh'),
+}
+
+# 실시간 VDS 차트 갱신 주기
+LIVE_INTERVAL_MS = 5000
+
+# 사망데이터 분석 차트: chart-dropdown value -> (Graph id, style when shown)
+DEATH_CHARTS = {
+    'pie-chart': ('seasonal-death-pie-chart', {'width': '33%', 'display': 'inline-block'}),
+    'monthly-bar-chart': ('monthly-death-bar-chart', {'width': '34%', 'display': 'inline-block'}),
+    'weekday-bar-chart': ('weekday-death-bar-chart', {'width': '33%', 'display': 'inline-block'}),
+    'hourly-bar-chart': ('hourly-death-bar-chart', {'width': '100%', 'float': 'left'}),
+    'weekday-hour-heatmap': ('weekday-hour-death-heatmap', {'width': '100%', 'float': 'left'}),
+}
+
+# 사망데이터 분석 필터: column -> (dropdown id, placeholder).  Cube dimensions
+# slice the cube; the other columns go through the bitmap index
+# (bitmap_index.py).  Values are OR-ed within a column, columns AND-ed.
+FILTER_DROPDOWNS = {
+    'year': ('filter-year', '연도'),
+    '발생지시도': ('filter-region', '발생지시도'),
+    '주야': ('filter-day-night', '주야'),
+    '계절': ('filter-season', '계절'),
+    '사고유형_대분류': ('filter-accident-type', '사고유형'),
+    '요일': ('filter-weekday', '요일'),
+    '사고유형_중분류': ('filter-accident-subtype', '사고유형 중분류'),
+    '법규위반': ('filter-violation', '법규위반'),
+    '도로형태': ('filter-road', '도로형태'),
+    '당사자종별_1당_대분류': ('filter-party-1', '1당 종별'),
+    '당사자종별_2당_대분류': ('filter-party-2', '2당 종별'),
+}
+
+# 필터를 따르는 지도 (chart-dropdown value = map name)
+FILTERED_MAPS = ('death-analysis', 'death-density')
+
+# Browser side of bitmap_index.filter_pairs / encode_filters: the key the
+# figure requests are cached by, and the token filtered map URLs carry
+FILTER_KEY_JS = """
+            function filterKey(dimensions, filterValues) {
+                const filters = {};
+                dimensions.forEach((dim, i) => {
+                    if (filterValues[i] && filterValues[i].length) {
+                        filters[dim] = filterValues[i].slice().sort();
+                    }
+                });
+                return [filters, JSON.stringify(Object.keys(filters).sort().map(dim => [dim, filters[dim]]))];
+            }
+            function filterToken(key) {
+                if (key === '[]') {
+                    return '';
+                }
+                const bytes = new TextEncoder().encode(key);
+                const binary = Array.from(bytes, byte => String.fromCharCode(byte)).join('');
+                return btoa(binary).replace(/\\+/g, '-').replace(/\\//g, '_').replace(/=+$/, '');
+            }
+"""
+
+
+@lru_cache(maxsize=None)
+def death_analysis():
+    # (cube, figure cache) over final.csv, built on first use
+    with stage('death-analysis cube'):
+        from charts import CHART_BUILDERS
+        from datasets import FINAL_CSV, data_digest, load_final
+        from death_cube import build_cube
+        from figure_cache import FIGURE_CACHE_DIR, FigureCache, figure_version
+
+        if shared.ENABLED:
+            # Memory-mapped from SHARED_DIR, one copy for all workers
+            cube = shared.shared_cube('death-analysis', data_digest(FINAL_CSV), lambda: build_cube(load_final()))
+        else:
+            cube = build_cube(load_final())
+        figures = FigureCache(CHART_BUILDERS, cube, version=figure_version(data_digest(FINAL_CSV)),
+                              disk_dir=FIGURE_CACHE_DIR, resolve=_chart_source)
+    return cube, figures
+
+
+@lru_cache(maxsize=None)
+def cross_filter():
+    # (bitmap index, cube rows) over final.csv, for filters on columns the
+    # cube does not have.  Built on first use, or in the gunicorn master
+    # (shared.prepare) and inherited by the workers.
+    with stage('cross-filter index'):
+        from bitmap_index import build_index
+        from datasets import load_final
+        from death_cube import cube_rows
+
+        df = load_final()
+        return build_index(df), cube_rows(df)
+
+
+def _filter_mask(token):
+    # Row mask of a filter token (None: every row); ValueError if not a token
+    from bitmap_index import decode_filters
+    index, _ = cross_filter()
+    return index.mask(decode_filters(token))
+
+
+@lru_cache(maxsize=32)
+def _masked_cube(token):
+    # Only the breakdowns the charts read, a few KB per token
+    from charts import CHART_MARGINALS
+    _, rows = cross_filter()
+    return rows.marginals(CHART_MARGINALS, _filter_mask(token))
+
+
+def _chart_source(cube, filters):
+    # Filters on cube dimensions only are a slice of the cube; anything else
+    # is the charts' marginals over the rows the bitmap index selects
+    if not filters or set(filters) <= set(cube.dimensions):
+        return cube, filters
+    from bitmap_index import encode_filters
+    return _masked_cube(encode_filters(filters)), None
+
+
+@lru_cache(maxsize=None)
+def segment_store():
+    # Every black-spot year aligned by VDS_CD, geometry parsed once
+    with stage('segment store'):
+        from segment_store import load_store
+        return load_store(BLACK_SPOT_YEARS)
+
+
+def _render_black_spot(year):
+    # Page + typed-array buffer + tooltip table (deck_binary.py), rendered
+    # and keyed as year_maps.build_years stores them
+    with stage(f'render black-spot-{year}'):
+        from year_maps import render_year
+        return render_year(year)
+
+
+def _render_changed_hotspots():
+    start, end = CHANGE_YEARS
+    with stage('render black-spot-change'):
+        from maps import render_changed_hotspots
+        return render_changed_hotspots(segment_store(), start, end, 'black-spot-change')
+
+
+def _death_tile_index():
+    with stage('death-analysis tile index'):
+        from datasets import load_final
+        from maps import death_tile_index
+        return death_tile_index(load_final())
+
+
+def _render_death_tiles(tile_routes, token=''):
+    # The deck only holds the tile URL; points arrive per viewport tile, of
+    # the rows matching the filter token when there is one
+    with stage('render death-analysis'):
+        from maps import render_death_tiles
+        return render_death_tiles(tile_routes.url_template('death-analysis', token),
+                                  tile_routes.index('death-analysis', token).center)
+
+
+def _death_density_grid():
+    with stage('death-density grid'):
+        from datasets import load_final
+        from maps import death_density_grid
+        return death_density_grid(load_final())
+
+
+def _render_death_density(density_routes, token=''):
+    # The page only holds the raster URL; surfaces are computed per
+    # (bandwidth, weighting, filter token) on request (map_routes.DensityRoutes)
+    with stage('render death-density'):
+        from maps import render_death_density
+        return render_death_density('death-density', density_routes.url('death-density', token),
+                                    density_routes.grid('death-density'))
+
+
+VDS_FEED_DIR = os.path.join(shared.SHARED_DIR, 'vds-feed')
+
+
+def share_vds_feed():
+    # The single ingest process every worker attaches to (shared.prepare)
+    if not shared.ENABLED:
+        return None
+    from vds_stream import start_shared_feed
+    return start_shared_feed(segment_store().codes.tolist(), VDS_FEED_DIR)
+
+
+def _start_vds_feed():
+    # The shared feed when its ingest process runs, otherwise one in the
+    # process that first polls it (ANALYSIS_VDS_FEED, vds_stream.py)
+    from vds_stream import attach_feed, start_feed
+    feed = attach_feed(VDS_FEED_DIR) if shared.ENABLED else None
+    return feed or start_feed(segment_store().codes.tolist())
+
+
+def _render_live_vds(live_routes):
+    with stage('render live-vds'):
+        from maps import render_live_vds
+        return render_live_vds(segment_store(), 'live-vds', live_routes.url('vds'))
+
+
+def _source_version(file_name, variant=''):
+    # Deferred so that datasets (and pandas) are not imported by create_app.
+    # variant separates different renderings of the same file.
+    def version():
+        from datasets import data_digest
+        digest = data_digest(file_name)
+        return hashlib.sha1(f'{variant}:{digest}'.encode()).hexdigest() if variant else digest
+    return version
+
+
+def _map_version(file_names, variant):
+    # Build key of a map (build_cache.py): input files, styling parameters and
+    # library versions.  Deferred like _source_version.
+    return partial(build_cache.map_key, file_names, variant)
+
+
+def register_maps(map_routes, tile_routes, live_routes, density_routes):
+    black_spot_files = tuple(BLACK_SPOT_FILE.format(year=year) for year in BLACK_SPOT_YEARS)
+    for year in BLACK_SPOT_YEARS:
+        map_routes.add_lazy(f'black-spot-{year}', partial(_render_black_spot, year),
+                            version=partial(year_maps.map_key, year))
+    if CHANGE_YEARS:
+        map_routes.add_lazy('black-spot-change', _render_changed_hotspots,
+                            version=_map_version(black_spot_files, 'change'))
+    live_routes.add_lazy('vds', _start_vds_feed)
+    map_routes.add_lazy('live-vds', partial(_render_live_vds, live_routes),
+                        version=_map_version(black_spot_files, 'live'))
+    tile_routes.add_lazy('death-analysis', _death_tile_index, version=_source_version('final.csv'),
+                         select=_filter_mask)
+    map_routes.add_lazy('death-analysis', partial(_render_death_tiles, tile_routes),
+                        version=_map_version(('final.csv',), 'tiles'))
+    map_routes.add_variants('death-analysis', partial(_render_death_tiles, tile_routes))
+    density_routes.add_lazy('death-density', _death_density_grid, version=_map_version(('final.csv',), 'density'),
+                            select=_filter_mask)
+    map_routes.add_lazy('death-density', partial(_render_death_density, density_routes),
+                        version=_map_version(('final.csv',), 'density-page'))
+    map_routes.add_variants('death-density', partial(_render_death_density, density_routes))
+
+
+def build_layout(filter_options, map_iframes, live_figure=None, map_filter_urls=None):
+    return html.Div([
+        html.H1("고속도로 사망교통사고 분석", style={'text-align': 'center'}),  # 제목 추가
+        html.H6("made by. 너 납치된거야 조", style={'text-align': 'center'}),  # 작은 부제목 추가
+        html.Div(
+            children=[
+                # 드롭다운 박스와 차트를 각각 별도의 Div로 감싸서 레이아웃 조정
+                html.Div(
+                    dcc.Dropdown(
+                        id='analysis-type-dropdown',
+                        options=[
+                            {'label': '블랙스팟', 'value': 'black-spot'},
+                            {'label': '사망데이터 분석', 'value': 'death-analysis'},
+                        ],
+                        value='black-spot',  # Default selected value
+                        style={'width': '100%', 'margin': '5px'}
+                    ),
+                    style={'float': 'right', 'width': '30%', 'margin-right': '5px', 'margin-top': '5px'}
+                ),
+                html.Div(
+                    dcc.Dropdown(
+                        id='chart-dropdown',
+                        value=CHART_DROPDOWN_CHOICES['black-spot']['value'],  # Default selected values
+                        multi=True,
+                        style={'width': '100%', 'margin': '2px', 'height': '3px'}
+                    ),
+                    style={'float': 'right', 'width': '30%', 'margin-right': '5px', 'margin-top': '5px'}
+                ),
+            ],
+            style={'width': '100%', 'display': 'flex', 'justify-content': 'space-between'}
+        ),
+        # 사망데이터 분석 필터 (비어 있으면 전체)
+        html.Div(
+            children=[
+                dcc.Dropdown(
+                    id=dropdown_id,
+                    options=filter_options.get(dim, []),
+                    multi=True,
+                    placeholder=placeholder,
+                    style={'flex': '1', 'min-width': '160px', 'margin': '2px'}
+                )
+                for dim, (dropdown_id, placeholder) in FILTER_DROPDOWNS.items()
+            ],
+            id='filter-container',
+            style={'display': 'none'}
+        ),
+        # 블랙스팟 지도 iframe은 브라우저에서 구성
+        html.Div(id='map-container'),
+        # 실시간 VDS: 새로 끝난 5분 구간만 extendData 로 덧붙인다
+        html.Div(
+            children=[
+                dcc.Graph(id='live-vds-chart', figure=live_figure or {}),
+                dcc.Interval(id='live-interval', interval=LIVE_INTERVAL_MS, disabled=True),
+                dcc.Store(id='live-cursor'),
+            ],
+            id='live-container',
+            style={'display': 'none'}
+        ),
+        # 사망데이터 분석 차트: figure만 서버에서 받고 표시 여부는 브라우저에서 결정
+        html.Div(
+            children=[dcc.Graph(id=graph_id, style={'display': 'none'}) for graph_id, _ in DEATH_CHARTS.values()],
+            id='chart-container'
+        ),
+        dcc.Store(id='map-iframes', data=map_iframes),
+        # 필터를 따르는 지도의 URL ('{token}' 자리에 필터 토큰)
+        dcc.Store(id='map-filter-urls', data=map_filter_urls or {}),
+        # 서버에 figure가 필요할 때만 바뀌는 요청, 그리고 차트별로 이미 받은 필터 키
+        dcc.Store(id='figure-request'),
+        dcc.Store(id='figure-keys', data={}),
+    ])
+
+
+def register_callbacks(app):
+    # Define callback to update options of the second dropdown (runs in the browser)
+    app.clientside_callback(
+        """
+        function(selectedAnalysisType) {
+            const choices = %s;
+            const choice = choices[selectedAnalysisType] || {options: [], value: []};
+            return [choice.options, choice.value];
+        }
+        """ % json.dumps(CHART_DROPDOWN_CHOICES),
+        [Output('chart-dropdown', 'options'),
+         Output('chart-dropdown', 'value')],
+        [Input('analysis-type-dropdown', 'value')]
+    )
+
+    # Layout-only part of the chart update: map iframes (filtered maps point
+    # at the page of the current filter token) and which graphs/filters are
+    # visible.  Runs in the browser, no server round trip.
+    app.clientside_callback(
+        """
+        function(analysisType, selectedCharts, ...args) {
+            %s
+            const chartStyles = %s;
+            const dimensions = %s;
+            const [mapIframes, mapFilterUrls] = args.slice(-2);
+            const token = filterToken(filterKey(dimensions, args.slice(0, -2))[1]);
+            const selected = selectedCharts || [];
+            const deathAnalysis = analysisType === 'death-analysis';
+
+            const maps = [];
+            let filteredMap = false;
+            if (analysisType === 'black-spot') {
+                selected.forEach(chart => {
+                    if (chart in (mapIframes || {})) {
+                        const props = Object.assign({}, mapIframes[chart]);
+                        if (token && (mapFilterUrls || {})[chart]) {
+                            props.src = mapFilterUrls[chart].replace('{token}', token);
+                        }
+                        filteredMap = filteredMap || chart in (mapFilterUrls || {});
+                        maps.push({namespace: 'dash_html_components', type: 'Iframe', props: props});
+                    }
+                });
+            }
+            const graphStyles = Object.keys(chartStyles).map(
+                chart => deathAnalysis && selected.includes(chart) ? chartStyles[chart] : {display: 'none'}
+            );
+            const filterStyle = deathAnalysis || filteredMap
+                ? {width: '100%%', display: 'flex', flexWrap: 'wrap'} : {display: 'none'};
+            const live = analysisType === 'black-spot' && selected.includes('live-vds');
+            return [maps, filterStyle, live ? {} : {display: 'none'}, !live].concat(graphStyles);
+        }
+        """ % (FILTER_KEY_JS, json.dumps({chart: style for chart, (_, style) in DEATH_CHARTS.items()}),
+               json.dumps(list(FILTER_DROPDOWNS), ensure_ascii=False)),
+        [Output('map-container', 'children'),
+         Output('filter-container', 'style'),
+         Output('live-container', 'style'),
+         Output('live-interval', 'disabled')] +
+        [Output(graph_id, 'style') for graph_id, _ in DEATH_CHARTS.values()],
+        [Input('analysis-type-dropdown', 'value'),
+         Input('chart-dropdown', 'value')] +
+        [Input(dropdown_id, 'value') for dropdown_id, _ in FILTER_DROPDOWNS.values()],
+        [State('map-iframes', 'data'),
+         State('map-filter-urls', 'data')]
+    )
+
+    # Only asks the server for figures the browser does not have yet for the
+    # current filters.  figure-keys is read as State: update_charts writes it,
+    # so as an Input it would close a cycle between the two callbacks.
+    app.clientside_callback(
+        """
+        function(analysisType, selectedCharts, ...args) {
+            const figureKeys = args[args.length - 1];
+            const filterValues = args.slice(0, -1);
+            if (analysisType !== 'death-analysis') {
+                return window.dash_clientside.no_update;
+            }
+            %s
+            const [filters, key] = filterKey(%s, filterValues);
+            const missing = (selectedCharts || []).filter(chart => (figureKeys || {})[chart] !== key);
+            if (!missing.length) {
+                return window.dash_clientside.no_update;
+            }
+            return {charts: missing, filters: filters, key: key};
+        }
+        """ % (FILTER_KEY_JS, json.dumps(list(FILTER_DROPDOWNS), ensure_ascii=False)),
+        Output('figure-request', 'data'),
+        [Input('analysis-type-dropdown', 'value'),
+         Input('chart-dropdown', 'value')] +
+        [Input(dropdown_id, 'value') for dropdown_id, _ in FILTER_DROPDOWNS.values()],
+        [State('figure-keys', 'data')]
+    )
+
+    # Define callback to update charts: the only one that reaches the server
+    @app.callback(
+        [Output(graph_id, 'figure') for graph_id, _ in DEATH_CHARTS.values()] +
+        [Output('figure-keys', 'data')],
+        [Input('figure-request', 'data')],
+        [State('figure-keys', 'data')],
+        prevent_initial_call=True
+    )
+    def update_charts(request, figure_keys):
+        if not request:
+            raise PreventUpdate
+
+        _, figure_cache = death_analysis()
+        figure_keys = dict(figure_keys or {})
+        figures = []
+        for chart in DEATH_CHARTS:
+            if chart in request['charts']:
+                figures.append(figure_cache.get_figure(chart, request['filters']))
+                figure_keys[chart] = request['key']
+            else:
+                figures.append(dash.no_update)
+        return figures + [figure_keys]
+
+    # Live chart: only buckets completed since the last poll are sent and
+    # appended in the browser; the figure itself is never rebuilt
+    @app.callback(
+        [Output('live-vds-chart', 'extendData'),
+         Output('live-cursor', 'data')],
+        [Input('live-interval', 'n_intervals')],
+        [State('live-cursor', 'data')],
+        prevent_initial_call=True
+    )
+    def update_live_chart(_, cursor):
+        feed = app.server.extensions['live_routes'].feed('vds')
+        if feed is None:
+            raise PreventUpdate
+        points = feed.series_points(-1 if cursor is None else cursor)
+        if not points['x']:
+            raise PreventUpdate
+        from vds_stream import HISTORY_BUCKETS
+        extend = {'x': [points['x'], points['x']], 'y': [points['SPD_AVG'], points['TRFFCVLM']]}
+        return (extend, [0, 1], HISTORY_BUCKETS), points['last']
+
+    return update_charts
+
+
+def create_app():
+    with stage('create_app'):
+        app = dash.Dash(__name__)
+
+        # Add basic authentication
+        dash_auth.BasicAuth(app, VALID_USERNAME_PASSWORD_PAIRS)
+
+        # 지도 HTML은 별도 라우트로 제공하고 callback 응답에는 URL만 담는다
+        # (이미 빌드된 지도는 build_cache 디렉터리에서 바로 제공)
+        map_routes = MapRoutes(store_dir=build_cache.BUILD_DIR).register(app.server)
+        # 사망지점 지도는 뷰포트 타일로 받아온다
+        tile_routes = TileRoutes().register(app.server)
+        # 사망사고 밀도 지도는 서버에서 계산한 래스터 한 장을 받아온다
+        density_routes = DensityRoutes().register(app.server)
+        # 실시간 VDS 지도는 바뀐 구간만 받아온다
+        live_routes = LiveRoutes().register(app.server)
+        register_maps(map_routes, tile_routes, live_routes, density_routes)
+        app.server.extensions['map_routes'] = map_routes
+        app.server.extensions['tile_routes'] = tile_routes
+        app.server.extensions['density_routes'] = density_routes
+        app.server.extensions['live_routes'] = live_routes
+        # Prometheus text at /metrics: callback, stage, cache and payload numbers
+        metrics.register(app.server)
+
+        def serve_layout():
+            index, _ = cross_filter()
+            filter_options = {
+                dim: [{'label': str(label), 'value': label} for label in index.labels[dim]]
+                for dim in FILTER_DROPDOWNS
+            }
+            map_iframes = {
+                chart: {'id': iframe_id, 'src': map_routes.url(chart), 'style': {'width': '100%', 'height': height}}
+                for chart, (iframe_id, height) in MAP_IFRAMES.items()
+            }
+            map_filter_urls = {chart: map_routes.url(chart, '{token}') for chart in FILTERED_MAPS}
+            from charts import build_live_vds_chart
+            return build_layout(filter_options, map_iframes, build_live_vds_chart(), map_filter_urls)
+
+        # The skeleton is enough to validate callbacks; the real layout (which
+        # needs the data) is built on the first page load
+        app.validation_layout = build_layout({}, {})
+        app.layout = serve_layout
+        register_callbacks(app)
+        metrics.instrument_callbacks(app)
+    return app
+
+
+app = create_app()
+server = app.server
+
+# Run the app
+if __name__ == '__main__':
+    app.run_server(debug=True, port=8879)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# pydeck to_html (inline JSON) vs deck_binary (page + typed arrays + lazy
+# tooltip table): bytes over the wire and client-side parse time.  Parse
+# times are measured under node when it is installed: JSON.parse of the
+# pydeck deck JSON vs decodeDeckBinary of the buffer.
+#
+#   python benchmarks/bench_binary_transport.py --rows 100000
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_binary
+from datasets import black_spot_years, load_black_spot, load_final
+from maps import DEATH_MEASURES, black_spot_binary, black_spot_deck, death_scatter_binary, death_scatter_deck
+
+NODE_SCRIPT = deck_binary.DECODE_JS + r'''
+const fs = require('fs');
+const [jsonPath, binPath, repeat] = process.argv.slice(2);
+const text = fs.readFileSync(jsonPath, 'utf8');
+const bytes = fs.readFileSync(binPath);
+const buffer = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);
+function best(func) {
+  let fastest = Infinity;
+  for (let i = 0; i < Number(repeat); i++) {
+    const start = process.hrtime.bigint();
+    func();
+    fastest = Math.min(fastest, Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  return fastest;
+}
+console.log(JSON.stringify({json_ms: best(() => JSON.parse(text)), binary_ms: best(() => decodeDeckBinary(buffer))}));
+'''
+
+
+def resample(df, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+
+
+def sizes(content):
+    body = content.encode('utf-8') if isinstance(content, str) else content
+    return len(body), len(gzip.compress(body, compresslevel=9))
+
+
+def parse_times(deck_json, buffer, repeat):
+    node = shutil.which('node')
+    if node is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, name) for name in ('deck.json', 'deck.bin', 'bench.js')]
+        for path, content in zip(paths, (deck_json.encode('utf-8'), buffer, NODE_SCRIPT.encode('utf-8'))):
+            with open(path, 'wb') as file:
+                file.write(content)
+        result = subprocess.run([node, paths[2], paths[0], paths[1], str(repeat)],
+                                capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def compare(label, deck, artifacts, repeat):
+    start = time.perf_counter()
+    html = deck.to_html(as_string=True)
+    html_seconds = time.perf_counter() - start
+    raw, zipped = sizes(html)
+    print(f'{label}')
+    print(f'  to_html            {raw / 1e6:>9.2f} MB  gzip {zipped / 1e6:>7.2f} MB  {html_seconds:>7.3f} s')
+    page = {extension: sizes(content) for extension, content in artifacts.items()}
+    first = sum(page[extension][1] for extension in ('html', 'bin'))
+    print(f'  binary html + bin  {sum(page[e][0] for e in ("html", "bin")) / 1e6:>9.2f} MB  '
+          f'gzip {first / 1e6:>7.2f} MB  (first paint)')
+    print(f'  + tooltip json     {page["json"][0] / 1e6:>9.2f} MB  gzip {page["json"][1] / 1e6:>7.2f} MB  (first hover)')
+    times = parse_times(deck.to_json(), artifacts['bin'], repeat)
+    if times:
+        print(f'  parse              JSON.parse {times["json_ms"]:>8.1f} ms  decodeDeckBinary {times["binary_ms"]:>8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000, help='accidents for the scatter map')
+    parser.add_argument('--segments', type=int, help='resample the black-spot segments to this many')
+    parser.add_argument('--encoding', default='float32', choices=deck_binary.COORDINATE_ENCODINGS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    year = black_spot_years()[-1]
+    segments = load_black_spot(year)
+    if args.segments:
+        segments = resample(segments, args.segments)
+    compare(f'black-spot {year} ({len(segments):,} segments)', black_spot_deck(segments),
+            black_spot_binary(segments, 'black-spot', args.encoding), args.repeat)
+
+    accidents = resample(load_final()[list(DEATH_MEASURES) + ['x좌표값', 'y좌표값']], args.rows)
+    compare(f'사망지점 ({len(accidents):,} points)', death_scatter_deck(accidents),
+            death_scatter_binary(accidents, 'death-analysis', args.encoding), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Cross-filter over the categorical columns: pandas isin() masks vs packed
+# bitmaps (bitmap_index.py), plus the masked marginals the charts are built
+# from
+#
+#   python benchmarks/bench_cross_filter.py --rows 2000000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitmap_index import build_index
+from charts import CHART_MARGINALS
+from datasets import load_final
+from death_cube import cube_rows
+from time_index import row_keys
+
+# Multi-column filters as the dashboard sends them: OR within a column
+FILTERS = (
+    {'주야': ['야간']},
+    {'요일': ['토요일', '일요일'], '발생지시도': ['경기', '경북']},
+    {'법규위반': ['과속', '안전운전 의무 불이행'], '도로형태': ['교량위', '터널안'], '계절': ['겨울']},
+    {'당사자종별_1당_대분류': ['화물차'], '당사자종별_2당_대분류': ['승용차', '화물차'],
+     '사고유형_중분류': ['추돌'], '주야': ['주간'], 'year': [2022]},
+)
+
+
+def make_accidents(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    final = load_final()
+    return final.iloc[rng.integers(0, len(final), rows)].reset_index(drop=True)
+
+
+def pandas_mask(df, years, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in filters.items():
+        if column == 'year':
+            mask &= np.isin(years, values)
+        else:
+            mask &= df[column].isin(values).to_numpy()
+    return mask
+
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_accidents(args.rows)
+    index, index_seconds = best_of(1, build_index, df)
+    rows, rows_seconds = best_of(1, cube_rows, df)
+    years = row_keys(df['발생년월일시'])['year']
+
+    print(f'rows              {args.rows:>12,}')
+    print(f'bitmap build      {index_seconds:>12.3f} s  {index.nbytes / 1e6:>8.1f} MB')
+    print(f'cube rows build   {rows_seconds:>12.3f} s')
+    print(f"\n{'columns':>8}{'matches':>12}{'pandas ms':>12}{'mask ms':>10}{'count ms':>10}{'mask+marg ms':>14}")
+    for filters in FILTERS:
+        expected, pandas_seconds = best_of(args.repeat, pandas_mask, df, years, filters)
+        mask, mask_seconds = best_of(args.repeat, index.mask, filters)
+        count, count_seconds = best_of(args.repeat, index.count, filters)
+        _, cube_seconds = best_of(args.repeat, lambda: rows.marginals(CHART_MARGINALS, index.mask(filters)))
+        assert np.array_equal(mask, expected) and count == int(expected.sum())
+        print(f'{len(filters):>8}{count:>12,}{pandas_seconds * 1e3:>12.1f}{mask_seconds * 1e3:>10.1f}'
+              f'{count_seconds * 1e3:>10.1f}{cube_seconds * 1e3:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Kernel density surface (density.py): FFT convolution over linearly binned
+# points vs summing every point's Gaussian at every cell directly.  The FFT
+# surface is timed for growing point counts; the direct sum, which costs
+# points x cells, only at the smallest one, and the two are compared there.
+#
+#   python benchmarks/bench_density.py --rows 10000 100000 1000000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import load_final
+from density import BANDWIDTHS, WEIGHTINGS, DensityGrid
+
+
+def make_accidents(rows, seed=0):
+    # final.csv resampled with ~1 km of jitter
+    rng = np.random.default_rng(seed)
+    final = load_final()
+    df = final.iloc[rng.integers(0, len(final), rows)].reset_index(drop=True)
+    df['x좌표값'] = df['x좌표값'].astype(np.float64) + rng.normal(0, 0.01, rows)
+    df['y좌표값'] = df['y좌표값'].astype(np.float64) + rng.normal(0, 0.01, rows)
+    return df
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def direct_surface(grid, bandwidth, weighting, chunk=256):
+    # Every point's Gaussian evaluated at every cell centre
+    height, width = grid.shape(bandwidth)
+    x0, y0, x1, y1 = grid.extent
+    cx = (x0 + (np.arange(width) + 0.5) / width * (x1 - x0)) * grid.scale
+    cy = (y0 + (np.arange(height) + 0.5) / height * (y1 - y0)) * grid.scale
+    px, py, weights = grid.x * grid.scale, grid.y * grid.scale, grid.weights[weighting]
+    surface = np.zeros((height, width))
+    for start in range(0, len(px), chunk):
+        part = slice(start, start + chunk)
+        gx = np.exp(-0.5 * ((cx[None, :] - px[part, None]) / bandwidth) ** 2)
+        gy = np.exp(-0.5 * ((cy[None, :] - py[part, None]) / bandwidth) ** 2) * weights[part, None]
+        surface += gy.T @ gx
+    return surface / (2 * np.pi * (bandwidth / 1000) ** 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--bandwidth', type=int, default=2000, choices=BANDWIDTHS)
+    parser.add_argument('--weighting', default='사상자수', choices=WEIGHTINGS)
+    args = parser.parse_args()
+
+    print(f'{"rows":>10}{"grid":>12}{"bin+FFT s":>11}{"raster s":>10}{"PNG KB":>8}{"direct s":>10}{"max err":>9}')
+    for rows in args.rows:
+        df = make_accidents(rows)
+        grid = DensityGrid(df['x좌표값'], df['y좌표값'], {name: df[name].to_numpy() for name in WEIGHTINGS})
+        grid.surface(args.bandwidth, args.weighting)  # kernel spectrum, cached per grid
+        surface, fft_seconds = timed(grid.surface, args.bandwidth, args.weighting)
+        (png, _), raster_seconds = timed(grid.raster, args.bandwidth, args.weighting)
+        height, width = surface.shape
+        line = (f'{rows:>10,}{f"{height}x{width}":>12}{fft_seconds:>11.3f}{raster_seconds:>10.3f}'
+                f'{len(png) / 1e3:>8.1f}')
+        if rows == min(args.rows):
+            exact, direct_seconds = timed(direct_surface, grid, args.bandwidth, args.weighting)
+            # Relative to the peak: binning and the kernel cut-off are the error
+            line += f'{direct_seconds:>10.2f}{np.abs(surface - exact).max() / exact.max():>9.2%}'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Brute-force point-to-segment join vs segment_match.SegmentIndex
+#
+#   python benchmarks/bench_segment_match.py --points 1000000 [--workers 4]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segment_match import SegmentIndex, load_segments, match_points
+from wkt_lines import parse_linestrings
+
+
+def make_points(lines, points, seed=0):
+    # Accidents scattered around the segment vertices (~200 m)
+    rng = np.random.default_rng(seed)
+    vertex = rng.integers(0, len(lines.coords), points)
+    lon = lines.coords[vertex, 0] + rng.normal(0, 0.002, points)
+    lat = lines.coords[vertex, 1] + rng.normal(0, 0.002, points)
+    return lon, lat
+
+
+def brute_force(index, lon, lat):
+    # Every point against every piece
+    points = index.project(lon, lat)
+    pieces = np.arange(len(index.a))
+    segment = np.empty(len(points), dtype=np.int64)
+    for position, point in enumerate(points):
+        distances = index._distances(np.broadcast_to(point, (len(pieces), 2)), pieces)
+        segment[position] = index.piece_line[np.argmin(distances)]
+    return segment
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--brute-sample', type=int, default=2_000,
+                        help='points timed with brute force (extrapolated)')
+    args = parser.parse_args()
+
+    lines = parse_linestrings(load_segments()['geometry'])
+    lon, lat = make_points(lines, args.points)
+    index, build_seconds = timed(SegmentIndex, lines)
+    (segment, _), index_seconds = timed(match_points, index, lon, lat, workers=args.workers)
+
+    sample = min(args.brute_sample, args.points)
+    expected, brute_seconds = timed(brute_force, index, lon[:sample], lat[:sample])
+    assert np.array_equal(expected, segment[:sample])
+    brute_seconds *= args.points / sample
+
+    print(f'segments      {len(lines):>12,}')
+    print(f'points        {args.points:>12,}')
+    print(f'index build   {build_seconds:>12.3f} s')
+    print(f'grid index    {index_seconds:>12.3f} s  ({args.workers} workers)')
+    print(f'brute force   {brute_seconds:>12.3f} s  (from {sample:,} points)')
+    print(f'speedup       {brute_seconds / index_seconds:>12.1f} x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# calculate_color / calculate_width (apply) vs styling.style_segments
+#
+#   python benchmarks/bench_styling.py --rows 1000000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from styling import style_segments
+
+
+def make_segments(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    spot = rng.exponential(0.5, rows)
+    spot[rng.random(rows) < 0.6] = 0.0
+    return pd.DataFrame({
+        'black-spot': spot,
+        'Start or End': rng.choice(['E', 'S'], rows),
+    })
+
+
+def style_with_apply(gdf):
+    # Copy of the original notebook helpers
+    max_spot_value = gdf['black-spot'].max()
+    min_spot_value = gdf['black-spot'].min()
+
+    def calculate_color(value):
+        if value == max_spot_value:
+            return [255, 0, 0, 255]
+        elif value == min_spot_value:
+            return [255, 255, 255, 255]
+        else:
+            green_to_red_ratio = (value - min_spot_value) / (max_spot_value - min_spot_value)
+            green_value = int(255 * (1 - green_to_red_ratio))
+            return [255, green_value, 0, 255]
+
+    def calculate_width(row):
+        base_width = 2
+        if 'E' in row['Start or End']:
+            return base_width * 48
+        elif 'S' in row['Start or End']:
+            return base_width * 38
+        else:
+            return base_width
+
+    return gdf['black-spot'].apply(calculate_color), gdf.apply(calculate_width, axis=1)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    gdf = make_segments(args.rows)
+    (old_colors, old_widths), old_seconds = timed(style_with_apply, gdf)
+    (colors, widths), new_seconds = timed(style_segments, gdf['black-spot'], gdf['Start or End'])
+
+    assert np.array_equal(np.array(old_colors.tolist(), dtype=np.uint8), colors)
+    assert np.array_equal(old_widths.to_numpy(), widths)
+
+    print(f'rows          {args.rows:>12,}')
+    print(f'apply         {old_seconds:>12.3f} s')
+    print(f'vectorized    {new_seconds:>12.3f} s')
+    print(f'speedup       {old_seconds / new_seconds:>12.1f} x')
+
+
+if __name__ == '__main__':
+    main()
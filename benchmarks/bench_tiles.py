@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Inline ScatterplotLayer HTML vs viewport tiles for the 사망지점 map
+#
+#   python benchmarks/bench_tiles.py --rows 100000
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import load_final
+from maps import DEATH_MEASURES, death_scatter_deck, death_tile_index
+from tiles import tile_for
+
+
+def make_accidents(rows, seed=0):
+    # final.csv resampled with ~1 km of jitter
+    rng = np.random.default_rng(seed)
+    final = load_final()
+    df = final.iloc[rng.integers(0, len(final), rows)].reset_index(drop=True)
+    df['x좌표값'] = df['x좌표값'] + rng.normal(0, 0.01, rows)
+    df['y좌표값'] = df['y좌표값'] + rng.normal(0, 0.01, rows)
+    return df
+
+
+def viewport_tiles(lon, lat, zoom, across=4, down=3):
+    # Tiles of a ~1024 x 768 px view centred on lon/lat
+    _, x, y = tile_for(lon, lat, zoom)
+    return [(zoom, x + dx, y + dy) for dx in range(-(across // 2), across - across // 2)
+            for dy in range(-(down // 2), down - down // 2)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = make_accidents(args.rows)
+    html, html_seconds = timed(lambda: death_scatter_deck(df[list(DEATH_MEASURES) + ['x좌표값', 'y좌표값']])
+                               .to_html(as_string=True))
+    index, index_seconds = timed(death_tile_index, df)
+
+    print(f'rows              {args.rows:>12,}')
+    print(f'inline to_html    {len(html.encode()) / 1e6:>12.2f} MB  {html_seconds:>8.3f} s')
+    print(f'tile index build  {"":>15}{index_seconds:>8.3f} s')
+    # Views centred on the busiest zoom-10 aggregate cell
+    cells = index.levels[10]
+    busiest = int(np.argmax(cells['count']))
+    lon, lat = cells['lon'][busiest], cells['lat'][busiest]
+    for zoom in (6, 8, 10, 12, 14):
+        tiles = viewport_tiles(lon, lat, zoom)
+        start = time.perf_counter()
+        bodies = [json.dumps(index.tile(*tile), ensure_ascii=False, separators=(',', ':')) for tile in tiles]
+        seconds = time.perf_counter() - start
+        features = sum(body.count('"Feature"') for body in bodies)
+        size = sum(len(body.encode()) for body in bodies)
+        print(f'viewport z{zoom:<2}      {size / 1e6:>12.2f} MB  {seconds:>8.3f} s  '
+              f'({len(tiles)} tiles, {features:,} features)')
+
+
+if __name__ == '__main__':
+    main()
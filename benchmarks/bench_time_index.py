@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Time aggregations: pandas .dt / groupby / resample vs time_index.TimeIndex
+#
+#   python benchmarks/bench_time_index.py --rows 10000000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import load_accidents
+from time_index import TimeIndex
+
+
+def make_accidents(rows, seed=0):
+    # 발생년월일시 / 사망자수 / 주야 resampled from the accident data
+    rng = np.random.default_rng(seed)
+    accidents = load_accidents()[['발생년월일시', '사망자수', '주야']]
+    return accidents.iloc[rng.integers(0, len(accidents), rows)].reset_index(drop=True)
+
+
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_accidents(args.rows)
+    dt, deaths = df['발생년월일시'], df['사망자수']
+    night = (df['주야'] == '야간').to_numpy()
+
+    start = time.perf_counter()
+    index = TimeIndex(dt, {'사망자수': deaths})
+    build_seconds = time.perf_counter() - start
+
+    series = pd.Series(deaths.to_numpy(), index=pd.DatetimeIndex(dt))
+    queries = {
+        'hourly': (lambda: series.resample('H').sum(), lambda: index.series('사망자수', 'hour')),
+        'daily': (lambda: series.resample('D').sum(), lambda: index.series('사망자수', 'day')),
+        'weekly': (lambda: series.resample('W-MON', label='left', closed='left').sum(),
+                   lambda: index.series('사망자수', 'week')),
+        'monthly': (lambda: series.resample('MS').sum(), lambda: index.series('사망자수', 'month')),
+        'by hour of day': (lambda: deaths.groupby(dt.dt.hour).sum(), lambda: index.profile('사망자수', 'hour')),
+        'weekday x hour': (lambda: deaths.groupby([dt.dt.weekday, dt.dt.hour]).sum(),
+                           lambda: index.heatmap('사망자수')),
+        'weekday x hour, 야간': (lambda: deaths[night].groupby([dt[night].dt.weekday, dt[night].dt.hour]).sum(),
+                               lambda: index.heatmap('사망자수', mask=night)),
+    }
+
+    print(f'rows                 {args.rows:>12,}')
+    print(f'TimeIndex build      {build_seconds:>12.3f} s  ({index.span:,} hourly bins)')
+    print(f'{"":<21}{"pandas":>13}{"TimeIndex":>13}')
+    for name, (pandas_query, index_query) in queries.items():
+        pandas_seconds = best(pandas_query, args.repeat)
+        index_seconds = best(index_query, max(args.repeat, 20))
+        print(f'{name:<21}{pandas_seconds * 1e3:>10.2f} ms{index_seconds * 1e6:>10.1f} µs')
+
+
+if __name__ == '__main__':
+    main()
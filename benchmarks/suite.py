@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Ingest -> aggregate -> render benchmark suite
+#
+# For every scale, synthetic.py writes the data N x the shipped CSVs and a
+# fresh interpreter pointed at it (ANALYSIS_DATA_DIR) times each stage of
+# the dashboard pipeline: CSV load, datetime parsing, the cube and the
+# seasonal / monthly / weekday / hourly aggregations, segment styling (the
+# old calculate_color / calculate_width), WKT parsing, pydeck to_html, the
+# binary deck page and update_charts through the Dash endpoint.  Results go
+# to a JSON file; --baseline compares against an earlier one and exits 1
+# when a stage got slower than --threshold allows.
+#
+# update_charts is timed from the figure-request payload on: the clientside
+# callback that builds it in the browser (filter keys, the figure-keys
+# state) and Plotly's drawing are not part of the suite.
+#
+#   python benchmarks/suite.py --output bench.json      # 10x, 100x, 1000x
+#   python benchmarks/suite.py --baseline bench.json --output new.json
+
+import argparse
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import CACHE_DIR
+
+BENCH_DIR = os.path.join(CACHE_DIR, 'bench')
+# 1000x (609,000 accidents, 782,000 segments) takes about two minutes on
+# one core, most of it in pydeck's to_html
+DEFAULT_SCALES = (10, 100, 1000)
+# A stage regresses when it is this much slower than the baseline ...
+DEFAULT_THRESHOLD = 1.25
+# ... and by more than this many seconds (timer noise on tiny stages)
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def best(func, repeat):
+    # Fastest of `repeat` runs, and the last result
+    seconds = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds, result
+
+
+def _update_charts_request(client, headers, charts, filters):
+    # What the browser's clientside callback posts for the server-side
+    # update_charts callback, sent directly
+    from app import DEATH_CHARTS
+
+    outputs = [{'id': graph_id, 'property': 'figure'} for graph_id, _ in DEATH_CHARTS.values()]
+    outputs.append({'id': 'figure-keys', 'property': 'data'})
+    key = json.dumps(sorted(filters.items()), ensure_ascii=False)
+    payload = {
+        'output': '..' + '...'.join(f'{output["id"]}.{output["property"]}' for output in outputs) + '..',
+        'outputs': outputs,
+        'inputs': [{'id': 'figure-request', 'property': 'data',
+                    'value': {'charts': charts, 'filters': filters, 'key': key}}],
+        'state': [{'id': 'figure-keys', 'property': 'data', 'value': {}}],
+        'changedPropIds': ['figure-request.data'],
+    }
+    response = client.post('/_dash-update-component', json=payload, headers=headers)
+    assert response.status_code == 200, response.status_code
+    return len(response.data)
+
+
+def run_stages(repeat):
+    # Runs inside the child interpreter; returns [{stage, rows, seconds}]
+    import numpy as np
+    import pandas as pd
+
+    from charts import hourly_death_counts, monthly_death_counts, seasonal_ratios, weekday_death_counts
+    from datasets import DATETIME_FORMAT, FINAL_CSV, _resolve, black_spot_years, load_base_final, load_black_spot
+    from death_cube import build_cube
+    from maps import black_spot_binary, black_spot_deck, death_scatter_deck
+    from styling import style_segments
+    from wkt_lines import parse_linestrings
+
+    results = []
+
+    def record(stage, rows, func, times=repeat):
+        seconds, result = best(func, times)
+        results.append({'stage': stage, 'rows': int(rows), 'seconds': seconds})
+        return result
+
+    path = _resolve(FINAL_CSV)
+    raw = record('csv_load', 0, lambda: pd.read_csv(path, encoding='cp949'))
+    results[-1]['rows'] = len(raw)
+    text = raw['발생년월일시'].astype(str)
+    record('datetime_parse', len(raw), lambda: pd.to_datetime(text, format=DATETIME_FORMAT))
+    load_base_final()  # writes the .npy cache
+    final = record('cached_load', len(raw), load_base_final)
+
+    cube = record('cube_build', len(final), lambda: build_cube(final))
+    record('agg_seasonal', len(final), lambda: seasonal_ratios(cube))
+    record('agg_monthly', len(final), lambda: monthly_death_counts(cube))
+    record('agg_weekday', len(final), lambda: weekday_death_counts(cube))
+    record('agg_hourly', len(final), lambda: hourly_death_counts(cube))
+
+    segments = load_black_spot(black_spot_years()[-1])
+    record('wkt_parse', len(segments), lambda: parse_linestrings(segments['geometry']))
+    record('style_segments', len(segments), lambda: style_segments(segments['black-spot'], segments['Start or End']))
+    record('to_html_black_spot', len(segments), lambda: black_spot_deck(segments).to_html(as_string=True), 1)
+    record('binary_black_spot', len(segments), lambda: black_spot_binary(segments, 'black-spot'), 1)
+    scatter = final[['사상자수', '사망자수', '중상자수', '경상자수', '부상신고자수', 'x좌표값', 'y좌표값']]
+    record('to_html_death_scatter', len(final), lambda: death_scatter_deck(scatter).to_html(as_string=True), 1)
+
+    from app import DEATH_CHARTS, VALID_USERNAME_PASSWORD_PAIRS, create_app
+
+    user, password = next(iter(VALID_USERNAME_PASSWORD_PAIRS.items()))
+    headers = {'Authorization': 'Basic ' + base64.b64encode(f'{user}:{password}'.encode()).decode()}
+    client = create_app().server.test_client()
+    charts = list(DEATH_CHARTS)
+    # First call: cube and figures built; then new filters (figures built
+    # from the cube); then a repeated request (figure cache hits, primed
+    # first so that even --repeat 1 times a hit)
+    record('update_charts_first', len(final), lambda: _update_charts_request(client, headers, charts, {}), 1)
+    regions = iter(np.unique(final['발생지시도'].astype(str)).tolist() * repeat)
+    record('update_charts_new_filter', len(final),
+           lambda: _update_charts_request(client, headers, charts, {'발생지시도': [next(regions)]}))
+    _update_charts_request(client, headers, charts, {'계절': ['봄']})
+    record('update_charts_cached', len(final),
+           lambda: _update_charts_request(client, headers, charts, {'계절': ['봄']}))
+    return results
+
+
+def run_scale(scale, data_dir, repeat):
+    from synthetic import write_dataset
+
+    start = time.perf_counter()
+    write_dataset(scale, data_dir)
+    generated = time.perf_counter() - start
+    env = dict(os.environ,
+               ANALYSIS_DATA_DIR=data_dir,
+               ANALYSIS_CACHE_DIR=os.path.join(data_dir, '.cache'),
+               ANALYSIS_BATCH_DIR=os.path.join(data_dir, 'accident_batches'),
+               ANALYSIS_SHARED_DATA='0',
+               PYTHONWARNINGS='ignore')
+    # A cold cache for every run
+    subprocess.run([sys.executable, '-c', 'import datasets; datasets.clear_cache()'], env=env, check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '_run', '--repeat', str(repeat)],
+                            env=env, capture_output=True, text=True, check=True)
+    stages = json.loads(result.stdout.strip().splitlines()[-1])
+    return generated, [dict(stage, scale=scale) for stage in stages]
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+    import pydeck
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pydeck': pydeck.__version__,
+    }
+
+
+def compare(results, baseline, threshold):
+    # Stages slower than the baseline by both the ratio and the absolute floor
+    previous = {(item['scale'], item['stage']): item['seconds'] for item in baseline['results']}
+    regressions = []
+    for item in results:
+        before = previous.get((item['scale'], item['stage']))
+        if before is None:
+            continue
+        if item['seconds'] > before * threshold and item['seconds'] - before > MIN_REGRESSION_SECONDS:
+            regressions.append(dict(item, baseline=before, ratio=item['seconds'] / before))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ingest -> aggregate -> render benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+    # One scale's stages, run in a fresh interpreter
+    subparsers.add_parser('_run').add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per cheap stage (the best is kept)')
+    parser.add_argument('--data-dir', default=BENCH_DIR, help='where the synthetic data sets are written')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', help='earlier --output file to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == '_run':
+        print(json.dumps(run_stages(args.repeat)))
+        return
+
+    report = {'environment': environment(), 'results': []}
+    for scale in args.scales:
+        generated, stages = run_scale(scale, os.path.join(args.data_dir, f'scale-{scale}'), args.repeat)
+        report['results'].extend(stages)
+        print(f'scale {scale}x  (data generated in {generated:.1f} s)')
+        for item in stages:
+            print(f'  {item["stage"]:<26}{item["rows"]:>12,} rows{item["seconds"] * 1e3:>12.2f} ms')
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f'written       {os.path.abspath(args.output)}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(report['results'], json.load(file), args.threshold)
+        for item in regressions:
+            print(f'REGRESSION    {item["scale"]}x {item["stage"]}: {item["baseline"] * 1e3:.2f} -> '
+                  f'{item["seconds"] * 1e3:.2f} ms ({item["ratio"]:.2f}x)')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
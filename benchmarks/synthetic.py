@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Synthetic data in the shipped schemas, scaled N x
+#
+# Writes a data directory the app can point ANALYSIS_DATA_DIR at:
+#
+#   리얼 찐최종vds사고결합.csv / final.csv   accidents x N (cp949)
+#   black spot {year}e,s.csv               VDS segments x N, per year
+#
+# Segments are copies of the shipped ones, each copy shifted by its own
+# offset; copy k > 0 of segment C is named C-k.  Accidents are resampled
+# rows moved onto a random copy of their segment (VDS_CD, line and
+# coordinates follow the copy) and shifted by whole weeks within their year,
+# with 계절 recomputed, so 요일 / 주야 / 계절 stay consistent with
+# 발생년월일시 and the datetimes do not repeat N times.
+#
+#   python benchmarks/synthetic.py --scale 100 --output /tmp/bench-100
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datasets import (ACCIDENT_CSV, BLACK_SPOT_CSV, DATETIME_FORMAT, FINAL_CSV, black_spot_years,
+                      load_base_accidents, load_black_spot, load_final)
+from wkt_lines import parse_linestrings
+
+VDS_COLUMN = '사고 발생 VDS_CD'
+LINE_COLUMN = '사고발생 line'
+DATETIME_COLUMN = '발생년월일시'
+SEASONS = {12: '겨울', 1: '겨울', 2: '겨울', 3: '봄', 4: '봄', 5: '봄',
+           6: '여름', 7: '여름', 8: '여름', 9: '가을', 10: '가을', 11: '가을'}
+# Copies are spread over about +-0.5 degrees
+COPY_SPREAD = 0.5
+MAX_WEEK_SHIFT = 6
+
+
+def copy_offsets(scale, seed=0):
+    # (scale, 2) lon/lat offset of every copy; copy 0 stays in place
+    offsets = np.random.default_rng(seed).uniform(-COPY_SPREAD, COPY_SPREAD, (scale, 2))
+    offsets[0] = 0
+    return offsets
+
+
+def copy_codes(codes, copies):
+    codes = np.asarray(codes, dtype=object)
+    suffix = np.where(copies > 0, np.char.add('-', copies.astype(str)), '')
+    return np.char.add(codes.astype(str), suffix).astype(object)
+
+
+def format_linestrings(lines):
+    # WKT text of every line, in the shipped files' format
+    flat = lines.coords.tolist()
+    offsets = lines.offsets.tolist()
+    return np.array([
+        'LINESTRING (' + ', '.join(f'{x} {y}' for x, y in flat[start:end]) + ')'
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ], dtype=object)
+
+
+def shifted_lines(lines, rows, copies, offsets):
+    # Lines `rows` of `lines`, each moved by its copy's offset
+    taken = lines.take(rows)
+    taken.coords = taken.coords + np.repeat(offsets[copies], taken.counts, axis=0)
+    return taken
+
+
+def make_segments(segments, scale, offsets):
+    # Every segment once per copy, copies in blocks
+    rows = np.tile(np.arange(len(segments)), scale)
+    copies = np.repeat(np.arange(scale), len(segments))
+    frame = segments.iloc[rows].reset_index(drop=True)
+    frame['VDS_CD'] = copy_codes(frame['VDS_CD'], copies)
+    lines = parse_linestrings(segments['geometry'])
+    frame['geometry'] = format_linestrings(shifted_lines(lines, rows, copies, offsets))
+    return frame
+
+
+def make_accidents(accidents, scale, offsets, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(accidents), len(accidents) * scale)
+    copies = rng.integers(0, scale, len(rows))
+    # Lines and codes are rewritten per copy, so as plain strings
+    frame = accidents.iloc[rows].reset_index(drop=True).astype({LINE_COLUMN: object, VDS_COLUMN: object})
+
+    # Whole-week shifts keep 요일 and 주야; a shift leaving the year is reversed
+    when = frame[DATETIME_COLUMN]
+    shift = pd.to_timedelta(rng.integers(-MAX_WEEK_SHIFT, MAX_WEEK_SHIFT + 1, len(rows)) * 7, unit='D')
+    shifted = when + shift
+    shifted = shifted.where(shifted.dt.year == when.dt.year, when - shift)
+    frame[DATETIME_COLUMN] = shifted
+    frame['계절'] = shifted.dt.month.map(SEASONS).to_numpy()
+
+    offset = offsets[copies]
+    frame['x좌표값'] = frame['x좌표값'].to_numpy() + offset[:, 0]
+    frame['y좌표값'] = frame['y좌표값'].to_numpy() + offset[:, 1]
+    has_line = frame[LINE_COLUMN].notna().to_numpy()
+    lines = parse_linestrings(frame[LINE_COLUMN][has_line])
+    frame.loc[has_line, LINE_COLUMN] = format_linestrings(
+        shifted_lines(lines, np.arange(len(lines)), copies[has_line], offsets))
+    has_vds = frame[VDS_COLUMN].notna().to_numpy()
+    frame.loc[has_vds, VDS_COLUMN] = copy_codes(frame[VDS_COLUMN][has_vds], copies[has_vds])
+    return frame
+
+
+def write_dataset(scale, directory, seed=0):
+    # Writes the scaled files into `directory` (skipped when already there)
+    # and returns it
+    marker = os.path.join(directory, f'.scale-{scale}-seed-{seed}')
+    if os.path.exists(marker):
+        return directory
+    os.makedirs(directory, exist_ok=True)
+    offsets = copy_offsets(scale, seed)
+
+    for year in black_spot_years():
+        make_segments(load_black_spot(year), scale, offsets).to_csv(
+            os.path.join(directory, BLACK_SPOT_CSV.format(year=year)), index=False)
+
+    accidents = make_accidents(load_base_accidents(), scale, offsets, seed)
+    final_columns = load_final().columns
+    accidents[DATETIME_COLUMN] = accidents[DATETIME_COLUMN].dt.strftime(DATETIME_FORMAT)
+    accidents.to_csv(os.path.join(directory, ACCIDENT_CSV), index=False, encoding='cp949')
+    accidents[final_columns].to_csv(os.path.join(directory, FINAL_CSV), index=False, encoding='cp949')
+
+    open(marker, 'w').close()
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic data in the shipped schemas')
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True, help='data directory to write')
+    args = parser.parse_args()
+    write_dataset(args.scale, args.output, args.seed)
+    for name in sorted(os.listdir(args.output)):
+        path = os.path.join(args.output, name)
+        if os.path.isfile(path) and not name.startswith('.'):
+            print(f'{os.path.getsize(path) / 1e6:>10.1f} MB  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 범주형 교차 필터 비트맵 인덱스
+#
+# Every value of the low-cardinality categorical columns (주야, 요일,
+# 발생지시도, 법규위반, ...) gets a bitmap of the rows holding it, packed one
+# bit per accident with np.packbits: 1.25 MB per value for ten million rows.
+# A cross-filter {column: [values]} ORs the bitmaps of the chosen values
+# within a column and ANDs the columns, all on the packed bytes, and unpacks
+# the result once into a row mask.  That mask drives everything downstream:
+# a cube over the matching rows (death_cube.CubeRows) for the charts, and a
+# subset of the tile index (tiles.TileIndex.subset) for the 사망지점 map.
+#
+# Filters travel between the browser, the Dash callbacks and the tile URLs
+# as tokens: the canonical JSON of the sorted [column, values] pairs (what
+# the figure-request clientside callback calls its key), base64url-encoded.
+
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+
+from death_cube import DATETIME_COLUMN, labels_for
+from time_index import row_keys
+
+# 'year' comes from 발생년월일시 like the cube's time dimensions
+CROSS_FILTER_COLUMNS = (
+    'year', '주야', '요일', '계절', '발생지시도', '사고유형_대분류', '사고유형_중분류',
+    '법규위반', '도로형태', '당사자종별_1당_대분류', '당사자종별_2당_대분류',
+)
+# Set bits per byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+class BitmapIndex:
+
+    def __init__(self, rows, labels, bitmaps):
+        # labels: {column: [label, ...]}
+        # bitmaps: {column: uint8 array (len(labels[column]), ceil(rows / 8))}
+        self.rows = rows
+        self.labels = labels
+        self.bitmaps = bitmaps
+        self.positions = {column: {label: position for position, label in enumerate(values)}
+                          for column, values in labels.items()}
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmap in self.bitmaps.values())
+
+    def packed(self, filters):
+        # Packed mask of the filter, or None when it selects every row.
+        # Values not in the index match nothing; unknown columns are ignored.
+        result = None
+        for column, values in (filters or {}).items():
+            if not values or column not in self.bitmaps:
+                continue
+            positions = [self.positions[column][value] for value in values if value in self.positions[column]]
+            bitmap = self.bitmaps[column]
+            if positions:
+                column_bits = np.bitwise_or.reduce(bitmap[positions], axis=0)
+            else:
+                column_bits = np.zeros(bitmap.shape[1], dtype=np.uint8)
+            result = column_bits if result is None else np.bitwise_and(result, column_bits, out=result)
+        return result
+
+    def mask(self, filters):
+        # Boolean row mask, or None when the filter selects every row
+        packed = self.packed(filters)
+        if packed is None:
+            return None
+        return np.unpackbits(packed, count=self.rows).view(bool)
+
+    def count(self, filters):
+        # Matching rows without unpacking; packbits pads with zero bits
+        packed = self.packed(filters)
+        return self.rows if packed is None else int(POPCOUNT[packed].sum(dtype=np.int64))
+
+    def counts(self, column, filters=None):
+        # Matching rows per label of column, e.g. to show next to the options
+        packed = self.packed(filters)
+        bitmap = self.bitmaps[column] if packed is None else self.bitmaps[column] & packed
+        return dict(zip(self.labels[column], POPCOUNT[bitmap].sum(axis=1, dtype=np.int64).tolist()))
+
+
+def _column_values(df, column, time_keys):
+    if column == 'year':
+        return pd.Series(time_keys['year'])
+    # Categorical columns (schema.py) are recoded without decoding the strings
+    return df[column]
+
+
+def build_index(df, columns=CROSS_FILTER_COLUMNS):
+    # Bitmaps over the rows of df, in row order (the order of load_final(),
+    # which the cube rows and the tile index share)
+    time_keys = row_keys(df[DATETIME_COLUMN]) if 'year' in columns else None
+    labels = {}
+    bitmaps = {}
+    for column in columns:
+        values = _column_values(df, column, time_keys)
+        labels[column] = labels_for(column, values.dropna())
+        # Missing values get code -1 and no bit in any bitmap
+        codes = pd.Categorical(values, categories=labels[column]).codes
+        bitmaps[column] = np.stack([np.packbits(codes == position) for position in range(len(labels[column]))]) \
+            if labels[column] else np.zeros((0, (len(df) + 7) // 8), dtype=np.uint8)
+    return BitmapIndex(len(df), labels, bitmaps)
+
+
+def filter_pairs(filters):
+    # Canonical form: [[column, sorted values], ...] sorted by column, empty
+    # filters dropped.  Values sort as strings, like Array.prototype.sort().
+    return [[column, sorted(values, key=str)] for column, values in sorted((filters or {}).items()) if values]
+
+
+def encode_filters(filters):
+    # Token of a filter; '' means no filter
+    pairs = filter_pairs(filters)
+    if not pairs:
+        return ''
+    key = json.dumps(pairs, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _is_label(value):
+    # Labels are strings, or ints for 'year'; bool is an int to Python but
+    # never a label
+    return isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def decode_filters(token):
+    # {column: [values]} of a token; ValueError when it is not one.  Tokens
+    # come from URLs, so the shape is checked: [[str, [str | int, ...]], ...]
+    if not token:
+        return {}
+    try:
+        pairs = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8'))
+    except (TypeError, ValueError) as error:
+        raise ValueError(f'invalid filter token: {token!r}') from error
+    if not isinstance(pairs, list) or not all(
+            isinstance(pair, list) and len(pair) == 2 and isinstance(pair[0], str)
+            and isinstance(pair[1], list) and all(_is_label(value) for value in pair[1])
+            for pair in pairs):
+        raise ValueError(f'invalid filter token: {token!r}')
+    return {column: values for column, values in pairs}
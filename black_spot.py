@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 블랙스팟 점수 계산
+#
+# Recomputes the 'count' and 'black-spot' columns of the black-spot files
+# instead of taking them precomputed: for each year, accidents of that year
+# are counted per VDS segment, then a scoring formula turns the segment's
+# columns (count, length, TRFFCVLM, SPD_AVG, OCCPNCY, Start or End) into the
+# score.  Formulas are vectorized functions registered by name in
+# SCORE_FORMULAS; years are scored in a process pool.
+#
+#   python black_spot.py [--years 2021 2022] [--formula per_traffic]
+#                        [--workers 4] [--rematch] [--output-dir out/]
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datasets import BLACK_SPOT_CSV, black_spot_years, load_accidents, load_black_spot
+
+VDS_COLUMN = '사고 발생 VDS_CD'
+DATETIME_COLUMN = '발생년월일시'
+SCORE_COLUMNS = ('count', 'black-spot')
+
+DEFAULT_FORMULA = 'per_traffic'
+
+# name -> function(segments with a 'count' column) -> score array
+SCORE_FORMULAS = {}
+
+
+def register_formula(name):
+    def register(func):
+        SCORE_FORMULAS[name] = func
+        return func
+    return register
+
+
+@register_formula('per_traffic')
+def per_traffic(segments):
+    # Accidents per million vehicles; 0 where the detector saw no traffic.
+    # This is how the shipped black-spot column was computed.
+    traffic = segments['TRFFCVLM'].to_numpy(dtype=np.float64)
+    count = segments['count'].to_numpy(dtype=np.float64)
+    score = np.zeros(len(segments))
+    np.divide(count * 1e6, traffic, out=score, where=traffic > 0)
+    return score
+
+
+@register_formula('per_km')
+def per_km(segments):
+    # Accidents per kilometre of segment
+    length = segments['length'].to_numpy(dtype=np.float64)
+    count = segments['count'].to_numpy(dtype=np.float64)
+    score = np.zeros(len(segments))
+    np.divide(count * 1000, length, out=score, where=length > 0)
+    return score
+
+
+@register_formula('per_vehicle_km')
+def per_vehicle_km(segments):
+    # Accidents per 100 million vehicle-kilometres (traffic x segment length)
+    exposure = segments['TRFFCVLM'].to_numpy(dtype=np.float64) * segments['length'].to_numpy(dtype=np.float64) / 1000
+    count = segments['count'].to_numpy(dtype=np.float64)
+    score = np.zeros(len(segments))
+    np.divide(count * 1e8, exposure, out=score, where=exposure > 0)
+    return score
+
+
+def count_accidents(segments, vds):
+    # Accidents per segment, in segment order; codes with no segment are dropped
+    positions = pd.Index(segments['VDS_CD'].to_numpy(dtype=object)).get_indexer(pd.Series(vds, dtype=object))
+    return np.bincount(positions[positions >= 0], minlength=len(segments))
+
+
+def score_segments(segments, vds, formula=DEFAULT_FORMULA):
+    # segments: one year's segment table (score columns, if any, are replaced)
+    # vds: that year's accident VDS codes
+    scored = segments.drop(columns=[column for column in SCORE_COLUMNS if column in segments])
+    scored['count'] = count_accidents(scored, vds)
+    scored['black-spot'] = SCORE_FORMULAS[formula](scored)
+    return scored
+
+
+def accidents_by_year(accidents, years):
+    years_of = accidents[DATETIME_COLUMN].dt.year.to_numpy()
+    vds = accidents[VDS_COLUMN].to_numpy(dtype=object)
+    return {year: vds[years_of == year] for year in years}
+
+
+def _score_year(year, vds, formula):
+    return score_segments(load_black_spot(year), vds, formula)
+
+
+def score_years(years=None, formula=DEFAULT_FORMULA, workers=None, accidents=None):
+    # {year: scored segment table}.  Each year is scored in its own process;
+    # only that year's VDS codes are sent to it.
+    if formula not in SCORE_FORMULAS:
+        raise KeyError(f'unknown black-spot formula: {formula!r} (known: {sorted(SCORE_FORMULAS)})')
+    years = black_spot_years() if years is None else list(years)
+    accidents = load_accidents() if accidents is None else accidents
+    vds = accidents_by_year(accidents, years)
+
+    if workers == 1 or len(years) < 2:
+        return {year: _score_year(year, vds[year], formula) for year in years}
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {year: pool.submit(_score_year, year, vds[year], formula) for year in years}
+        return {year: future.result() for year, future in futures.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='블랙스팟 점수 계산')
+    parser.add_argument('--years', type=int, nargs='*', help='default: every black-spot file in DATA_DIR')
+    parser.add_argument('--formula', default=DEFAULT_FORMULA, choices=sorted(SCORE_FORMULAS))
+    parser.add_argument('--workers', type=int, help='processes (default: one per core)')
+    parser.add_argument('--rematch', action='store_true',
+                        help='snap accidents to segments again (segment_match.py) instead of using the VDS_CD column')
+    parser.add_argument('--output-dir', help='write the scored tables here, named like the inputs')
+    args = parser.parse_args()
+
+    accidents = load_accidents()
+    if args.rematch:
+        from segment_match import match_accidents
+        accidents = match_accidents(accidents, workers=args.workers or 1)
+
+    start = time.perf_counter()
+    scored = score_years(args.years, args.formula, args.workers, accidents)
+    seconds = time.perf_counter() - start
+
+    print(f'years         {", ".join(map(str, scored))}  ({seconds:.3f} s)')
+    for year, segments in scored.items():
+        shipped = load_black_spot(year)
+        same_count = (segments['count'].to_numpy() == shipped['count'].to_numpy()).mean()
+        # The shipped files keep 10 significant digits, at most 9 decimals
+        same_score = np.isclose(segments['black-spot'], shipped['black-spot'], rtol=1e-9, atol=1e-9).mean()
+        print(f'{year}          count {same_count:.2%}  black-spot {same_score:.2%}  (vs. the shipped file)')
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            segments.to_csv(os.path.join(args.output_dir, BLACK_SPOT_CSV.format(year=year)), index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 지도 빌드 캐시
+#
+# Rendered map artifacts (page, buffer, tooltip table and their encodings)
+# are stored under BUILD_DIR keyed by a content hash of everything that
+# shapes them: the input files (datasets.data_digest), the styling
+# parameters (maps.render_parameters) and the versions of the libraries that
+# render them.  A map whose key is already built is served from its files and
+# never rendered again, across restarts, workers and deploys; a changed input
+# gets a new key and a new URL.
+#
+#   python build_cache.py prebuild [--dir DIR] [--prune]   # render what is missing, e.g. in the deploy build
+#   python build_cache.py status [--dir DIR]               # every map's key and whether it is built
+#
+# ANALYSIS_BUILD_DIR moves the cache (default: maps/ in the cache
+# directory); set it empty to keep rendered maps in memory only.
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from importlib import metadata
+
+# Resolved like datasets.CACHE_DIR without importing it (and pandas)
+_DATA_DIR = os.environ.get('ANALYSIS_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', os.path.join(_DATA_DIR, '.cache'))
+BUILD_DIR = os.environ.get('ANALYSIS_BUILD_DIR', os.path.join(_CACHE_DIR, 'maps')) or None
+
+# Bump when a renderer changes in a way render_parameters() does not show
+BUILD_VERSION = 1
+# Libraries whose output ends up in the artifacts
+LIBRARIES = ('pydeck', 'numpy', 'pandas')
+
+
+@lru_cache(maxsize=None)
+def library_versions():
+    versions = {}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def build_key(sources, parameters):
+    # sources: {file name: content digest}; parameters: anything JSON can hold
+    payload = {
+        'build': BUILD_VERSION,
+        'sources': sources,
+        'parameters': parameters,
+        'libraries': library_versions(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def map_key(file_names, variant=''):
+    # Key of a map drawn from file_names; variant separates different
+    # renderings of the same files
+    from datasets import data_digest
+    from maps import render_parameters
+
+    return build_key({name: data_digest(name) for name in file_names}, dict(render_parameters(), variant=variant))
+
+
+def cached_map(name, render, file_names, variant='', directory=None, extension='html'):
+    # Text of one file of a map (its page by default), rendered only when
+    # its key is not built yet in directory (BUILD_DIR by default)
+    from map_routes import StoredMapEntry
+
+    directory = directory or BUILD_DIR
+    if directory is None:
+        rendered = render()
+        return rendered if isinstance(rendered, str) else rendered[extension]
+    entries = StoredMapEntry.load_or_render(directory, name, map_key(file_names, variant), render)
+    with open(entries[extension].paths[None], 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def prune(directory, stems):
+    # Removes the files of every other build: those not belonging to stems
+    prefixes = tuple(f'{stem}.' for stem in stems)
+    removed = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.startswith(prefixes):
+            os.remove(os.path.join(directory, file_name))
+            removed.append(file_name)
+    return removed
+
+
+def dashboard_maps(directory):
+    # The dashboard's maps registered on a MapRoutes storing into directory
+    from app import register_maps
+    from map_routes import DensityRoutes, LiveRoutes, MapRoutes, TileRoutes
+
+    map_routes = MapRoutes(store_dir=directory)
+    register_maps(map_routes, TileRoutes(), LiveRoutes(), DensityRoutes())
+    return map_routes
+
+
+def prebuild(directory, prune_stale=False, workers=None):
+    from app import BLACK_SPOT_YEARS
+    from year_maps import build_years
+
+    map_routes = dashboard_maps(directory)
+    built = {name: map_routes.built(name) for name in map_routes.renderers}
+    start = time.perf_counter()
+    # Per-year maps in a process pool (year_maps.py); the loop below then
+    # finds them built
+    build_years(BLACK_SPOT_YEARS, 'binary', directory, workers)
+    for name in map_routes.renderers:
+        map_routes.entry(name)
+        print(f'{name:<24}{map_routes.stem(name):<42}{"cached" if built[name] else "rendered"}')
+    print(f'{len(map_routes.renderers)} maps in {time.perf_counter() - start:.2f} s')
+    if prune_stale:
+        for file_name in prune(directory, [map_routes.stem(name) for name in map_routes.renderers]):
+            print(f'removed  {file_name}')
+
+
+def status(directory):
+    map_routes = dashboard_maps(directory)
+    for name in map_routes.renderers:
+        print(f'{name:<24}{map_routes.stem(name):<42}{"built" if map_routes.built(name) else "missing"}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='지도 빌드 캐시')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    prebuild_parser = subparsers.add_parser('prebuild', help='render every map that is not built yet')
+    prebuild_parser.add_argument('--prune', action='store_true', help='remove artifacts of other builds')
+    prebuild_parser.add_argument('--workers', type=int, help='processes for the per-year maps (default: one per core)')
+    status_parser = subparsers.add_parser('status', help='list the maps and whether they are built')
+    for subparser in (prebuild_parser, status_parser):
+        subparser.add_argument('--dir', default=BUILD_DIR or os.path.join(_CACHE_DIR, 'maps'),
+                               help='build cache directory (default: ANALYSIS_BUILD_DIR)')
+    args = parser.parse_args()
+
+    if args.command == 'prebuild':
+        prebuild(args.dir, args.prune, args.workers)
+    else:
+        status(args.dir)
+
+
+if __name__ == '__main__':
+    main()
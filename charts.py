@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 사망 분석 차트
+#
+# Figure builders for the death-analysis charts.  Each one reads a slice of a
+# DeathCube, so the same builder serves every filter combination.
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from death_cube import COUNT_MEASURE
+
+WEEKDAY_NAMES = {0: '월요일', 1: '화요일', 2: '수요일', 3: '목요일', 4: '금요일', 5: '토요일', 6: '일요일'}
+
+
+def _normalize(values):
+    return (values - values.min()) / (values.max() - values.min())
+
+
+def seasonal_ratios(cube, filters=None, per_traffic=False):
+    labels = cube.axis_labels('계절', filters)
+    if per_traffic:
+        # 교통량 1000 대당 사망자수
+        deaths = cube.query('사망자수', by=('계절',), filters=filters)
+        traffic = cube.query('교통량', by=('계절',), filters=filters)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratios = pd.Series(deaths / traffic * 1000, index=labels)
+    else:
+        # 계절별 사고 건수 비율 (%)
+        counts = pd.Series(cube.query(COUNT_MEASURE, by=('계절',), filters=filters), index=labels)
+        ratios = counts / counts.sum() * 100
+    present = cube.query(COUNT_MEASURE, by=('계절',), filters=filters) > 0
+    return ratios[present].rename_axis('계절')
+
+
+def monthly_death_counts(cube, filters=None):
+    years = cube.axis_labels('year', filters)
+    months = cube.axis_labels('month', filters)
+    deaths = cube.query('사망자수', by=('year', 'month'), filters=filters).ravel()
+    counts = cube.query(COUNT_MEASURE, by=('year', 'month'), filters=filters).ravel()
+
+    # Same span resample('M') produces: first to last month with an accident
+    dates = pd.to_datetime([f'{year}-{month:02d}-01' for year in years for month in months]) + pd.offsets.MonthEnd(0)
+    frame = pd.DataFrame({'발생년월일시': dates, '사망자수': deaths.astype(np.int64)})
+    frame = frame.sort_values('발생년월일시')
+    present = np.flatnonzero(counts[frame.index] > 0)
+    if len(present):
+        frame = frame.iloc[present[0]:present[-1] + 1]
+    else:
+        frame = frame.iloc[:0]
+    frame = frame.reset_index(drop=True)
+    frame['Year'] = frame['발생년월일시'].dt.year.astype(str)
+    return frame
+
+
+def weekday_death_counts(cube, filters=None):
+    weekdays = cube.axis_labels('weekday', filters)
+    deaths = cube.query('사망자수', by=('weekday',), filters=filters)
+    present = cube.query(COUNT_MEASURE, by=('weekday',), filters=filters) > 0
+    frame = pd.DataFrame({'발생년월일시': weekdays, '사망자수': deaths.astype(np.int64)})[present]
+    frame = frame.sort_values('발생년월일시').reset_index(drop=True)
+    frame['weekday'] = frame['발생년월일시'].map(WEEKDAY_NAMES)
+    return frame.sort_values(by='사망자수', ascending=False)
+
+
+def hourly_death_counts(cube, filters=None):
+    hours = cube.axis_labels('hour', filters)
+    deaths = cube.query('사망자수', by=('hour',), filters=filters)
+    present = cube.query(COUNT_MEASURE, by=('hour',), filters=filters) > 0
+    frame = pd.DataFrame({'발생년월일시': hours, '사망자수': deaths.astype(np.int64)})[present]
+    return frame.sort_values('발생년월일시').reset_index(drop=True)
+
+
+def weekday_hour_death_counts(cube, filters=None):
+    # 요일 x 시간대 사망자수, every weekday and hour even when empty
+    deaths = cube.query('사망자수', by=('weekday', 'hour'), filters=filters)
+    weekdays = cube.axis_labels('weekday', filters)
+    hours = cube.axis_labels('hour', filters)
+    return pd.DataFrame(deaths.astype(np.int64), index=[WEEKDAY_NAMES[day] for day in weekdays], columns=hours)
+
+
+def build_pie(cube, filters=None, per_traffic=False):
+    season_ratios = seasonal_ratios(cube, filters, per_traffic=per_traffic)
+    fig_pie = px.pie(season_ratios, labels=season_ratios.index, values=season_ratios.values,
+                     title='계절별 사고 비율', template="plotly_dark", names=season_ratios.index)
+    fig_pie.update_layout(showlegend=True)
+    return fig_pie
+
+
+def build_monthly_bar(cube, filters=None):
+    monthly = monthly_death_counts(cube, filters)
+    fig_bar_monthly = px.bar(monthly, x='발생년월일시', y='사망자수',
+                             color='Year', color_discrete_sequence=['yellow', 'orange'],
+                             labels={'발생년월일시': '월', '사망자수': '사망자 수'},
+                             title='월별 사망자수', template="plotly_dark")
+    fig_bar_monthly.update_layout(showlegend=True)
+    return fig_bar_monthly
+
+
+def build_weekday_bar(cube, filters=None):
+    weekday_sorted = weekday_death_counts(cube, filters)
+    fig_bar_weekday_sorted = px.bar(weekday_sorted, x='weekday', y='사망자수',
+                                    labels={'weekday': '요일', '사망자수': '사망자 수'},
+                                    title='요일별 사망자수', template="plotly_dark",
+                                    color_discrete_sequence=['blue'])
+    fig_bar_weekday_sorted.update_layout(showlegend=True)
+    return fig_bar_weekday_sorted
+
+
+def build_hourly_bar(cube, filters=None):
+    hourly = hourly_death_counts(cube, filters)
+    normed_values_hourly = _normalize(hourly['사망자수'])
+    return px.bar(hourly, x='발생년월일시', y='사망자수',
+                  labels={'발생년월일시': '시간대', '사망자수': '사망자 수'},
+                  title='시간대별 사망자수', color=normed_values_hourly,
+                  template="plotly_dark", color_continuous_scale='Reds')
+
+
+def build_weekday_hour_heatmap(cube, filters=None):
+    # go.Heatmap rather than px.imshow, which does not run on numpy >= 1.24
+    # with the installed plotly
+    heatmap = weekday_hour_death_counts(cube, filters)
+    fig_heatmap = go.Figure(go.Heatmap(z=heatmap.to_numpy(), x=heatmap.columns.tolist(), y=heatmap.index.tolist(),
+                                       colorscale='Reds', colorbar={'title': '사망자 수'},
+                                       hovertemplate='%{y} %{x}시: %{z}<extra></extra>'))
+    fig_heatmap.update_layout(title='요일 x 시간대별 사망자수', template="plotly_dark",
+                              xaxis_title='시간대', yaxis_title='요일', yaxis_autorange='reversed')
+    return fig_heatmap
+
+
+def build_live_vds_chart():
+    # Empty traces the dashboard extends as vds_stream buckets complete:
+    # network mean speed (line) and total volume (bars, right axis)
+    fig_live = go.Figure([
+        go.Scatter(x=[], y=[], mode='lines+markers', name='평균 속도 (km/h)', line={'color': 'orange'}),
+        go.Bar(x=[], y=[], name='교통량', yaxis='y2', opacity=0.4, marker={'color': 'steelblue'}),
+    ])
+    fig_live.update_layout(title='실시간 VDS (5분 단위)', template="plotly_dark",
+                           yaxis={'title': '평균 속도'}, yaxis2={'title': '교통량', 'overlaying': 'y', 'side': 'right'})
+    return fig_live
+
+
+# chart-dropdown value -> builder
+CHART_BUILDERS = {
+    'pie-chart': build_pie,
+    'monthly-bar-chart': build_monthly_bar,
+    'weekday-bar-chart': build_weekday_bar,
+    'hourly-bar-chart': build_hourly_bar,
+    'weekday-hour-heatmap': build_weekday_hour_heatmap,
+}
+# Every breakdown the builders query (death_cube.MarginalCube): enough to
+# build any chart over a filtered subset of the rows
+CHART_MARGINALS = (('계절',), ('year', 'month'), ('weekday', 'hour'))
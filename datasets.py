@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 데이터 로더
+#
+# Every source CSV is decoded once and kept as a typed columnar cache
+# (one .npy file per column) under CACHE_DIR.  The cache entry is keyed on
+# the SHA-1 of the source file; size and mtime are remembered next to it so
+# an unchanged file is recognised without hashing it again.  Later loads
+# memory-map the .npy files instead of re-parsing cp949 text.
+#
+# Each file is loaded through its declared schema (schema.py): validated
+# when parsed, and kept as categorical codes, narrow integers and float32
+# coordinates rather than Python strings and 64-bit numbers.  The schema is
+# part of the cache key, so a cached entry was validated when it was written.
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import schema
+from schema import ACCIDENT_SCHEMA, BLACK_SPOT_SCHEMA, DATETIME_FORMAT, FINAL_SCHEMA
+
+DATA_DIR = os.environ.get('ANALYSIS_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+
+# Bump when the on-disk layout changes so stale entries are ignored
+CACHE_VERSION = 2
+
+ACCIDENT_CSV = '리얼 찐최종vds사고결합.csv'
+FINAL_CSV = 'final.csv'
+BLACK_SPOT_CSV = 'black spot {year}e,s.csv'
+
+# Monthly batches appended after the base accident CSV (see incremental.py).
+# These are data, not cache, so they live outside CACHE_DIR.
+ACCIDENT_BATCH_DIR = os.environ.get('ANALYSIS_BATCH_DIR', os.path.join(DATA_DIR, 'accident_batches'))
+
+# A cached column as stored: kind is 'numeric', 'datetime' (int64 ns),
+# 'category' (a Categorical's int8/int16 codes into categories, -1 for
+# missing) or 'dictionary' (other strings: int32 codes into categories)
+EncodedColumn = namedtuple('EncodedColumn', ['kind', 'values', 'categories'])
+
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_key(path, encoding, datetime_columns, declared=None):
+    stem = re.sub(r'[^0-9A-Za-z가-힣]+', '_', os.path.splitext(os.path.basename(path))[0])
+    meta = {'encoding': encoding, 'datetime_columns': list(datetime_columns), 'version': CACHE_VERSION}
+    if declared is not None:
+        meta['schema'] = schema.schema_key(declared)
+    return stem, meta
+
+
+def _source_digest(path, stem):
+    # Reuse the stored hash while size and mtime are unchanged
+    stat = os.stat(path)
+    index_path = os.path.join(CACHE_DIR, stem + '.source.json')
+    try:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        if index['size'] == stat.st_size and index['mtime_ns'] == stat.st_mtime_ns:
+            return index['sha1']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    digest = _file_digest(path)
+    _write_json(index_path, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest})
+    return digest
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        json.dump(payload, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _encode_column(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return 'category', series.cat.codes.to_numpy(), series.cat.categories.tolist()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime', series.values.view('int64'), None
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return 'numeric', series.to_numpy(), None
+    # Strings are dictionary-encoded; -1 marks a missing value
+    codes, uniques = pd.factorize(series)
+    return 'dictionary', codes.astype(np.int32), [str(value) for value in uniques]
+
+
+def _decode_column(kind, values, categories):
+    if kind == 'category':
+        # The codes array is used as is, still memory-mapped
+        return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+    if kind == 'datetime':
+        return values.view('datetime64[ns]')
+    if kind == 'dictionary':
+        lookup = np.array(categories + [np.nan], dtype=object)
+        return lookup[values]
+    return values
+
+
+def write_cache(frame, entry_dir, meta):
+    # Written into a temporary directory first so concurrent workers never
+    # see a half-finished entry
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    columns = []
+    for position, name in enumerate(frame.columns):
+        kind, values, categories = _encode_column(frame[name])
+        file_name = f'col_{position:03d}.npy'
+        np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(values))
+        columns.append({'name': name, 'kind': kind, 'file': file_name, 'categories': categories})
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(dict(meta, rows=len(frame), columns=columns), file, ensure_ascii=False)
+
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another worker finished first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_columns(entry_dir):
+    # Returns {column name: read-only memory-mapped array} without copying
+    with open(os.path.join(entry_dir, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    columns = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(entry_dir, column['file']), mmap_mode='r')
+        columns[column['name']] = _decode_column(column['kind'], values, column['categories'])
+    return columns
+
+
+def _resolve(file_name):
+    return file_name if os.path.isabs(file_name) else os.path.join(DATA_DIR, file_name)
+
+
+def source_digest(file_name):
+    path = _resolve(file_name)
+    return _source_digest(path, _cache_key(path, None, ())[0])
+
+
+def _entry_dir(file_name, encoding, datetime_columns, declared=None):
+    # Cache entry of the CSV, written first if missing.  Returns the entry
+    # directory and the freshly parsed frame (None when the entry existed).
+    # With a schema the frame is conformed to it (schema.SchemaError if it
+    # does not fit) and datetime_columns come from the schema.
+    path = _resolve(file_name)
+    if declared is not None:
+        datetime_columns = schema.datetime_columns(declared)
+    stem, meta = _cache_key(path, encoding, datetime_columns, declared)
+    digest = _source_digest(path, stem)
+    options = hashlib.sha1(json.dumps(meta, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    entry_dir = os.path.join(CACHE_DIR, f'{stem}-{digest[:16]}-{options}')
+
+    frame = None
+    if not os.path.isdir(entry_dir):
+        if declared is not None:
+            frame = pd.read_csv(path, encoding=encoding, dtype=schema.csv_dtypes(declared))
+            frame = schema.conform(frame, declared, os.path.basename(path))
+        else:
+            frame = pd.read_csv(path, encoding=encoding)
+            for column in datetime_columns:
+                frame[column] = pd.to_datetime(frame[column], format=DATETIME_FORMAT)
+        write_cache(frame, entry_dir, dict(meta, source=os.path.basename(path), sha1=digest))
+    return entry_dir, frame
+
+
+def load_csv(file_name, encoding=None, datetime_columns=(), declared=None):
+    # declared: the file's schema (schema.py), if it has one
+    entry_dir, frame = _entry_dir(file_name, encoding, datetime_columns, declared)
+    if frame is not None:
+        return frame
+    return pd.DataFrame(load_columns(entry_dir))
+
+
+def load_encoded(file_name, encoding=None, datetime_columns=(), declared=None):
+    # {column name: EncodedColumn} straight from the memory-mapped cache:
+    # strings stay dictionary codes, datetimes int64.  Nothing is decoded or
+    # copied, so processes mapping the same entry share its pages.
+    entry_dir, _ = _entry_dir(file_name, encoding, datetime_columns, declared)
+    with open(os.path.join(entry_dir, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    return {
+        column['name']: EncodedColumn(column['kind'],
+                                      np.load(os.path.join(entry_dir, column['file']), mmap_mode='r'),
+                                      column['categories'])
+        for column in meta['columns']
+    }
+
+
+def list_batches():
+    # Appended batch directories in the order they were added
+    if not os.path.isdir(ACCIDENT_BATCH_DIR):
+        return []
+    return sorted(name for name in os.listdir(ACCIDENT_BATCH_DIR) if not name.startswith('.'))
+
+
+def load_batch(name):
+    # Conformed again: batches appended before the schema was declared hold
+    # plain strings and int64
+    return schema.conform(pd.DataFrame(load_columns(os.path.join(ACCIDENT_BATCH_DIR, name))), ACCIDENT_SCHEMA, name)
+
+
+def load_base_accidents():
+    return load_csv(ACCIDENT_CSV, encoding='cp949', declared=ACCIDENT_SCHEMA)
+
+
+def load_accidents():
+    # Base CSV plus every batch appended since
+    frames = [load_base_accidents()] + [load_batch(name) for name in list_batches()]
+    return schema.concat(frames, ACCIDENT_SCHEMA)
+
+
+def load_base_final():
+    return load_csv(FINAL_CSV, encoding='cp949', declared=FINAL_SCHEMA)
+
+
+def load_final():
+    # final.csv holds the accident file's rows without the traffic join, so
+    # appended batches contribute their FINAL_SCHEMA columns
+    frames = [load_base_final()] + [load_batch(name)[list(FINAL_SCHEMA)] for name in list_batches()]
+    return schema.concat(frames, FINAL_SCHEMA)
+
+
+def data_digest(file_name):
+    # Digest of what the loader of file_name returns: for final.csv that
+    # includes the appended batches, which are immutable and named by their
+    # content (incremental.append_accidents)
+    digest = source_digest(file_name)
+    batches = list_batches() if file_name == FINAL_CSV else []
+    if not batches:
+        return digest
+    return hashlib.sha1(json.dumps([digest] + batches).encode('utf-8')).hexdigest()
+
+
+def black_spot_years():
+    # Years that have a black-spot file in DATA_DIR, ascending
+    pattern = re.compile('^' + re.escape(BLACK_SPOT_CSV).replace(r'\{year\}', r'(\d{4})') + '$')
+    matches = (pattern.match(name) for name in os.listdir(DATA_DIR))
+    return sorted(int(match.group(1)) for match in matches if match)
+
+
+def load_black_spot(year):
+    return load_csv(BLACK_SPOT_CSV.format(year=year), declared=BLACK_SPOT_SCHEMA)
+
+
+def clear_cache():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
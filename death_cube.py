@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 사망 분석용 집계 큐브
+#
+# 사망자수 / 사상자수 / 교통량 (and the number of accidents) are summed once
+# into dense arrays over every combination of the dimensions below.  A chart
+# for any set of filters is then a slice + sum over a few hundred thousand
+# cells instead of a groupby over the raw rows.  CubeRows keeps every row's
+# cell, so a cube over any subset of the rows (a bitmap_index mask on columns
+# the cube does not have) is one bincount per measure.  When only the charts
+# read that subset, CubeRows.marginals bincounts just the few 1-D / 2-D
+# breakdowns they query (charts.CHART_MARGINALS): a few KB per filter instead
+# of a full-size cube.
+
+import numpy as np
+import pandas as pd
+
+from time_index import row_keys
+
+DATETIME_COLUMN = '발생년월일시'
+COUNT_MEASURE = '사고건수'
+MEASURES = ('사망자수', '사상자수', '교통량')
+
+# Dimensions derived from '발생년월일시' come first, then categorical columns
+TIME_DIMENSIONS = ('year', 'month', 'weekday', 'hour')
+CATEGORY_DIMENSIONS = ('계절', '주야', '발생지시도', '사고유형_대분류')
+DIMENSIONS = TIME_DIMENSIONS + CATEGORY_DIMENSIONS
+
+# Fixed label orders; anything else is sorted
+LABEL_ORDER = {
+    'month': list(range(1, 13)),
+    'weekday': list(range(7)),
+    'hour': list(range(24)),
+    '계절': ['봄', '여름', '가을', '겨울'],
+    '주야': ['주간', '야간'],
+    '요일': ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일'],
+}
+
+
+def _dimension_values(df, dim, time_keys):
+    if dim in TIME_DIMENSIONS:
+        return time_keys[dim]
+    return df[dim].astype(object).to_numpy()
+
+
+def labels_for(dim, values):
+    # Sorted labels of a dimension, or its fixed order when it has one
+    present = pd.unique(values).tolist()
+    order = LABEL_ORDER.get(dim)
+    if order is not None and set(present) <= set(order):
+        return list(order)
+    return sorted(present)
+
+
+class DeathCube:
+
+    def __init__(self, labels, data):
+        # labels: {dimension: [label, ...]} in DIMENSIONS order
+        # data: {measure: ndarray shaped by the label counts}
+        self.labels = labels
+        self.data = data
+        self.dimensions = tuple(labels)
+        self.shape = tuple(len(values) for values in labels.values())
+
+    @property
+    def measures(self):
+        return tuple(self.data)
+
+    def _positions(self, dim, wanted):
+        lookup = {label: position for position, label in enumerate(self.labels[dim])}
+        return np.array([lookup[label] for label in wanted if label in lookup], dtype=np.intp)
+
+    def query(self, measure, by=(), filters=None):
+        # Sum of `measure` for the rows matching `filters` ({dimension: labels}),
+        # broken down by the dimensions in `by` (result axes follow `by`)
+        filters = filters or {}
+        unknown = (set(by) | set(filters)) - set(self.dimensions)
+        if unknown:
+            raise KeyError(f'unknown cube dimensions: {sorted(unknown)}')
+
+        values = self.data[measure]
+        for axis, dim in enumerate(self.dimensions):
+            wanted = filters.get(dim)
+            if wanted:
+                values = np.take(values, self._positions(dim, wanted), axis=axis)
+
+        summed_axes = tuple(axis for axis, dim in enumerate(self.dimensions) if dim not in by)
+        values = values.sum(axis=summed_axes)
+        kept = [dim for dim in self.dimensions if dim in by]
+        return np.transpose(values, [kept.index(dim) for dim in by])
+
+    def axis_labels(self, dim, filters=None):
+        # Labels of `dim` as they come out of query(), honouring its own filter
+        wanted = (filters or {}).get(dim)
+        if not wanted:
+            return list(self.labels[dim])
+        return [self.labels[dim][position] for position in self._positions(dim, wanted)]
+
+
+class MarginalCube(DeathCube):
+    # The DeathCube interface over a few marginal cubes, each summed over
+    # every dimension but a small group of them.  A query is answered by the
+    # smallest marginal holding its `by` and filtered dimensions.
+
+    def __init__(self, labels, marginals):
+        # marginals: [DeathCube over a subset of the dimensions, ...]
+        super().__init__(labels, {})
+        self.marginals = marginals
+
+    @property
+    def measures(self):
+        return self.marginals[0].measures if self.marginals else ()
+
+    def query(self, measure, by=(), filters=None):
+        filters = {dim: wanted for dim, wanted in (filters or {}).items() if wanted}
+        wanted_dims = set(by) | set(filters)
+        covering = [marginal for marginal in self.marginals if wanted_dims <= set(marginal.dimensions)]
+        if not covering:
+            raise KeyError(f'no marginal over: {sorted(wanted_dims)}')
+        marginal = min(covering, key=lambda cube: np.prod(cube.shape))
+        return marginal.query(measure, by=by, filters=filters)
+
+
+class CubeRows:
+
+    def __init__(self, labels, cells, weights):
+        # cells: flat cube cell of every row; weights: {measure: value per row}
+        self.labels = labels
+        self.cells = cells
+        self.weights = weights
+        self.shape = tuple(len(values) for values in labels.values())
+
+    def __len__(self):
+        return len(self.cells)
+
+    def _sums(self, cells, mask, shape):
+        # {measure: array shaped `shape`} of the rows' values per cell
+        size = int(np.prod(shape))
+        data = {COUNT_MEASURE: np.bincount(cells, minlength=size).reshape(shape).astype(np.float64)}
+        for measure, weights in self.weights.items():
+            values = weights if mask is None else weights[mask]
+            data[measure] = np.bincount(cells, weights=values, minlength=size).reshape(shape)
+        return data
+
+    def cube(self, mask=None):
+        # DeathCube over the rows where mask is True (every row when None);
+        # labels stay those of all rows so axes match the full cube
+        cells = self.cells if mask is None else self.cells[mask]
+        return DeathCube(self.labels, self._sums(cells, mask, self.shape))
+
+    def marginals(self, groups, mask=None):
+        # MarginalCube over the rows where mask is True, holding one marginal
+        # per group of dimensions, e.g. (('year', 'month'), ('weekday', 'hour'))
+        cells = self.cells if mask is None else self.cells[mask]
+        dimensions = tuple(self.labels)
+        strides = np.cumprod((1,) + self.shape[:0:-1])[::-1]
+        marginals = []
+        for group in groups:
+            axes = [dimensions.index(dim) for dim in group]
+            shape = tuple(self.shape[axis] for axis in axes)
+            group_cells = np.zeros(len(cells), dtype=np.intp)
+            for axis in axes:
+                group_cells *= self.shape[axis]
+                group_cells += cells // strides[axis] % self.shape[axis]
+            labels = {dim: self.labels[dim] for dim in group}
+            marginals.append(DeathCube(labels, self._sums(group_cells, mask, shape)))
+        return MarginalCube(self.labels, marginals)
+
+
+def cube_rows(df, measures=MEASURES):
+    labels = {}
+    codes = []
+    # Every time dimension comes from one hour-of-epoch encoding
+    time_keys = row_keys(df[DATETIME_COLUMN])
+    for dim in DIMENSIONS:
+        values = _dimension_values(df, dim, time_keys)
+        labels[dim] = labels_for(dim, values)
+        lookup = {label: position for position, label in enumerate(labels[dim])}
+        codes.append(pd.Series(values).map(lookup).to_numpy(dtype=np.intp))
+
+    shape = tuple(len(values) for values in labels.values())
+    cells = np.ravel_multi_index(codes, shape)
+    # 교통량 only exists in the VDS-joined file
+    weights = {measure: df[measure].to_numpy(dtype=np.float64) for measure in measures if measure in df.columns}
+    return CubeRows(labels, cells, weights)
+
+
+def build_cube(df, measures=MEASURES):
+    return cube_rows(df, measures).cube()
+
+
+def merge_cubes(cube, other):
+    # Adds `other` into `cube`; labels missing from `cube` (a new year, a new
+    # region) grow the matching axis, otherwise the update happens in place
+    labels = {}
+    for dim in cube.dimensions:
+        merged = list(cube.labels[dim]) + [label for label in other.labels[dim] if label not in cube.labels[dim]]
+        order = LABEL_ORDER.get(dim)
+        labels[dim] = list(order) if order is not None and set(merged) <= set(order) else sorted(merged)
+
+    def positions(source):
+        return [
+            np.array([labels[dim].index(label) for label in source.labels[dim]], dtype=np.intp)
+            for dim in cube.dimensions
+        ]
+
+    other_positions = np.ix_(*positions(other))
+    if labels != cube.labels:
+        grown_positions = np.ix_(*positions(cube))
+        shape = tuple(len(values) for values in labels.values())
+        data = {}
+        for measure, values in cube.data.items():
+            data[measure] = np.zeros(shape, dtype=values.dtype)
+            data[measure][grown_positions] = values
+        cube = DeathCube(labels, data)
+
+    for measure, values in other.data.items():
+        if measure in cube.data:
+            cube.data[measure][other_positions] += values
+    return cube
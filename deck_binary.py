@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# deck.gl 바이너리 전송
+#
+# pydeck's to_html() inlines every row of a layer as JSON: full float64
+# coordinates as text, a [r, g, b, a] list per row, every tooltip field.
+# This module renders the same PathLayer / ScatterplotLayer maps as a small
+# HTML page plus two companion files served next to it (map_routes):
+#
+#   <name>.bin   typed arrays, packed: float32 coordinate offsets from an
+#                origin (deck.gl's LNGLAT_OFFSETS coordinate system) or int16
+#                quantized ones, flat path start indices, uint8 RGBA colours
+#   <name>.json  the tooltip fields, columnar; fetched on the first hover
+#
+# The buffer layout is b'DKB1', a uint32 header length, the JSON header and
+# 8-byte aligned arrays; the header lists every column's dtype, offset and
+# size.  The page uses the deck.gl standalone bundle instead of pydeck's
+# Jupyter widget, which cannot take binary data outside Jupyter.
+
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b'DKB1'
+ALIGNMENT = 8
+
+DECK_SCRIPT = 'https://unpkg.com/deck.gl@9.0.38/dist.min.js'
+MAPLIBRE_SCRIPT = 'https://unpkg.com/maplibre-gl@3.6.2/dist/maplibre-gl.js'
+MAPLIBRE_CSS = 'https://unpkg.com/maplibre-gl@3.6.2/dist/maplibre-gl.css'
+# pydeck's default basemap
+MAP_STYLE = 'https://basemaps.cartocdn.com/gl/dark-matter-gl-style/style.json'
+
+# Coordinate encodings: float32 offsets are exact to a few centimetres;
+# int16 quantizes the layer's extent into 65535 steps (about 10 m nationally)
+COORDINATE_ENCODINGS = ('float32', 'int16')
+
+
+def pack(length, columns, **header):
+    # columns: {name: (array, size, as_float)}; as_float asks the page to widen
+    # an integer column to Float32Array (widths, radii)
+    parts = []
+    described = []
+    offset = 0
+    for name, (values, size, as_float) in columns.items():
+        values = np.ascontiguousarray(values)
+        padding = -offset % ALIGNMENT
+        parts.append(b'\0' * padding)
+        offset += padding
+        described.append({'name': name, 'dtype': values.dtype.name, 'size': size, 'float': as_float,
+                          'offset': offset, 'count': int(values.size)})
+        parts.append(values.tobytes())
+        offset += values.nbytes
+
+    text = json.dumps(dict(header, length=int(length), columns=described), ensure_ascii=False).encode('utf-8')
+    # Arrays start 8-byte aligned after magic + length + header
+    text += b' ' * (-(len(MAGIC) + 4 + len(text)) % ALIGNMENT)
+    return MAGIC + struct.pack('<I', len(text)) + text + b''.join(parts)
+
+
+def unpack(buffer):
+    # Inverse of pack, for checks: (header, {name: array})
+    if buffer[:4] != MAGIC:
+        raise ValueError('not a deck_binary buffer')
+    (header_length,) = struct.unpack('<I', buffer[4:8])
+    header = json.loads(buffer[8:8 + header_length])
+    start = 8 + header_length
+    arrays = {
+        column['name']: np.frombuffer(buffer, dtype=column['dtype'], count=column['count'],
+                                      offset=start + column['offset'])
+        for column in header['columns']
+    }
+    return header, arrays
+
+
+def encode_coordinates(coords, encoding='float32'):
+    # (column, header fields) for lon/lat pairs
+    if encoding not in COORDINATE_ENCODINGS:
+        raise ValueError(f'unknown coordinate encoding: {encoding!r}')
+    low, high = coords.min(axis=0), coords.max(axis=0)
+    origin = (low + high) / 2
+    if encoding == 'float32':
+        return (coords - origin).astype(np.float32), {'origin': origin.tolist()}
+    scale = np.maximum(high - low, 1e-12) / 65534
+    quantized = np.rint((coords - origin) / scale).astype(np.int16)
+    return quantized, {'origin': origin.tolist(), 'scale': scale.tolist()}
+
+
+def _tooltip_table(fields):
+    return json.dumps({name: np.asarray(values).tolist() for name, values in fields.items()},
+                      ensure_ascii=False, separators=(',', ':'))
+
+
+def path_layer(lines, colors, widths, tooltip_fields, encoding='float32'):
+    # lines: wkt_lines.LineStrings; colors: (n, 4) uint8; widths: (n,)
+    coordinates, header = encode_coordinates(lines.coords, encoding)
+    widths = np.asarray(widths)
+    width_dtype = np.uint8 if widths.min(initial=0) >= 0 and widths.max(initial=0) <= 255 \
+        and np.array_equal(widths, np.rint(widths)) else np.float32
+    buffer = pack(len(lines), {
+        'positions': (coordinates, 2, encoding != 'float32'),
+        'startIndices': (lines.offsets.astype(np.uint32), 1, False),
+        'colors': (np.asarray(colors, dtype=np.uint8), 4, False),
+        'widths': (widths.astype(width_dtype), 1, True),
+    }, layer='PathLayer', **header)
+    return buffer, _tooltip_table(tooltip_fields)
+
+
+def scatter_layer(lon, lat, radii, tooltip_fields, encoding='float32'):
+    coords = np.column_stack([np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)])
+    coordinates, header = encode_coordinates(coords, encoding)
+    radii = np.asarray(radii)
+    buffer = pack(len(coords), {
+        'positions': (coordinates, 2, encoding != 'float32'),
+        'radii': (radii.astype(np.uint16 if radii.min(initial=0) >= 0 and radii.max(initial=0) < 65536
+                               else np.float32), 1, True),
+    }, layer='ScatterplotLayer', **header)
+    return buffer, _tooltip_table(tooltip_fields)
+
+
+# Decodes a DKB1 buffer into deck.gl binary layer data.  Kept separate from
+# the page so benchmarks can run it under node.
+DECODE_JS = r'''
+function decodeDeckBinary(arrayBuffer) {
+  const view = new DataView(arrayBuffer);
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(arrayBuffer, 8, headerLength)));
+  const start = 8 + headerLength;
+  const types = {float32: Float32Array, float64: Float64Array, uint8: Uint8Array, uint16: Uint16Array,
+                 uint32: Uint32Array, int16: Int16Array, int32: Int32Array};
+  const columns = {};
+  for (const column of header.columns) {
+    let values = new types[column.dtype](arrayBuffer, start + column.offset, column.count);
+    if (column.name === 'positions' && header.scale) {
+      const scaled = new Float32Array(values.length);
+      for (let i = 0; i < values.length; i += 2) {
+        scaled[i] = values[i] * header.scale[0];
+        scaled[i + 1] = values[i + 1] * header.scale[1];
+      }
+      values = scaled;
+    } else if (column.float) {
+      values = Float32Array.from(values);
+    }
+    columns[column.name] = {value: values, size: column.size};
+  }
+  const data = {length: header.length, attributes: {}};
+  if (header.layer === 'PathLayer') {
+    // Binary PathLayer attributes are per vertex: spread the per-path
+    // colour and width over each path's points
+    const starts = columns.startIndices.value;
+    const vertices = starts[starts.length - 1];
+    const colors = new Uint8Array(vertices * 4);
+    const widths = new Float32Array(vertices);
+    for (let path = 0; path < header.length; path++) {
+      for (let vertex = starts[path]; vertex < starts[path + 1]; vertex++) {
+        colors.set(columns.colors.value.subarray(path * 4, path * 4 + 4), vertex * 4);
+        widths[vertex] = columns.widths.value[path];
+      }
+    }
+    data.startIndices = starts.subarray(0, header.length);
+    data.attributes.getPath = columns.positions;
+    data.attributes.getColor = {value: colors, size: 4};
+    data.attributes.getWidth = {value: widths, size: 1};
+  } else {
+    data.attributes.getPosition = columns.positions;
+    data.attributes.getRadius = columns.radii;
+  }
+  return {header, data};
+}
+'''
+
+_PAGE = '''<!DOCTYPE html>
+<html>
+  <head>
+    <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1" />
+    <title>%(title)s</title>
+    <script src="%(deck_script)s"></script>
+    <script src="%(maplibre_script)s"></script>
+    <link rel="stylesheet" href="%(maplibre_css)s" />
+    <style>
+      body { margin: 0; padding: 0; overflow: hidden; }
+      #deck-container { width: 100vw; height: 100vh; position: relative; }
+      #tooltip { position: absolute; z-index: 1; pointer-events: none; display: none; padding: 10px;
+                 font-family: Helvetica, Arial, sans-serif; font-size: 0.7em; }
+    </style>
+  </head>
+  <body>
+    <div id="deck-container"></div>
+    <div id="tooltip"></div>
+  </body>
+  <script>
+%(decode_js)s
+    const config = %(config)s;
+    // Companion files share the page's ?v= so they are cached with it
+    const sibling = extension => new URL(config.name + '.' + extension + location.search, location.href);
+
+    const deckgl = new deck.DeckGL({
+      container: 'deck-container',
+      mapStyle: config.mapStyle,
+      initialViewState: config.initialViewState,
+      controller: true,
+      layers: [],
+      onHover: showTooltip,
+    });
+
+    let layerHeader = null;
+    let layerData = null;
+
+    function render() {
+      const Layer = deck[layerHeader.layer];
+      deckgl.setProps({layers: [new Layer(Object.assign({
+        id: config.name,
+        data: layerData,
+        coordinateSystem: deck.COORDINATE_SYSTEM.LNGLAT_OFFSETS,
+        coordinateOrigin: [layerHeader.origin[0], layerHeader.origin[1], 0],
+      }, layerHeader.layer === 'PathLayer' ? {_pathType: 'open'} : {}, config.layerProps))]});
+    }
+
+    fetch(sibling('bin')).then(response => response.arrayBuffer()).then(arrayBuffer => {
+      ({header: layerHeader, data: layerData} = decodeDeckBinary(arrayBuffer));
+      render();
+      if (config.live) {
+        pollLive();
+      }
+    });
+
+    // Live pages poll config.live.url for the paths changed since the last
+    // poll and recolour only those
+    const liveValues = {};
+    let liveSeq = 0;
+
+    function liveColor(value) {
+      const live = config.live;
+      if (value === null || value === undefined) {
+        return live.missingColor;
+      }
+      const ratio = Math.min(Math.max((value - live.range[0]) / (live.range[1] - live.range[0]), 0), 1);
+      return live.lowColor.map((channel, i) => Math.round(channel + (live.highColor[i] - channel) * ratio));
+    }
+
+    function applyLive(update) {
+      liveSeq = update.seq;
+      if (!update.rows || !update.rows.length) {
+        return;
+      }
+      const starts = layerData.startIndices;
+      const colors = new Uint8Array(layerData.attributes.getColor.value);
+      update.rows.forEach((row, k) => {
+        const color = liveColor(update[config.live.field][k]);
+        const end = row + 1 < layerData.length ? starts[row + 1] : colors.length / 4;
+        for (let vertex = starts[row]; vertex < end; vertex++) {
+          colors.set(color, vertex * 4);
+        }
+        config.live.fields.forEach(name => { (liveValues[name] = liveValues[name] || [])[row] = update[name][k]; });
+      });
+      // New data and attribute objects so deck.gl uploads the colours again
+      layerData = Object.assign({}, layerData, {
+        attributes: Object.assign({}, layerData.attributes, {getColor: {value: colors, size: 4}}),
+      });
+      render();
+    }
+
+    function pollLive() {
+      fetch(config.live.url + '?since=' + liveSeq).then(response => response.json()).then(applyLive)
+        .catch(() => {}).finally(() => setTimeout(pollLive, config.live.interval));
+    }
+
+    // Tooltip fields are only fetched once something is hovered
+    let tooltipTable = null;
+    let tooltipRequest = null;
+    const tooltip = document.getElementById('tooltip');
+    Object.assign(tooltip.style, config.tooltip.style || {});
+
+    function tooltipValue(match, name, index) {
+      if (name in liveValues) {
+        const value = liveValues[name][index];
+        return value === null || value === undefined ? '-' : value;
+      }
+      return name in tooltipTable ? tooltipTable[name][index] : match;
+    }
+
+    function showTooltip(info) {
+      if (!info.picked || info.index < 0) {
+        tooltip.style.display = 'none';
+        return;
+      }
+      if (!tooltipTable) {
+        tooltipRequest = tooltipRequest || fetch(sibling('json')).then(response => response.json())
+          .then(table => { tooltipTable = table; });
+        tooltipRequest.then(() => showTooltip(info));
+        return;
+      }
+      const text = config.tooltip.html || config.tooltip.text;
+      tooltip.innerHTML = text.replace(/{([^{}]+)}/g, (match, name) => tooltipValue(match, name, info.index));
+      tooltip.style.left = info.x + 'px';
+      tooltip.style.top = info.y + 'px';
+      tooltip.style.display = 'block';
+    }
+  </script>
+</html>
+'''
+
+
+# Changes whenever the page template or decoder does (part of map build keys)
+TEMPLATE_DIGEST = hashlib.sha256((_PAGE + DECODE_JS).encode('utf-8')).hexdigest()
+
+
+def render_page(name, view_state, layer_props, tooltip, title='deck', live=None):
+    # name: the map's route name; the page fetches <name>.bin / <name>.json.
+    # live: PathLayer pages only, {'url', 'interval' (ms), 'field' to colour
+    # by, 'fields' shown in the tooltip, 'range', 'lowColor', 'highColor',
+    # 'missingColor'}; the url answers like map_routes.LiveRoutes
+    config = {
+        'name': name,
+        'mapStyle': MAP_STYLE,
+        'initialViewState': view_state,
+        'layerProps': layer_props,
+        'tooltip': tooltip,
+        'live': live,
+    }
+    return _PAGE % {
+        'title': title,
+        'deck_script': DECK_SCRIPT,
+        'maplibre_script': MAPLIBRE_SCRIPT,
+        'maplibre_css': MAPLIBRE_CSS,
+        'decode_js': DECODE_JS,
+        'config': json.dumps(config, ensure_ascii=False).replace('</', '<\\/'),
+    }
+
+
+def artifacts(name, view_state, layer_props, tooltip, layer, live=None):
+    # What a map_routes renderer returns: {extension: content}
+    buffer, tooltip_table = layer
+    return {
+        'html': render_page(name, view_state, layer_props, tooltip, live=live),
+        'bin': buffer,
+        'json': tooltip_table,
+    }
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 사망사고 커널 밀도 핫스팟
+#
+# A kernel density surface of the accident points, weighted by 사망자수 or
+# 사상자수, computed on the server and shipped as one PNG raster instead of
+# thousands of points.  The points are projected to web-mercator once and
+# linearly binned onto a fixed grid over their extent (O(n), np.bincount);
+# the grid is then convolved with a Gaussian kernel by FFT, whose cost
+# depends on the grid size only.  Nothing compares points pairwise.
+#
+# The grid is laid out in web-mercator so the raster lines up with the map
+# when deck.gl's BitmapLayer stretches it over its bounds.  Cells are square
+# in metres at the grid's centre latitude (the scale varies by ~7% between
+# Jeju and the DMZ).  Values are weighted accidents per km².
+#
+# A cross-filter row mask (bitmap_index.py) only changes which points are
+# binned, so every filter shares the grid, its bounds and the kernel
+# spectra, and the page can swap rasters without moving the layer.
+# map_routes.DensityRoutes serves and caches the rasters per (bandwidth,
+# weighting, filter).
+
+import struct
+import zlib
+
+import numpy as np
+
+from styling import DENSITY_RAMP, ramp_colors
+from tiles import MAX_LATITUDE, mercator
+
+# Kernel bandwidths (Gaussian sigma) offered, in metres
+BANDWIDTHS = (500, 1000, 2000, 5000)
+DEFAULT_BANDWIDTH = 1000
+WEIGHTINGS = ('사망자수', '사상자수')
+DEFAULT_WEIGHTING = '사망자수'
+# Cells per bandwidth; the grid is coarser when that would exceed MAX_GRID
+CELLS_PER_BANDWIDTH = 3
+MAX_GRID = 2048
+# The kernel is cut off at this many bandwidths (and the grid padded by it)
+KERNEL_RADIUS = 3
+# Cells below this fraction of the peak are left transparent
+MIN_FRACTION = 0.02
+# Web-mercator circumference at the equator, metres
+EQUATOR = 2 * np.pi * 6378137.0
+
+
+def _fft_size(n):
+    # Smallest 2^a 3^b 5^c >= n: numpy's FFT is fastest on those
+    size = n
+    while True:
+        rest = size
+        for factor in (2, 3, 5):
+            while rest % factor == 0:
+                rest //= factor
+        if rest == 1:
+            return size
+        size += 1
+
+
+def unmercator(x, y):
+    # Inverse of tiles.mercator
+    lon = np.asarray(x, dtype=np.float64) * 360.0 - 180.0
+    lat = np.degrees(2 * np.arctan(np.exp((0.5 - np.asarray(y, dtype=np.float64)) * 2 * np.pi)) - np.pi / 2)
+    return lon, np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)
+
+
+class DensityGrid:
+
+    def __init__(self, lon, lat, weights, bandwidths=BANDWIDTHS):
+        # weights: {name: array} per input row (사망자수, 사상자수, ...)
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        self.rows = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        self.x, self.y = mercator(lon[self.rows], lat[self.rows])
+        self.weights = {name: np.asarray(values, dtype=np.float64)[self.rows] for name, values in weights.items()}
+        self.bandwidths = tuple(bandwidths)
+
+        if len(self.rows):
+            west, east, north, south = self.x.min(), self.x.max(), self.y.min(), self.y.max()
+        else:
+            west, north = mercator(127.8, 36.3)
+            east, south = west, north
+        # Metres per mercator unit at the centre latitude
+        _, center_lat = unmercator(0.0, (north + south) / 2)
+        self.scale = EQUATOR * np.cos(np.radians(center_lat))
+        # Padded so the widest kernel fits inside the grid
+        pad = KERNEL_RADIUS * max(self.bandwidths) / self.scale
+        self.extent = (west - pad, north - pad, east + pad, south + pad)
+        self._spectra = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def bounds(self):
+        # [west, south, east, north] in degrees, BitmapLayer's order
+        x0, y0, x1, y1 = self.extent
+        (west, east), (north, south) = unmercator([x0, x1], [y0, y1])
+        return [float(west), float(south), float(east), float(north)]
+
+    @property
+    def center(self):
+        x0, y0, x1, y1 = self.extent
+        lon, lat = unmercator((x0 + x1) / 2, (y0 + y1) / 2)
+        return float(lon), float(lat)
+
+    def cell_size(self, bandwidth):
+        # Cell edge in metres for a bandwidth
+        x0, y0, x1, y1 = self.extent
+        span = max(x1 - x0, y1 - y0) * self.scale
+        return max(bandwidth / CELLS_PER_BANDWIDTH, span / MAX_GRID)
+
+    def shape(self, bandwidth):
+        x0, y0, x1, y1 = self.extent
+        cell = self.cell_size(bandwidth) / self.scale
+        return max(int(np.ceil((y1 - y0) / cell)), 1), max(int(np.ceil((x1 - x0) / cell)), 1)
+
+    def binned(self, weighting, bandwidth, mask=None):
+        # Weights spread over the four nearest cell centres (linear binning)
+        height, width = self.shape(bandwidth)
+        x0, y0, x1, y1 = self.extent
+        selected = slice(None) if mask is None else np.asarray(mask, dtype=bool)[self.rows]
+        weights = self.weights[weighting][selected]
+        # Position in cells, measured from the first cell's centre
+        column = (self.x[selected] - x0) / (x1 - x0) * width - 0.5
+        row = (self.y[selected] - y0) / (y1 - y0) * height - 0.5
+        left, top = np.floor(column), np.floor(row)
+        fx, fy = column - left, row - top
+        left, top = left.astype(np.int64), top.astype(np.int64)
+
+        grid = np.zeros(height * width)
+        for dy, wy in ((0, 1 - fy), (1, fy)):
+            for dx, wx in ((0, 1 - fx), (1, fx)):
+                r, c = np.clip(top + dy, 0, height - 1), np.clip(left + dx, 0, width - 1)
+                grid += np.bincount(r * width + c, weights * wy * wx, minlength=height * width)
+        return grid.reshape(height, width)
+
+    def _spectrum(self, bandwidth):
+        # rfft2 of the wrapped, normalized Gaussian on the padded FFT grid
+        if bandwidth not in self._spectra:
+            height, width = self.shape(bandwidth)
+            sigma = bandwidth / self.cell_size(bandwidth)
+            radius = int(np.ceil(KERNEL_RADIUS * sigma))
+            size = (_fft_size(height + radius), _fft_size(width + radius))
+            offsets = np.arange(-radius, radius + 1)
+            profile = np.exp(-0.5 * (offsets / sigma) ** 2)
+            kernel = np.outer(profile, profile)
+            kernel /= kernel.sum()
+            wrapped = np.zeros(size)
+            wrapped[np.ix_(offsets % size[0], offsets % size[1])] = kernel
+            self._spectra[bandwidth] = size, np.fft.rfft2(wrapped)
+        return self._spectra[bandwidth]
+
+    def surface(self, bandwidth=DEFAULT_BANDWIDTH, weighting=DEFAULT_WEIGHTING, mask=None):
+        # (height, width) float64 density, row 0 at the north edge; mask is
+        # a row mask over the input (None: every row)
+        if bandwidth not in self.bandwidths:
+            raise ValueError(f'unknown bandwidth: {bandwidth!r}')
+        if weighting not in self.weights:
+            raise ValueError(f'unknown weighting: {weighting!r}')
+        grid = self.binned(weighting, bandwidth, mask)
+        size, spectrum = self._spectrum(bandwidth)
+        # The padding beyond the grid keeps the circular convolution from
+        # wrapping one edge's density onto the other
+        smoothed = np.fft.irfft2(np.fft.rfft2(grid, size) * spectrum, size)[:grid.shape[0], :grid.shape[1]]
+        cell_km2 = (self.cell_size(bandwidth) / 1000) ** 2
+        # FFT round-off leaves tiny negatives where there is no density
+        return np.maximum(smoothed, 0) / cell_km2
+
+    def raster(self, bandwidth=DEFAULT_BANDWIDTH, weighting=DEFAULT_WEIGHTING, mask=None):
+        # (PNG bytes, peak density per km²)
+        values = self.surface(bandwidth, weighting, mask)
+        peak = float(values.max())
+        return encode_png(colorize(values, peak)), peak
+
+
+def colorize(values, peak):
+    # (height, width, 4) uint8 through styling.DENSITY_RAMP; cells below
+    # MIN_FRACTION of the peak are transparent
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    if peak > 0:
+        # Usually a few percent of the cells: only those go through the ramp
+        visible = values > peak * MIN_FRACTION
+        rgba[visible] = ramp_colors(values[visible], DENSITY_RAMP, vmin=peak * MIN_FRACTION, vmax=peak)
+    return rgba
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(rgba, level=6):
+    # 8-bit RGBA PNG, no filtering: the surface is mostly transparent, which
+    # deflate compresses to almost nothing
+    height, width, _ = rgba.shape
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgba.reshape(height, width * 4)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + _png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), level))
+            + _png_chunk(b'IEND', b''))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 차트 figure 캐시
+#
+# Figures are built once per (chart, filters) and kept already serialized
+# to JSON (orjson when installed) in a bounded LRU, optionally backed by an
+# on-disk cache shared by every worker and capped at DISK_MAXSIZE files.
+# The cache version (figure_version) changes whenever the data, the chart
+# code or the plotting libraries do.  A resolve hook may swap the cube a
+# filter is built from (app.py: the charts' marginals over the bitmap_index
+# rows for columns the cube does not have).
+#
+# Dash serializes callback outputs itself, so get_figure hands it the
+# cached JSON decoded back into dicts: what a hit saves is building the
+# figure (tens to hundreds of ms), not the ~0.1 ms of JSON either way.
+#
+#   python figure_cache.py        # warm the disk cache before deploying
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from importlib import metadata
+
+import plotly.io as pio
+
+from datasets import CACHE_DIR
+from metrics import CACHE_REQUESTS, timed
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+JSON_ENGINE = 'orjson' if orjson is not None else 'json'
+
+FIGURE_CACHE_DIR = os.path.join(CACHE_DIR, 'figures')
+# Bump when the figures change in a way the hashed code does not show
+FIGURE_VERSION = 1
+# Modules whose code shapes the figures
+FIGURE_SOURCES = ('charts.py', 'death_cube.py')
+# Libraries whose output ends up in the figure JSON
+LIBRARIES = ('plotly', 'pandas', 'numpy', 'orjson')
+# Figure files kept on disk; the oldest beyond this are removed
+DISK_MAXSIZE = 4096
+
+
+def _loads(payload):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+def figure_version(data_version):
+    # Cache version of figures built from data_version (e.g. the source
+    # file hash) by the current chart code and libraries
+    directory = os.path.dirname(os.path.abspath(__file__))
+    code = {}
+    for name in FIGURE_SOURCES:
+        with open(os.path.join(directory, name), 'rb') as file:
+            code[name] = hashlib.sha256(file.read()).hexdigest()
+    libraries = {}
+    for name in LIBRARIES:
+        try:
+            libraries[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            libraries[name] = None
+    payload = {'figure': FIGURE_VERSION, 'data': data_version, 'code': code, 'libraries': libraries,
+               'engine': JSON_ENGINE}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def cache_key(chart, filters=None):
+    # Empty filters mean "everything"; order of dimensions and values is irrelevant
+    normalized = tuple(sorted(
+        (dim, tuple(sorted(values, key=str)))
+        for dim, values in (filters or {}).items() if values
+    ))
+    return chart, normalized
+
+
+class FigureCache:
+
+    def __init__(self, builders, cube, version='', maxsize=256, disk_dir=None, resolve=None,
+                 disk_maxsize=DISK_MAXSIZE):
+        self.builders = builders
+        self.cube = cube
+        # resolve(cube, filters) -> (cube, filters) the builders get
+        self.resolve = resolve
+        self.version = version
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.disk_maxsize = disk_maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(repr((self.version, key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f'{key[0]}-{name[:20]}.json')
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, payload):
+        if self.disk_dir is None:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+        os.replace(tmp_path, self._disk_path(key))
+        self._prune_disk()
+
+    def _prune_disk(self):
+        # Filters combine into more keys than are worth keeping: past
+        # disk_maxsize files the oldest go, stale versions first
+        def mtime(entry):
+            try:
+                return entry.stat().st_mtime
+            except OSError:
+                return 0
+
+        entries = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith('.json')]
+        if len(entries) <= self.disk_maxsize:
+            return
+        entries.sort(key=mtime)
+        for entry in entries[:len(entries) - self.disk_maxsize]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                # Removed by another worker
+                pass
+
+    def _store(self, key, payload):
+        with self.lock:
+            self.entries[key] = payload
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def get_json(self, chart, filters=None):
+        key = cache_key(chart, filters)
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                CACHE_REQUESTS.inc(('figure', 'hit'))
+                return payload
+            self.misses += 1
+
+        payload = self._read_disk(key)
+        if payload is not None:
+            with self.lock:
+                self.disk_hits += 1
+            CACHE_REQUESTS.inc(('figure', 'disk'))
+        else:
+            CACHE_REQUESTS.inc(('figure', 'miss'))
+            # Timed apart: building the figure from the cube vs serializing it
+            with timed(f'figure {chart}'):
+                cube, filters = self.cube, dict(key[1]) or None
+                if self.resolve is not None:
+                    cube, filters = self.resolve(cube, filters)
+                figure = self.builders[chart](cube, filters)
+            with timed(f'figure json {chart}'):
+                payload = pio.to_json(figure, engine=JSON_ENGINE).encode('utf-8')
+            self._write_disk(key, payload)
+        self._store(key, payload)
+        return payload
+
+    def get_figure(self, chart, filters=None):
+        # Plain dict for dcc.Graph; skips plotly's Figure validation on output
+        return _loads(self.get_json(chart, filters))
+
+    def warm(self, filter_sets=({},)):
+        for filters in filter_sets:
+            for chart in self.builders:
+                self.get_json(chart, filters)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+            }
+
+
+def single_filter_sets(cube, dimensions):
+    # No filter, plus every single value of each dimension: the views most
+    # users land on
+    filter_sets = [{}]
+    for dim in dimensions:
+        filter_sets.extend({dim: [label]} for label in cube.labels[dim])
+    return filter_sets
+
+
+def main():
+    from charts import CHART_BUILDERS
+    from datasets import FINAL_CSV, data_digest, load_final
+    from death_cube import build_cube
+
+    cube = build_cube(load_final())
+    cache = FigureCache(CHART_BUILDERS, cube, version=figure_version(data_digest(FINAL_CSV)),
+                        disk_dir=FIGURE_CACHE_DIR)
+    cache.warm(single_filter_sets(cube, ('year', '발생지시도', '주야', '계절', '사고유형_대분류')))
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+# gunicorn 설정 (procfile: gunicorn app:server)
+#
+# The app is imported once in the master, and the shared data (shared.py)
+# is prepared there before the workers fork, so they attach to one copy of
+# the cube and rendered maps instead of each building their own, and read
+# the live feed one ingest process keeps (vds_stream.py).  /metrics
+# sums every worker's numbers through a directory (metrics.multiprocess).
+
+import os
+
+preload_app = True
+
+
+def on_starting(server):
+    import metrics
+    import shared
+
+    metrics.multiprocess(metrics.METRICS_DIR or os.path.join(shared.SHARED_DIR, 'metrics'))
+    shared.prepare()
+
+
+def worker_exit(server, worker):
+    # What changed since the worker's last write
+    import metrics
+
+    metrics.flush()
+
+
+def on_exit(server):
+    import vds_stream
+
+    vds_stream.stop_shared_feed()
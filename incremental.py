@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 신규 사고 데이터 추가 (incremental append)
+#
+# A monthly batch in the schema of '리얼 찐최종vds사고결합.csv' is validated,
+# stored as its own columnar part next to the base cache, and folded into a
+# saved aggregate snapshot (the death-analysis cube and per-VDS accident
+# counts).  Only the batch is aggregated; the history is never rescanned.
+#
+# The dashboard reads final.csv, the same rows without the traffic join;
+# datasets.load_final() adds every batch to it, and the cube, figure cache,
+# cross-filter index, tiles, density grid and rendered maps are keyed on
+# datasets.data_digest(), which covers the batches.  A running dashboard
+# keeps what it built, so a batch shows there after its next start (or
+# build_cache.py prebuild in the deploy build).
+#
+#   python incremental.py new_month.csv
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from datasets import (ACCIDENT_BATCH_DIR, ACCIDENT_CSV, CACHE_DIR, list_batches, load_base_accidents, load_batch,
+                      source_digest, write_cache)
+from death_cube import DeathCube, build_cube, merge_cubes
+from schema import ACCIDENT_SCHEMA, conform
+
+AGGREGATE_PATH = os.path.join(CACHE_DIR, 'accident_aggregates.npz')
+
+VDS_COLUMN = '사고 발생 VDS_CD'
+
+
+def validate_batch(batch):
+    # Returns the batch with columns in file order and the base data's
+    # dtypes (schema.ACCIDENT_SCHEMA); raises schema.SchemaError, a
+    # ValueError, listing every problem found
+    return conform(batch, ACCIDENT_SCHEMA)
+
+
+def _batch_digest(batch):
+    return hashlib.sha1(pd.util.hash_pandas_object(batch, index=False).to_numpy().tobytes()).hexdigest()
+
+
+def vds_accident_counts(df):
+    # Plain strings: a categorical's value_counts lists unused labels too
+    return df[VDS_COLUMN].astype(object).value_counts().rename('사고건수')
+
+
+class AccidentAggregates:
+
+    def __init__(self, cube, vds_counts, source_sha1, batches):
+        self.cube = cube
+        self.vds_counts = vds_counts
+        # Which inputs are already folded in
+        self.source_sha1 = source_sha1
+        self.batches = list(batches)
+
+    @classmethod
+    def from_frame(cls, df, source_sha1, batches=()):
+        return cls(build_cube(df), vds_accident_counts(df), source_sha1, batches)
+
+    def update(self, batch, name):
+        self.cube = merge_cubes(self.cube, build_cube(batch))
+        self.vds_counts = self.vds_counts.add(vds_accident_counts(batch), fill_value=0).astype(np.int64)
+        self.batches.append(name)
+
+    def save(self, path=AGGREGATE_PATH):
+        meta = {
+            'source_sha1': self.source_sha1,
+            'batches': self.batches,
+            'labels': self.cube.labels,
+            'measures': list(self.cube.data),
+            'vds': self.vds_counts.index.tolist(),
+        }
+        arrays = {f'measure_{position}': values for position, values in enumerate(self.cube.data.values())}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            np.savez(file, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                     vds_counts=self.vds_counts.to_numpy(), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=AGGREGATE_PATH):
+        with np.load(path) as snapshot:
+            meta = json.loads(str(snapshot['meta']))
+            data = {measure: snapshot[f'measure_{position}'] for position, measure in enumerate(meta['measures'])}
+            vds_counts = pd.Series(snapshot['vds_counts'], index=meta['vds'], name='사고건수')
+        vds_counts.index.name = VDS_COLUMN
+        return cls(DeathCube(meta['labels'], data), vds_counts, meta['source_sha1'], meta['batches'])
+
+
+def load_aggregates(path=AGGREGATE_PATH):
+    # Snapshot + any batches appended since it was written.  The base CSV is
+    # only aggregated in full when it changed or there is no snapshot yet.
+    digest = source_digest(ACCIDENT_CSV)
+    aggregates = None
+    if os.path.exists(path):
+        try:
+            aggregates = AccidentAggregates.load(path)
+        except (OSError, ValueError, KeyError):
+            aggregates = None
+    if aggregates is None or aggregates.source_sha1 != digest:
+        aggregates = AccidentAggregates.from_frame(load_base_accidents(), digest)
+        changed = True
+    else:
+        changed = False
+
+    for name in list_batches():
+        if name not in aggregates.batches:
+            aggregates.update(load_batch(name), name)
+            changed = True
+    if changed:
+        aggregates.save(path)
+    return aggregates
+
+
+def append_accidents(batch, path=AGGREGATE_PATH):
+    batch = validate_batch(batch)
+    aggregates = load_aggregates(path)
+    if batch.empty:
+        return aggregates
+
+    digest = _batch_digest(batch)
+    if any(name.endswith(digest[:16]) for name in list_batches()):
+        # The same batch was appended before
+        return aggregates
+
+    name = f'{len(list_batches()):06d}-{digest[:16]}'
+    write_cache(batch, os.path.join(ACCIDENT_BATCH_DIR, name), {'sha1': digest})
+    aggregates.update(batch, name)
+    aggregates.save(path)
+    return aggregates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='신규 사고 데이터 추가')
+    parser.add_argument('csv', nargs='+', help='batch CSV files in the accident schema')
+    parser.add_argument('--encoding', default='cp949')
+    args = parser.parse_args()
+
+    for path in args.csv:
+        aggregates = append_accidents(pd.read_csv(path, encoding=args.encoding))
+        print(f'{path}: {len(aggregates.batches)} batches, '
+              f'{int(aggregates.cube.query("사고건수"))} accidents in total')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# pydeck 지도 HTML 라우트
+#
+# Rendered deck HTML is served from its own Flask route on app.server
+# instead of being inlined as an Iframe srcDoc in every callback response.
+# Each map is compressed once up front (gzip, and brotli when the package is
+# installed); responses carry a content-hash ETag and, because the URL the
+# iframe uses embeds that hash, a year-long immutable Cache-Control.  The
+# pages sit behind the dashboard's basic auth, so only the browser may keep
+# them (private), and a request without the current ?v= gets no-cache: only
+# URLs that change with the content are cached for a year.
+#
+# Maps can also be registered lazily: the render function runs on the first
+# request only, and the URL carries a caller-supplied version (e.g. the hash
+# of the input CSV, or a build_cache key) since the content hash is not
+# known yet.  With a store_dir, lazily rendered maps are written there once
+# (body and encodings as plain files) and every worker serves them from the
+# files, so the pages sit once in the OS page cache rather than in each
+# worker's heap, and a map already in the store is never rendered.  A map may
+# consist of several files under the same name (<name>.html, <name>.bin,
+# <name>.json), each cached and compressed like the page.
+#
+# A map may also have filtered variants, <name>~<token>.html with a
+# bitmap_index filter token: rendered per token on first request and kept in
+# memory (LRU), like the filtered tile indexes behind them.
+#
+# TileRoutes serves viewport tiles (tiles.TileIndex) for maps that fetch
+# their data per tile instead of inlining it, DensityRoutes kernel density
+# rasters (density.DensityGrid), LiveRoutes the incremental updates of live
+# feeds (vds_stream.LiveFeed) that pages poll.
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from flask import Response, abort, request
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+URL_PREFIX = '/maps'
+TILE_URL_PREFIX = '/tiles'
+LIVE_URL_PREFIX = '/live'
+DENSITY_URL_PREFIX = '/density'
+# Deepest tile zoom served (TileLayer maxZoom); deeper views overzoom these
+MAX_TILE_ZOOM = 16
+# Versioned URLs only; anything else is answered with no-cache
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+# Filtered map pages / tile indexes / density rasters kept per process
+MAX_VARIANTS = 32
+# What open() gives a new file: 0o666 less the umask (read once, before any
+# thread could create files while it is changed)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+# Files a map page may consist of; a renderer returns the page HTML, or
+# {extension: content} when the page loads companion files next to it
+# (e.g. the typed-array buffer and tooltip table of deck_binary.py)
+MIMETYPES = {
+    'html': 'text/html',
+    'bin': 'application/octet-stream',
+    'json': 'application/json',
+}
+
+
+def _artifacts(rendered):
+    return rendered if isinstance(rendered, dict) else {'html': rendered}
+
+
+class MapEntry:
+
+    def __init__(self, content, mimetype='text/html'):
+        self.body = content.encode('utf-8') if isinstance(content, str) else content
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=9)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body, quality=11)
+
+    @property
+    def encodings(self):
+        return tuple(self.encoded)
+
+    def response(self, encoding, headers):
+        body = self.encoded[encoding] if encoding else self.body
+        return Response(body, mimetype=self.mimetype, headers=headers)
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    # mkstemp creates 0600; stored maps are shipped by deploy builds that
+    # may run as another user than the workers reading them
+    os.fchmod(fd, FILE_MODE)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+class StoredMapEntry:
+    # A map file whose body and encodings live on disk: {encoding or None: path}
+
+    def __init__(self, paths, etag, mimetype='text/html'):
+        self.paths = paths
+        self.etag = etag
+        self.mimetype = mimetype
+
+    @property
+    def encodings(self):
+        return tuple(encoding for encoding in self.paths if encoding)
+
+    @staticmethod
+    def stem(name, version):
+        # Every file of a map build starts with '<stem>.'
+        return f'{name}-{version[:16]}'
+
+    @classmethod
+    def meta_path(cls, directory, name, version):
+        return os.path.join(directory, cls.stem(name, version) + '.meta.json')
+
+    @classmethod
+    def load_or_render(cls, directory, name, version, render):
+        # {extension: StoredMapEntry} for every file of the map
+        stem = cls.stem(name, version)
+        meta_path = cls.meta_path(directory, name, version)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            # Rendered here; the meta file is written last, so a present one
+            # means every file it lists is complete
+            os.makedirs(directory, exist_ok=True)
+            meta = {}
+            for extension, content in _artifacts(render()).items():
+                entry = MapEntry(content, MIMETYPES[extension])
+                files = {'': f'{stem}.{extension}'}
+                files.update({encoding: f'{stem}.{extension}.{encoding}' for encoding in entry.encoded})
+                _write_atomic(os.path.join(directory, files['']), entry.body)
+                for encoding, body in entry.encoded.items():
+                    _write_atomic(os.path.join(directory, files[encoding]), body)
+                meta[extension] = {'etag': entry.etag, 'files': files}
+            _write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        return {
+            extension: cls({encoding or None: os.path.join(directory, file_name)
+                            for encoding, file_name in item['files'].items()},
+                           item['etag'], MIMETYPES[extension])
+            for extension, item in meta.items()
+        }
+
+    def response(self, encoding, headers):
+        # Streamed from the file (sendfile under gunicorn), never read into memory
+        file = open(self.paths[encoding], 'rb')
+        response = Response(wrap_file(request.environ, file), mimetype=self.mimetype,
+                            headers=headers, direct_passthrough=True)
+        response.content_length = os.fstat(file.fileno()).st_size
+        return response
+
+
+class MapRoutes:
+
+    def __init__(self, url_prefix=URL_PREFIX, store_dir=None):
+        self.url_prefix = url_prefix
+        self.store_dir = store_dir
+        # (name, extension) -> entry
+        self.entries = {}
+        self.renderers = {}
+        self.versions = {}
+        self.rendered = set()
+        # name -> render(token), and (name, token, extension) -> entry, LRU
+        self.variant_renderers = {}
+        self.variants = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, name, html):
+        self.entries[(name, 'html')] = MapEntry(html)
+
+    def add_lazy(self, name, render, version):
+        # version may be a callable, resolved the first time url() needs it
+        self.renderers[name] = render
+        self.versions[name] = version
+
+    def add_variants(self, name, render):
+        # Filtered pages of a lazily added map: render(token) for
+        # <name>~<token>.html, under the version of name
+        self.variant_renderers[name] = render
+
+    def variant(self, name, token, extension='html'):
+        key = (name, token, extension)
+        with self.lock:
+            entry = self.variants.get(key)
+            if entry is not None:
+                self.variants.move_to_end(key)
+                return entry
+        # Rendered outside the lock: a filtered page may need a tile subset
+        entries = {(name, token, file_extension): MapEntry(content, MIMETYPES[file_extension])
+                   for file_extension, content in _artifacts(self.variant_renderers[name](token)).items()}
+        with self.lock:
+            self.variants.update(entries)
+            while len(self.variants) > MAX_VARIANTS:
+                self.variants.popitem(last=False)
+        return entries.get(key)
+
+    def entry(self, name, extension='html'):
+        base, _, token = name.partition('~')
+        if token and base in self.variant_renderers:
+            return self.variant(base, token, extension)
+        if name in self.renderers and name not in self.rendered:
+            with self.lock:
+                if name not in self.rendered:
+                    self._render(name)
+        return self.entries.get((name, extension))
+
+    def _render(self, name):
+        render = self.renderers[name]
+        if self.store_dir:
+            entries = StoredMapEntry.load_or_render(self.store_dir, name, self._version(name), render)
+        else:
+            entries = {extension: MapEntry(content, MIMETYPES[extension])
+                       for extension, content in _artifacts(render()).items()}
+        for extension, entry in entries.items():
+            self.entries[(name, extension)] = entry
+        self.rendered.add(name)
+
+    def stem(self, name):
+        return StoredMapEntry.stem(name, self._version(name))
+
+    def built(self, name):
+        # Whether a lazily rendered map is already in store_dir
+        return bool(self.store_dir) and os.path.exists(
+            StoredMapEntry.meta_path(self.store_dir, name, self._version(name)))
+
+    def add_file(self, name, path):
+        with open(path, 'rb') as file:
+            self.add(name, file.read())
+
+    def _version(self, name):
+        version = self.versions[name]
+        if callable(version):
+            version = self.versions[name] = version()
+        return version
+
+    def _url_version(self, name):
+        # The ?v= url() gives a map (and its variants and companion files)
+        base = name.partition('~')[0]
+        if base in self.versions:
+            return self._version(base)[:12]
+        return self.entries[(base, 'html')].etag[:12]
+
+    def url(self, name, token=''):
+        # The hash makes the URL change whenever the map does
+        page = f'{name}~{token}' if token and name in self.versions else name
+        return f'{self.url_prefix}/{page}.html?v={self._url_version(name)}'
+
+    def _respond(self, name, extension):
+        try:
+            entry = self.entry(name, extension) if extension in MIMETYPES else None
+        except ValueError:
+            # Not a filter token
+            entry = None
+        if entry is None:
+            abort(404)
+
+        headers = {
+            'ETag': f'"{entry.etag}"',
+            'Cache-Control': CACHE_CONTROL,
+            'Vary': 'Accept-Encoding',
+        }
+        if request.args.get('v') != self._url_version(name):
+            # Unversioned or stale URL: do not let it be cached for a year
+            headers['Cache-Control'] = 'no-cache'
+        if entry.etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        accepted = request.accept_encodings
+        encoding = next((encoding for encoding in ('br', 'gzip')
+                         if encoding in entry.encodings and accepted[encoding]), None)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return entry.response(encoding, headers)
+
+    def register(self, server):
+        server.add_url_rule(f'{self.url_prefix}/<name>.<extension>', 'deck_map', self._respond)
+        return self
+
+
+class TileRoutes:
+    # /tiles/<name>/<z>/<x>/<y>.json on app.server.  Indexes are built lazily
+    # on the first tile request; the version (e.g. the source CSV hash) goes
+    # into the URL so tiles can be cached as immutable.  A filter token (?f=)
+    # narrows the index to the rows select(token) returns.
+
+    def __init__(self, url_prefix=TILE_URL_PREFIX, max_zoom=MAX_TILE_ZOOM):
+        self.url_prefix = url_prefix
+        self.max_zoom = max_zoom
+        self.indexes = {}
+        self.builders = {}
+        self.versions = {}
+        self.selectors = {}
+        # (name, token) -> filtered index, LRU
+        self.subsets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add_lazy(self, name, build, version, select=None):
+        # version may be a callable, resolved the first time it is needed;
+        # select(token) gives the row mask of a filter token (None: every row)
+        self.builders[name] = build
+        self.versions[name] = version
+        if select is not None:
+            self.selectors[name] = select
+
+    def index(self, name, token=''):
+        index = self.indexes.get(name)
+        if index is None and name in self.builders:
+            with self.lock:
+                index = self.indexes.get(name)
+                if index is None:
+                    index = self.indexes[name] = self.builders[name]()
+        if not token or index is None:
+            return index
+        return self._subset(name, token, index)
+
+    def _subset(self, name, token, index):
+        key = (name, token)
+        with self.lock:
+            subset = self.subsets.get(key)
+            if subset is not None:
+                self.subsets.move_to_end(key)
+                return subset
+        mask = self.selectors[name](token)
+        subset = index if mask is None else index.subset(mask)
+        with self.lock:
+            self.subsets[key] = subset
+            while len(self.subsets) > MAX_VARIANTS:
+                self.subsets.popitem(last=False)
+        return subset
+
+    def _version(self, name):
+        version = self.versions[name]
+        if callable(version):
+            version = self.versions[name] = version()
+        return version
+
+    def url_template(self, name, token=''):
+        # What deck.gl's TileLayer expects as `data`
+        url = f'{self.url_prefix}/{name}/{{z}}/{{x}}/{{y}}.json?v={self._version(name)[:12]}'
+        return f'{url}&f={token}' if token else url
+
+    def _respond(self, name, z, x, y):
+        if name not in self.builders or not 0 <= z <= self.max_zoom or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            abort(404)
+        token = request.args.get('f', '')
+        if token and name not in self.selectors:
+            abort(404)
+        try:
+            index = self.index(name, token)
+        except ValueError:
+            # Not a filter token
+            abort(400)
+        body = json.dumps(index.tile(z, x, y), ensure_ascii=False, separators=(',', ':'))
+        response = Response(body, mimetype='application/json', headers={'Cache-Control': CACHE_CONTROL})
+        if request.args.get('v') != self._version(name)[:12]:
+            # Unversioned or stale URL: do not let it be cached for a year
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def register(self, server):
+        server.add_url_rule(f'{self.url_prefix}/<name>/<int:z>/<int:x>/<int:y>.json', 'map_tile', self._respond)
+        return self
+
+
+class DensityRoutes:
+    # /density/<name>.png?bw=<metres>&w=<weighting>&f=<token> on app.server:
+    # the density surface of the rows matching the filter token, as a PNG
+    # with its peak (per km²) in X-Density-Peak.  Grids are built lazily and
+    # rasters rendered on first request, then kept per (bandwidth, weighting,
+    # token), LRU.  Versioned and filtered like TileRoutes.
+
+    def __init__(self, url_prefix=DENSITY_URL_PREFIX):
+        self.url_prefix = url_prefix
+        self.grids = {}
+        self.builders = {}
+        self.versions = {}
+        self.selectors = {}
+        # (name, bandwidth, weighting, token) -> (body, etag, peak), LRU
+        self.rasters = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add_lazy(self, name, build, version, select=None):
+        # build() gives the density.DensityGrid; version and select(token)
+        # as for TileRoutes.add_lazy
+        self.builders[name] = build
+        self.versions[name] = version
+        if select is not None:
+            self.selectors[name] = select
+
+    def grid(self, name):
+        grid = self.grids.get(name)
+        if grid is None and name in self.builders:
+            with self.lock:
+                grid = self.grids.get(name)
+                if grid is None:
+                    grid = self.grids[name] = self.builders[name]()
+        return grid
+
+    def raster(self, name, bandwidth, weighting, token=''):
+        # ValueError for a bad token, bandwidth or weighting
+        key = (name, bandwidth, weighting, token)
+        with self.lock:
+            raster = self.rasters.get(key)
+            if raster is not None:
+                self.rasters.move_to_end(key)
+                return raster
+        # Rendered outside the lock, like filtered tile indexes
+        mask = self.selectors[name](token) if token else None
+        body, peak = self.grid(name).raster(bandwidth, weighting, mask)
+        raster = (body, hashlib.sha256(body).hexdigest()[:32], peak)
+        with self.lock:
+            self.rasters[key] = raster
+            while len(self.rasters) > MAX_VARIANTS:
+                self.rasters.popitem(last=False)
+        return raster
+
+    def _version(self, name):
+        version = self.versions[name]
+        if callable(version):
+            version = self.versions[name] = version()
+        return version
+
+    def url(self, name, token=''):
+        # The page adds &bw= and &w=
+        url = f'{self.url_prefix}/{name}.png?v={self._version(name)[:12]}'
+        return f'{url}&f={token}' if token else url
+
+    def _respond(self, name):
+        if name not in self.builders:
+            abort(404)
+        token = request.args.get('f', '')
+        if token and name not in self.selectors:
+            abort(404)
+        bandwidth = request.args.get('bw', type=int)
+        weighting = request.args.get('w', '')
+        grid = self.grid(name)
+        if bandwidth not in grid.bandwidths or weighting not in grid.weights:
+            # Only the offered surfaces: every one is a cache entry
+            abort(404)
+        try:
+            body, etag, peak = self.raster(name, bandwidth, weighting, token)
+        except ValueError:
+            # Not a filter token
+            abort(400)
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': CACHE_CONTROL, 'X-Density-Peak': f'{peak:.6g}'}
+        if request.args.get('v') != self._version(name)[:12]:
+            # Unversioned or stale URL: do not let it be cached for a year
+            headers['Cache-Control'] = 'no-cache'
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        return Response(body, mimetype='image/png', headers=headers)
+
+    def register(self, server):
+        server.add_url_rule(f'{self.url_prefix}/<name>.png', 'density_raster', self._respond)
+        return self
+
+
+class LiveRoutes:
+    # /live/<name>.json?since=<seq> on app.server: what changed in a live
+    # feed after the sequence number the client last saw.  Starters run on
+    # first use in each process and attach to the feed the gunicorn master
+    # started, so sequence numbers agree across workers; a starter returning
+    # None means the feed is not configured and every poll answers with no
+    # changes.
+
+    def __init__(self, url_prefix=LIVE_URL_PREFIX):
+        self.url_prefix = url_prefix
+        self.feeds = {}
+        self.starters = {}
+        self.lock = threading.Lock()
+
+    def add_lazy(self, name, start):
+        self.starters[name] = start
+
+    def feed(self, name):
+        if name in self.starters and name not in self.feeds:
+            with self.lock:
+                if name not in self.feeds:
+                    self.feeds[name] = self.starters[name]()
+        return self.feeds.get(name)
+
+    def url(self, name):
+        return f'{self.url_prefix}/{name}.json'
+
+    def _respond(self, name):
+        if name not in self.starters:
+            abort(404)
+        since = request.args.get('since', 0, type=int)
+        feed = self.feed(name)
+        body = json.dumps(feed.changes(since) if feed is not None else {'seq': 0, 'rows': []},
+                          ensure_ascii=False, separators=(',', ':'))
+        return Response(body, mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+    def register(self, server):
+        server.add_url_rule(f'{self.url_prefix}/<name>.json', 'live_feed', self._respond)
+        return self
@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# pydeck 지도 빌더
+#
+# The black-spot PathLayer and the 사망지점 ScatterplotLayer decks, shared by
+# the notebook cells and the dashboard.  render_* return the deck HTML as a
+# string; nothing is written to the working directory.  The dashboard draws
+# the 사망지점 map from viewport tiles (tiles.py) rather than inlining points,
+# the black-spot maps from typed-array buffers (deck_binary.py), and the
+# 사망사고 밀도 map as one BitmapLayer over a server-side density raster
+# (density.py).
+
+import base64
+import hashlib
+import json
+
+import numpy as np
+import pydeck as pdk
+
+import deck_binary
+import density
+from datasets import load_black_spot, load_final
+from map_routes import MAX_TILE_ZOOM
+from styling import (BASE_WIDTH, BLACK_SPOT_RAMP, DECREASE_RAMP, DENSITY_RAMP, INCREASE_RAMP,
+                     SEGMENT_WIDTH_MULTIPLIERS, UNCHANGED_COLOR, delta_colors, segment_widths, style_segments)
+from tiles import TileIndex
+from wkt_lines import parse_linestrings
+
+BLACK_SPOT_TOOLTIP = {
+    "html": "<b>VDS_CD:</b> {VDS_CD}<br><b>Count:</b> {count}<br><b>Speed:</b> {SPD_AVG}<br><b>Traffic Volume:</b> {TRFFCVLM}",
+    "style": {"backgroundColor": "steelblue", "color": "white"}
+}
+
+CHANGED_HOTSPOT_TOOLTIP = {
+    "html": "<b>VDS_CD:</b> {VDS_CD}<br><b>{start}:</b> {before} ({rank_before}위)<br>"
+            "<b>{end}:</b> {after} ({rank_after}위)<br><b>변화:</b> {delta}",
+    "style": {"backgroundColor": "steelblue", "color": "white"}
+}
+
+LIVE_VDS_TOOLTIP = {
+    "html": "<b>VDS_CD:</b> {VDS_CD}<br><b>Speed:</b> {SPD_AVG}<br><b>Traffic Volume:</b> {TRFFCVLM}"
+            "<br><b>Occupancy:</b> {OCCPNCY}",
+    "style": {"backgroundColor": "steelblue", "color": "white"}
+}
+
+# Live map colours: slow segments red, free-flowing ones green, no readings grey
+LIVE_SPEED_RANGE = (30, 100)
+LIVE_SLOW_COLOR = [255, 0, 0, 255]
+LIVE_FAST_COLOR = [0, 200, 80, 255]
+
+DEATH_TOOLTIP = {"text": "사상자수: {사상자수},사망자수: {사망자수},중상자수: {중상자수}, 경상자수: {경상자수}, 부상신고자수: {부상신고자수}"}
+
+# Summed per aggregate cell of the tiled map, and shown on raw points
+DEATH_MEASURES = ('사상자수', '사망자수', '중상자수', '경상자수', '부상신고자수')
+
+# Tile features are GeoJSON, so their fields sit under `properties`
+DEATH_TILE_TOOLTIP = {"text": "사고건수: {properties.사고건수}, " + ", ".join(
+    f"{name}: {{properties.{name}}}" for name in DEATH_MEASURES)}
+
+# 밀도 지도: the page picks bandwidth and weighting and fetches the raster
+# (map_routes.DensityRoutes) for them, or takes it from config.rasters when
+# the rasters are inlined (static reports); the layer's bounds never change
+DENSITY_PAGE = '''<!DOCTYPE html>
+<html>
+  <head>
+    <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1" />
+    <title>%(title)s</title>
+    <script src="%(deck_script)s"></script>
+    <script src="%(maplibre_script)s"></script>
+    <link rel="stylesheet" href="%(maplibre_css)s" />
+    <style>
+      body { margin: 0; padding: 0; overflow: hidden; font-family: Helvetica, Arial, sans-serif; }
+      #deck-container { width: 100vw; height: 100vh; position: relative; }
+      #controls { position: absolute; z-index: 1; top: 10px; left: 10px; padding: 8px 10px; font-size: 0.8em;
+                  background: rgba(255, 255, 255, 0.85); border-radius: 4px; }
+      #legend { height: 8px; margin-top: 6px; }
+    </style>
+  </head>
+  <body>
+    <div id="deck-container"></div>
+    <div id="controls">
+      <label>대역폭 <select id="bandwidth"></select></label>
+      <label>가중치 <select id="weighting"></select></label>
+      <div id="legend"></div>
+      <div id="peak"></div>
+    </div>
+  </body>
+  <script>
+    const config = %(config)s;
+    const deckgl = new deck.DeckGL({
+      container: 'deck-container',
+      mapStyle: config.mapStyle,
+      initialViewState: config.initialViewState,
+      controller: true,
+      layers: [],
+    });
+
+    const bandwidth = document.getElementById('bandwidth');
+    const weighting = document.getElementById('weighting');
+    config.bandwidths.forEach(metres => bandwidth.add(new Option(
+      metres >= 1000 ? metres / 1000 + ' km' : metres + ' m', metres, false, metres === config.bandwidth)));
+    config.weightings.forEach(name => weighting.add(new Option(name, name, false, name === config.weighting)));
+    const rgba = color => 'rgba(' + color.slice(0, 3).join(',') + ',' + color[3] / 255 + ')';
+    document.getElementById('legend').style.background =
+      'linear-gradient(to right, ' + rgba(config.ramp[0]) + ', ' + rgba(config.ramp[1]) + ')';
+
+    function loadRaster(metres, name) {
+      if (config.rasters) {
+        const raster = config.rasters[metres + '|' + name];
+        const image = new Image();
+        image.src = raster.url;
+        return image.decode().then(() => ({image: image, peak: raster.peak}));
+      }
+      const url = config.rasterUrl + '&bw=' + metres + '&w=' + encodeURIComponent(name);
+      let peak = null;
+      return fetch(url).then(response => {
+        peak = response.headers.get('X-Density-Peak');
+        return response.blob();
+      }).then(createImageBitmap).then(image => ({image: image, peak: peak}));
+    }
+
+    // Only the latest request is drawn when the selection changes quickly
+    let requested = 0;
+    function load() {
+      const request = ++requested;
+      loadRaster(bandwidth.value, weighting.value).then(({image, peak}) => {
+        if (request !== requested) {
+          return;
+        }
+        deckgl.setProps({layers: [new deck.BitmapLayer({id: config.name, image: image, bounds: config.bounds})]});
+        document.getElementById('peak').textContent =
+          '최고 ' + Number(peak).toPrecision(3) + ' ' + config.unit + ' (' + weighting.value + ')';
+      });
+    }
+    bandwidth.addEventListener('change', load);
+    weighting.addEventListener('change', load);
+    load();
+  </script>
+</html>
+'''
+
+
+def render_parameters():
+    # Everything besides the input data that shapes the rendered maps; part
+    # of their build key (build_cache.py), so changing any of it re-renders
+    return {
+        'ramps': {'black-spot': BLACK_SPOT_RAMP, 'increase': INCREASE_RAMP, 'decrease': DECREASE_RAMP},
+        'unchanged_color': UNCHANGED_COLOR,
+        'widths': [BASE_WIDTH, SEGMENT_WIDTH_MULTIPLIERS],
+        'tooltips': [BLACK_SPOT_TOOLTIP, CHANGED_HOTSPOT_TOOLTIP, LIVE_VDS_TOOLTIP, DEATH_TOOLTIP, DEATH_TILE_TOOLTIP],
+        'live': [LIVE_SPEED_RANGE, LIVE_SLOW_COLOR, LIVE_FAST_COLOR],
+        'page': [deck_binary.DECK_SCRIPT, deck_binary.MAPLIBRE_SCRIPT, deck_binary.MAP_STYLE,
+                 deck_binary.TEMPLATE_DIGEST],
+        'max_tile_zoom': MAX_TILE_ZOOM,
+        'density': [DENSITY_RAMP, density.BANDWIDTHS, density.WEIGHTINGS, density.CELLS_PER_BANDWIDTH,
+                    density.MAX_GRID, density.KERNEL_RADIUS, density.MIN_FRACTION,
+                    hashlib.sha256(DENSITY_PAGE.encode('utf-8')).hexdigest()],
+    }
+
+
+def black_spot_deck(df):
+    # LINESTRING 좌표를 좌표 버퍼 + offsets 로 변환 (행마다 shapely 객체를 만들지 않음)
+    lines = parse_linestrings(df['geometry'])
+    gdf = df.drop(columns='geometry')
+    gdf['path'] = lines.paths()
+
+    # black-spot 값에 따라 라인 색상, 'Start or End' 속성에 따라 라인 두께 설정
+    line_colors, line_widths = style_segments(gdf['black-spot'], gdf['Start or End'])
+    gdf['line_color'] = line_colors.tolist()
+    gdf['line_width'] = line_widths
+
+    # 중심 좌표를 black-spot 값이 가장 높은 지점으로 설정
+    max_spot_x, max_spot_y = lines.centroids()[gdf['black-spot'].to_numpy().argmax()]
+    initial_view_state = pdk.ViewState(
+        latitude=max_spot_y,
+        longitude=max_spot_x,
+        zoom=12  # 확대 레벨 설정
+    )
+
+    layer = pdk.Layer(
+        "PathLayer",
+        gdf,
+        get_path="path",
+        get_color="line_color",
+        get_width="line_width",
+        pickable=True,
+        auto_highlight=True
+    )
+    return pdk.Deck(layers=[layer], initial_view_state=initial_view_state, tooltip=BLACK_SPOT_TOOLTIP)
+
+
+def death_scatter_deck(df):
+    scatterplot_layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=df,
+        get_position=["x좌표값", "y좌표값"],
+        get_radius="사상자수",
+        radius_scale=30,
+        radius_min_pixels=5,
+        radius_max_pixels=100,
+        get_fill_color=[255, 140, 0],
+        pickable=True,
+        auto_highlight=True,
+    )
+    return pdk.Deck(
+        layers=[scatterplot_layer],
+        initial_view_state=pdk.ViewState(
+            latitude=df["y좌표값"].mean(),
+            longitude=df["x좌표값"].mean(),
+            zoom=10,
+            pitch=0,
+        ),
+        tooltip=DEATH_TOOLTIP
+    )
+
+
+def black_spot_binary(df, name, encoding='float32'):
+    # black_spot_deck as a deck_binary page: same colours, widths, view and
+    # tooltip, with the rows shipped as typed arrays instead of inline JSON
+    lines = parse_linestrings(df['geometry'])
+    line_colors, line_widths = style_segments(df['black-spot'], df['Start or End'])
+    max_spot_x, max_spot_y = lines.centroids()[df['black-spot'].to_numpy().argmax()]
+    tooltip_fields = {column: df[column].to_numpy() for column in ('VDS_CD', 'count', 'SPD_AVG', 'TRFFCVLM')}
+    layer = deck_binary.path_layer(lines, line_colors, line_widths, tooltip_fields, encoding)
+    return deck_binary.artifacts(
+        name,
+        {'latitude': float(max_spot_y), 'longitude': float(max_spot_x), 'zoom': 12},
+        {'pickable': True, 'autoHighlight': True},
+        BLACK_SPOT_TOOLTIP,
+        layer,
+    )
+
+
+def changed_hotspots_binary(store, start, end, name, column='black-spot', encoding='float32'):
+    # Every segment present in both years, coloured by the change of `column`
+    # (segment_store.SegmentStore) and drawn as the end year lists it; the
+    # view opens on the largest change
+    rows = np.flatnonzero(store.present(start) & store.present(end))
+    change = store.delta(column, start, end)[rows]
+    ranks = store.ranks(column, [start, end])[:, rows]
+    lines = store.segment_lines(rows, end)
+    widths = segment_widths(store.segment_column('Start or End', end)[rows])
+    tooltip_fields = {
+        'VDS_CD': store.codes[rows],
+        'before': store.column(column, start)[rows].round(3),
+        'after': store.column(column, end)[rows].round(3),
+        'delta': change.round(3),
+        'rank_before': ranks[0].astype(np.int64),
+        'rank_after': ranks[1].astype(np.int64),
+    }
+    # {start} / {end} are the years; the other fields come from the tooltip table
+    tooltip = dict(CHANGED_HOTSPOT_TOOLTIP, html=CHANGED_HOTSPOT_TOOLTIP['html']
+                   .replace('{start}', str(start)).replace('{end}', str(end)))
+    layer = deck_binary.path_layer(lines, delta_colors(change), widths, tooltip_fields, encoding)
+    focus_x, focus_y = lines.centroids()[int(np.nanargmax(np.abs(change)))] if len(rows) else (127.8, 36.3)
+    return deck_binary.artifacts(
+        name,
+        {'latitude': float(focus_y), 'longitude': float(focus_x), 'zoom': 12},
+        {'pickable': True, 'autoHighlight': True},
+        tooltip,
+        layer,
+    )
+
+
+def live_vds_binary(store, name, live_url, interval_ms=2000, encoding='float32'):
+    # Every segment of the store as last listed, grey until the live feed
+    # (vds_stream) reports readings for it; the page then recolours segments
+    # by the rolling-window SPD_AVG as updates arrive
+    rows = np.arange(len(store))
+    colors = np.tile(np.array(UNCHANGED_COLOR, dtype=np.uint8), (len(rows), 1))
+    widths = segment_widths(store.segment_column('Start or End'))
+    lines = store.segment_lines()
+    layer = deck_binary.path_layer(lines, colors, widths, {'VDS_CD': store.codes}, encoding)
+    center_x, center_y = np.nanmean(lines.centroids(), axis=0) if len(rows) else (127.8, 36.3)
+    live = {
+        'url': live_url,
+        'interval': interval_ms,
+        'field': 'SPD_AVG',
+        'fields': ['SPD_AVG', 'TRFFCVLM', 'OCCPNCY'],
+        'range': list(LIVE_SPEED_RANGE),
+        'lowColor': LIVE_SLOW_COLOR,
+        'highColor': LIVE_FAST_COLOR,
+        'missingColor': list(UNCHANGED_COLOR),
+    }
+    return deck_binary.artifacts(
+        name,
+        {'latitude': float(center_y), 'longitude': float(center_x), 'zoom': 7},
+        {'pickable': True, 'autoHighlight': True},
+        LIVE_VDS_TOOLTIP,
+        layer,
+        live=live,
+    )
+
+
+def death_scatter_binary(df, name, encoding='float32'):
+    lon, lat = df["x좌표값"].to_numpy(dtype=np.float64), df["y좌표값"].to_numpy(dtype=np.float64)
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    tooltip_fields = {column: df[column].to_numpy()[valid] for column in DEATH_MEASURES}
+    layer = deck_binary.scatter_layer(lon[valid], lat[valid], df["사상자수"].to_numpy()[valid], tooltip_fields, encoding)
+    return deck_binary.artifacts(
+        name,
+        {'latitude': float(lat[valid].mean()), 'longitude': float(lon[valid].mean()), 'zoom': 10, 'pitch': 0},
+        {'radiusScale': 30, 'radiusMinPixels': 5, 'radiusMaxPixels': 100, 'getFillColor': [255, 140, 0],
+         'pickable': True, 'autoHighlight': True},
+        DEATH_TOOLTIP,
+        layer,
+    )
+
+
+def death_tile_index(df):
+    return TileIndex(df["x좌표값"], df["y좌표값"], {name: df[name].to_numpy() for name in DEATH_MEASURES})
+
+
+def death_tile_deck(tile_url, center):
+    # Same styling as death_scatter_deck, but the points come per viewport tile
+    # from tiles.TileRoutes (aggregated when zoomed out) instead of inline
+    longitude, latitude = center
+    tile_layer = pdk.Layer(
+        "TileLayer",
+        data=tile_url,
+        min_zoom=0,
+        max_zoom=MAX_TILE_ZOOM,
+        pickable=True,
+        auto_highlight=True,
+        # Passed on to the GeoJsonLayer drawing each tile
+        get_point_radius="properties.사상자수",
+        point_radius_scale=30,
+        point_radius_min_pixels=5,
+        point_radius_max_pixels=100,
+        get_fill_color=[255, 140, 0],
+    )
+    return pdk.Deck(
+        layers=[tile_layer],
+        initial_view_state=pdk.ViewState(latitude=latitude, longitude=longitude, zoom=10, pitch=0),
+        tooltip=DEATH_TILE_TOOLTIP
+    )
+
+
+def death_density_grid(df):
+    return density.DensityGrid(df["x좌표값"], df["y좌표값"], {name: df[name].to_numpy() for name in density.WEIGHTINGS})
+
+
+def death_density_page(name, raster_url, grid, rasters=None):
+    # raster_url: map_routes.DensityRoutes.url(), which the page completes
+    # with the chosen bandwidth and weighting.  rasters: {'<bandwidth>|<weighting>':
+    # {'url', 'peak'}} instead, for pages that must work without the server.
+    longitude, latitude = grid.center
+    config = {
+        'name': name,
+        'mapStyle': deck_binary.MAP_STYLE,
+        'initialViewState': {'latitude': latitude, 'longitude': longitude, 'zoom': 7, 'pitch': 0},
+        'rasterUrl': raster_url,
+        'rasters': rasters,
+        'bounds': grid.bounds,
+        'bandwidths': list(grid.bandwidths),
+        'bandwidth': density.DEFAULT_BANDWIDTH,
+        'weightings': list(grid.weights),
+        'weighting': density.DEFAULT_WEIGHTING,
+        'ramp': [DENSITY_RAMP.start, DENSITY_RAMP.end],
+        'unit': '명/km²',
+    }
+    return DENSITY_PAGE % {
+        'title': name,
+        'deck_script': deck_binary.DECK_SCRIPT,
+        'maplibre_script': deck_binary.MAPLIBRE_SCRIPT,
+        'maplibre_css': deck_binary.MAPLIBRE_CSS,
+        'config': json.dumps(config, ensure_ascii=False).replace('</', '<\\/'),
+    }
+
+
+def render_black_spot(year):
+    return black_spot_deck(load_black_spot(year)).to_html(as_string=True)
+
+
+def render_black_spot_binary(year, name):
+    # {'html', 'bin', 'json'} for map_routes; name is the route the page is
+    # served under.  Reads that year's file only (year_maps.map_key).
+    return black_spot_binary(load_black_spot(year), name)
+
+
+def render_changed_hotspots(store, start, end, name):
+    return changed_hotspots_binary(store, start, end, name)
+
+
+def render_live_vds(store, name, live_url):
+    return live_vds_binary(store, name, live_url)
+
+
+def render_death_scatter():
+    return death_scatter_deck(load_final()).to_html(as_string=True)
+
+
+def render_death_tiles(tile_url, center):
+    return death_tile_deck(tile_url, center).to_html(as_string=True)
+
+
+def inline_density_rasters(grid):
+    # Every bandwidth x weighting surface of the grid as a data: URL
+    rasters = {}
+    for bandwidth in grid.bandwidths:
+        for weighting in grid.weights:
+            png, peak = grid.raster(bandwidth, weighting)
+            rasters[f'{bandwidth}|{weighting}'] = {
+                'url': 'data:image/png;base64,' + base64.b64encode(png).decode('ascii'),
+                'peak': peak,
+            }
+    return rasters
+
+
+def render_death_density(name, raster_url, grid):
+    return death_density_page(name, raster_url, grid)
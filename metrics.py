@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 요청 / 단계별 계측
+#
+# In-process counters and histograms in the Prometheus text format, served
+# at /metrics on app.server:
+#
+#   dash_callback_seconds / _cpu_seconds_total / _response_bytes / _calls_total
+#       every server-side Dash callback, JSON serialization included
+#   analysis_stage_seconds / _cpu_seconds_total
+#       data preparation (startup.stage) and figure builds / serialization
+#   analysis_cache_requests_total          figure cache hits and misses
+#   analysis_http_responses_total / _response_bytes
+#       every response by endpoint (and map name): iframe page, buffer and
+#       tile payload sizes, 304s
+#
+# Each process keeps its own numbers.  Under gunicorn (gunicorn.conf.py)
+# they are aggregated across the workers through a directory: every process
+# writes its numbers to its own file there at most every FLUSH_SECONDS, and
+# /metrics, whichever worker answers it, sums the files of every process,
+# workers that have exited included, so counters never go backwards.  A
+# forked worker starts from zero rather than from the master's numbers,
+# which the master's own file reports once.
+#
+# A callback slower than ANALYSIS_SLOW_CALLBACK_MS is logged.  A sampled
+# fraction of calls (ANALYSIS_PROFILE_SAMPLE, e.g. 0.05) runs under cProfile,
+# and when such a call is also slow its top functions are logged and the
+# profile is written to ANALYSIS_PROFILE_DIR when that is set.
+
+import cProfile
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from dash.exceptions import PreventUpdate
+
+METRICS_URL = '/metrics'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7, 1e8)
+
+SLOW_CALLBACK_SECONDS = float(os.environ.get('ANALYSIS_SLOW_CALLBACK_MS', '0')) / 1000  # 0 = off
+PROFILE_SAMPLE = float(os.environ.get('ANALYSIS_PROFILE_SAMPLE', '0'))
+PROFILE_DIR = os.environ.get('ANALYSIS_PROFILE_DIR')
+PROFILE_LINES = 20
+# Where gunicorn.conf.py aggregates the workers' numbers (default: metrics/
+# under shared.SHARED_DIR)
+METRICS_DIR = os.environ.get('ANALYSIS_METRICS_DIR')
+# A process writes its file at most this often, and only after a change
+FLUSH_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Counter:
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+        _changed.set()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    @staticmethod
+    def merge(total, values):
+        for labels, value in values.items():
+            total[labels] = total.get(labels, 0) + value
+        return total
+
+    def samples(self, values=None):
+        for labels, value in sorted((self.snapshot() if values is None else values).items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets) + (float('inf'),)
+        # labels -> [per-bucket counts, sum]
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * len(self.buckets), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+        _changed.set()
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: [list(counts), total] for labels, (counts, total) in self.values.items()}
+
+    @staticmethod
+    def merge(total, values):
+        for labels, (counts, value) in values.items():
+            state = total.setdefault(labels, [[0] * len(counts), 0.0])
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += value
+        return total
+
+    def samples(self, values=None):
+        for labels, (counts, total) in sorted((self.snapshot() if values is None else values).items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labelnames, labels, [('le', _number(bound))])
+                yield f'{self.name}_bucket{le} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def reset(self):
+        # A forked child starts from zero: its parent's numbers are the parent's
+        for metric in self.metrics:
+            metric.values = {}
+            metric.lock = threading.Lock()
+
+    def snapshot(self):
+        # JSON-able {metric name: [[labels, value], ...]}
+        return {metric.name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+                for metric in self.metrics}
+
+    def render(self, snapshots=None):
+        # snapshots: Registry.snapshot() of every process to sum (None: this
+        # process only)
+        lines = []
+        for metric in self.metrics:
+            values = None
+            if snapshots is not None:
+                values = {}
+                for snapshot in snapshots:
+                    metric.merge(values, {tuple(labels): value for labels, value in snapshot.get(metric.name, ())})
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(values))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+# Set on every update; the flusher of multiprocess mode waits for it
+_changed = threading.Event()
+# Multiprocess mode: the directory and this process's file in it
+_directory = None
+_path = None
+_flush_lock = threading.Lock()
+
+CALLBACK_SECONDS = REGISTRY.add(Histogram(
+    'dash_callback_seconds', 'Wall time of server-side Dash callbacks, JSON serialization included', ('callback',)))
+CALLBACK_CPU = REGISTRY.add(Counter(
+    'dash_callback_cpu_seconds_total', 'CPU time of the calling thread in Dash callbacks', ('callback',)))
+CALLBACK_BYTES = REGISTRY.add(Histogram(
+    'dash_callback_response_bytes', 'Size of Dash callback responses', ('callback',), BYTES_BUCKETS))
+CALLBACK_CALLS = REGISTRY.add(Counter(
+    'dash_callback_calls_total', 'Dash callback calls by outcome (ok, prevented, error)', ('callback', 'outcome')))
+STAGE_SECONDS = REGISTRY.add(Histogram(
+    'analysis_stage_seconds', 'Wall time of data preparation and figure stages', ('stage',)))
+STAGE_CPU = REGISTRY.add(Counter(
+    'analysis_stage_cpu_seconds_total', 'CPU time of the calling thread in data preparation and figure stages',
+    ('stage',)))
+CACHE_REQUESTS = REGISTRY.add(Counter(
+    'analysis_cache_requests_total', 'Cache lookups by cache and result (hit, disk, miss)', ('cache', 'result')))
+HTTP_RESPONSES = REGISTRY.add(Counter(
+    'analysis_http_responses_total', 'Responses by endpoint and status', ('endpoint', 'status')))
+HTTP_BYTES = REGISTRY.add(Histogram(
+    'analysis_http_response_bytes', 'Response body size by endpoint and map name', ('endpoint', 'name'),
+    BYTES_BUCKETS))
+
+
+def observe_stage(name, seconds, cpu_seconds):
+    STAGE_SECONDS.observe((name,), seconds)
+    STAGE_CPU.inc((name,), cpu_seconds)
+
+
+@contextmanager
+def timed(name):
+    # Wall and CPU time of a stage that runs per request
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start, time.thread_time() - cpu_start)
+
+
+def _report_slow(name, seconds, cpu_seconds, size, profile):
+    logger.warning('slow callback %s: %.3f s wall, %.3f s cpu, %d bytes', name, seconds, cpu_seconds, size)
+    if profile is None:
+        return
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    logger.warning('profile of %s\n%s', name, stream.getvalue())
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile.dump_stats(os.path.join(PROFILE_DIR, f'{name}-{time.time_ns()}-{os.getpid()}.prof'))
+
+
+def instrument(func, name):
+    # func is a Dash callback as stored in app.callback_map: it returns the
+    # serialized JSON response
+    def instrumented(*args, **kwargs):
+        profile = cProfile.Profile() if PROFILE_SAMPLE and random.random() < PROFILE_SAMPLE else None
+        outcome, size = 'error', 0
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            result = func(*args, **kwargs)
+            outcome = 'ok'
+            size = len(result.encode('utf-8')) if isinstance(result, str) else len(result or b'')
+            return result
+        except PreventUpdate:
+            outcome = 'prevented'
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            seconds, cpu_seconds = time.perf_counter() - start, time.thread_time() - cpu_start
+            CALLBACK_SECONDS.observe((name,), seconds)
+            CALLBACK_CPU.inc((name,), cpu_seconds)
+            CALLBACK_CALLS.inc((name, outcome))
+            if outcome == 'ok':
+                CALLBACK_BYTES.observe((name,), size)
+            if SLOW_CALLBACK_SECONDS and seconds >= SLOW_CALLBACK_SECONDS:
+                _report_slow(name, seconds, cpu_seconds, size, profile)
+
+    instrumented.__name__ = name
+    instrumented.__wrapped__ = func
+    instrumented.instrumented = True
+    return instrumented
+
+
+def instrument_callbacks(app):
+    # Wraps every server-side callback registered so far; clientside
+    # callbacks have no function here and never reach the server
+    for entry in app.callback_map.values():
+        func = entry.get('callback')
+        if func is not None and not getattr(func, 'instrumented', False):
+            entry['callback'] = instrument(func, func.__name__)
+    return app
+
+
+def _record_response(response):
+    from flask import request
+
+    endpoint = request.endpoint or 'unknown'
+    HTTP_RESPONSES.inc((endpoint, str(response.status_code)))
+    # Streamed map files carry their length; buffered bodies are measured
+    size = response.content_length
+    if size is None:
+        size = response.calculate_content_length()
+    if size is not None:
+        args = request.view_args or {}
+        # Filtered variants (<name>~<token>) are counted under their map
+        name = args.get('name', '').partition('~')[0] + (f'.{args["extension"]}' if 'extension' in args else '')
+        HTTP_BYTES.observe((endpoint, name), size)
+    return response
+
+
+def flush():
+    # Writes this process's numbers to its file (multiprocess mode only)
+    if _directory is None:
+        return
+    with _flush_lock:
+        payload = json.dumps(REGISTRY.snapshot(), ensure_ascii=False, separators=(',', ':'))
+        fd, tmp_path = tempfile.mkstemp(dir=_directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(payload)
+        os.replace(tmp_path, _path)
+
+
+def _flusher():
+    while True:
+        _changed.wait()
+        # Batches the updates of the next FLUSH_SECONDS into one write
+        time.sleep(FLUSH_SECONDS)
+        _changed.clear()
+        try:
+            flush()
+        except OSError:
+            logger.exception('writing metrics to %s failed', _directory)
+
+
+def _start_process():
+    # This process's file, named so that a reused pid never overwrites an
+    # exited worker's numbers, and the thread that keeps it current
+    global _path
+    _path = os.path.join(_directory, f'{os.getpid()}-{time.time_ns()}.json')
+    flush()
+    threading.Thread(target=_flusher, name='metrics-flush', daemon=True).start()
+
+
+def _after_fork():
+    # Threads do not survive a fork, and a lock may have been held by one
+    # that did not: the child starts over with new ones
+    global _changed, _flush_lock
+    if _directory is not None:
+        _changed, _flush_lock = threading.Event(), threading.Lock()
+        REGISTRY.reset()
+        _start_process()
+
+
+def multiprocess(directory, clear=True):
+    # Aggregate across this process and every process forked from it.  Called
+    # in the gunicorn master before the workers fork; clear drops the files
+    # of earlier runs.
+    global _directory
+    os.makedirs(directory, exist_ok=True)
+    if clear:
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
+    _directory = directory
+    _start_process()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def collect():
+    # Registry.snapshot() of every process writing to the directory
+    flush()
+    snapshots = []
+    for path in glob.glob(os.path.join(_directory, '*.json')):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            # Replaced while being read; its next version has the numbers
+            continue
+    return snapshots
+
+
+def _respond():
+    from flask import Response
+    body = REGISTRY.render(collect() if _directory is not None else None)
+    return Response(body, content_type=CONTENT_TYPE, headers={'Cache-Control': 'no-store'})
+
+
+def register(server, url=METRICS_URL):
+    server.add_url_rule(url, 'metrics', _respond)
+    server.after_request(_record_response)
+    return server
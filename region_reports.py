@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 지역별 정적 리포트
+#
+# The notebook dashboard (너_납치된거야.py) as static HTML per 발생지시도, for
+# offices that want a snapshot without running Dash: the seasonal, monthly,
+# weekday and hourly charts (charts.py) over the region's slice of the
+# aggregate cube, the 사망지점 and 사망사고 밀도 maps of its accidents, and the
+# black-spot maps.  Regions are rendered in a process pool like the year maps
+# (year_maps.py), so with a core per region the batch takes about the time
+# of the slowest region.
+#
+# What every region would otherwise repeat -- plotly.js and the black-spot
+# pages -- is written once under assets/, named by content hash, and
+# referenced from each region's page:
+#
+#   <out>/index.html                          regions and their accident counts
+#   <out>/assets/plotly-<hash>.min.js
+#   <out>/assets/black-spot-<year>-<hash>.html
+#   <out>/<region>/index.html                 charts, map iframes
+#   <out>/<region>/death-analysis.html        ScatterplotLayer of the region
+#   <out>/<region>/death-density.html         density rasters inlined
+#
+# The bundle opens straight from the file system; the map pages load deck.gl
+# and the basemap from their CDNs like every pydeck page.
+#
+#   python region_reports.py [--regions 경기 경북] [--out reports] [--workers 4]
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import build_cache
+
+ASSET_DIR = 'assets'
+# What open() gives a new file: 0o666 less the umask (read once; os.umask
+# can only be read by setting it)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+REGION_COLUMN = '발생지시도'
+
+# Chart id -> (builder name in charts.py, keyword arguments, width), in the
+# notebook's order and with its per-traffic pie
+REPORT_CHARTS = {
+    'seasonal-death-pie-chart': ('build_pie', {'per_traffic': True}, '33%'),
+    'monthly-death-bar-chart': ('build_monthly_bar', {}, '34%'),
+    'weekday-death-bar-chart': ('build_weekday_bar', {}, '33%'),
+    'hourly-death-bar-chart': ('build_hourly_bar', {}, '100%'),
+}
+
+_PAGE = '''<!DOCTYPE html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <meta name="viewport" content="width=device-width, initial-scale=1" />
+    <title>%(title)s</title>
+%(head)s
+    <style>
+      body { margin: 0 8px; background: #111; color: #eee; font-family: Helvetica, Arial, sans-serif; }
+      h1, h6 { text-align: center; }
+      a { color: #9cf; }
+      .chart { display: inline-block; vertical-align: top; }
+      iframe { width: 100%%; border: 0; }
+    </style>
+  </head>
+  <body>
+    <h1>%(heading)s</h1>
+    <h6>made by. 너 납치된거야 조</h6>
+%(body)s
+  </body>
+</html>
+'''
+
+
+def _slug(region):
+    # Directory name of a region
+    return re.sub(r'[^0-9A-Za-z가-힣]+', '_', str(region)).strip('_') or 'region'
+
+
+def _write(path, content):
+    body = content.encode('utf-8') if isinstance(content, str) else content
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    # mkstemp creates 0600; the bundle is read by other users and web servers
+    os.fchmod(fd, FILE_MODE)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(body)
+    os.replace(tmp_path, path)
+    return len(body)
+
+
+def write_asset(directory, name, content):
+    # Stored once per content under assets/; returns the path relative to
+    # the bundle root
+    body = content.encode('utf-8') if isinstance(content, str) else content
+    stem, extension = name.split('.', 1)
+    file_name = f'{stem}-{hashlib.sha256(body).hexdigest()[:12]}.{extension}'
+    path = os.path.join(directory, ASSET_DIR, file_name)
+    if not os.path.exists(path):
+        _write(path, body)
+    return f'{ASSET_DIR}/{file_name}'
+
+
+def _page(title, heading, body, head=''):
+    return _PAGE % {'title': html.escape(title), 'heading': html.escape(heading), 'head': head, 'body': body}
+
+
+def _script_json(value):
+    # JSON inside <script>, safe against '</script>' in labels
+    return value.replace('</', '<\\/')
+
+
+def black_spot_pages(years, workers=None):
+    # The notebook's pydeck pages, through the build cache when there is one
+    from year_maps import build_years, render_years
+
+    if not build_cache.BUILD_DIR:
+        return render_years(years, 'pydeck', workers)
+    pages = []
+    for paths in build_years(years, 'pydeck', workers=workers):
+        with open(paths['html'], 'r', encoding='utf-8') as file:
+            pages.append(file.read())
+    return pages
+
+
+def write_shared_assets(directory, years, workers=None):
+    # {'plotly': path, 'black-spot': {year: path}}, relative to the bundle root
+    from plotly.offline import get_plotlyjs
+
+    return {
+        'plotly': write_asset(directory, 'plotly.min.js', get_plotlyjs()),
+        'black-spot': {year: write_asset(directory, f'black-spot-{year}.html', page)
+                       for year, page in zip(years, black_spot_pages(years, workers))},
+    }
+
+
+def region_figures(cube, region):
+    # {chart id: figure JSON} of the region's slice of the cube
+    import charts
+
+    filters = {REGION_COLUMN: [region]}
+    return {chart_id: getattr(charts, builder)(cube, filters, **options).to_json()
+            for chart_id, (builder, options, _) in REPORT_CHARTS.items()}
+
+
+def region_maps(points):
+    # {file name: page} of the region's accidents; none when it has no points
+    from maps import DEATH_MEASURES, death_density_grid, death_density_page, death_scatter_deck, inline_density_rasters
+
+    if not len(points):
+        return {}
+    scatter = death_scatter_deck(points[list(DEATH_MEASURES) + ['x좌표값', 'y좌표값']]).to_html(as_string=True)
+    grid = death_density_grid(points)
+    return {
+        'death-analysis.html': scatter,
+        'death-density.html': death_density_page('death-density', None, grid, inline_density_rasters(grid)),
+    }
+
+
+def region_page(region, figures, maps, assets):
+    # The region's index.html; assets are relative to the bundle root, one
+    # directory up
+    charts = '\n'.join(f'    <div id="{chart_id}" class="chart" style="width: {width}"></div>'
+                       for chart_id, (_, _, width) in REPORT_CHARTS.items())
+    frames = [(name, title) for name, title in (('death-analysis.html', '사망지점 분석'),
+                                                ('death-density.html', '사망사고 밀도')) if name in maps]
+    frames += [(f'../{path}', f'{year}년 블랙스팟') for year, path in assets['black-spot'].items()]
+    iframes = '\n'.join(f'    <h3>{html.escape(title)}</h3>\n'
+                        f'    <iframe src="{html.escape(src)}" style="height: 70vh"></iframe>' for src, title in frames)
+    figures_json = '{' + ','.join(f'{json.dumps(chart_id)}:{figure}' for chart_id, figure in figures.items()) + '}'
+    body = f'''    <p><a href="../index.html">← 전체 지역</a></p>
+{charts}
+{iframes}
+    <script>
+      const figures = {_script_json(figures_json)};
+      Object.entries(figures).forEach(([id, figure]) =>
+        Plotly.newPlot(id, figure.data, figure.layout, {{responsive: true}}));
+    </script>'''
+    head = f'    <script src="../{html.escape(assets["plotly"])}"></script>'
+    return _page(f'{region} 사망교통사고 분석', f'고속도로 사망교통사고 분석 · {region}', body, head)
+
+
+def build_region(region, directory, assets):
+    # Writes <directory>/<region>/; returns (files, bytes written, seconds)
+    from datasets import load_final
+    from incremental import load_aggregates
+
+    start = time.perf_counter()
+    figures = region_figures(load_aggregates().cube, region)
+    final = load_final()
+    maps = region_maps(final[final[REGION_COLUMN] == region])
+    region_dir = os.path.join(directory, _slug(region))
+    written = _write(os.path.join(region_dir, 'index.html'), region_page(region, figures, maps, assets))
+    for file_name, page in maps.items():
+        written += _write(os.path.join(region_dir, file_name), page)
+    return 1 + len(maps), written, time.perf_counter() - start
+
+
+def index_page(regions, counts):
+    rows = '\n'.join(f'      <li><a href="{html.escape(_slug(region))}/index.html">{html.escape(str(region))}</a>'
+                     f' · 사고 {counts[region]:,}건</li>' for region in regions)
+    return _page('지역별 사망교통사고 분석', '지역별 고속도로 사망교통사고 분석', f'    <ul>\n{rows}\n    </ul>')
+
+
+def build_reports(directory, regions=None, workers=None):
+    # Every region's bundle under directory; returns {region: build_region()}
+    from datasets import black_spot_years
+    from death_cube import COUNT_MEASURE
+    from incremental import load_aggregates
+
+    # Brings the aggregate snapshot up to date here, so the workers only read it
+    cube = load_aggregates().cube
+    counts = dict(zip(cube.labels[REGION_COLUMN],
+                      cube.query(COUNT_MEASURE, by=(REGION_COLUMN,)).astype(int).tolist()))
+    regions = list(regions or cube.labels[REGION_COLUMN])
+    unknown = [region for region in regions if region not in counts]
+    if unknown:
+        raise ValueError(f'unknown {REGION_COLUMN}: {unknown}')
+
+    assets = write_shared_assets(directory, black_spot_years(), workers)
+    task = partial(build_region, directory=directory, assets=assets)
+    workers = min(workers or os.cpu_count() or 1, len(regions))
+    if workers <= 1:
+        results = [task(region) for region in regions]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(task, regions))
+    _write(os.path.join(directory, 'index.html'), index_page(regions, counts))
+    return dict(zip(regions, results)), assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='지역별 정적 리포트')
+    parser.add_argument('--regions', nargs='+', help=f'{REGION_COLUMN} values (default: every one in the data)')
+    parser.add_argument('--out', default='reports', help='bundle directory')
+    parser.add_argument('--workers', type=int, help='processes (default: one per core)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, assets = build_reports(args.out, args.regions, args.workers)
+    for region, (files, written, seconds) in results.items():
+        print(f'{str(region):<8}{files:>3} files {written / 1e6:>8.2f} MB {seconds:>8.2f} s')
+    shared = [assets['plotly']] + list(assets['black-spot'].values())
+    shared_bytes = sum(os.path.getsize(os.path.join(args.out, path)) for path in shared)
+    print(f'shared assets  {len(shared)} files {shared_bytes / 1e6:>8.2f} MB, written once for {len(results)} regions')
+    print(f'{len(results)} regions in {time.perf_counter() - start:.2f} s '
+          f'(slowest region {max(seconds for _, _, seconds in results.values()):.2f} s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 데이터셋 스키마
+#
+# Declared column types of the accident files (리얼 찐최종vds사고결합.csv,
+# final.csv and the batches appended to them) and of the black-spot files.
+# datasets.py loads every CSV through its schema: the parsed frame is
+# validated once, then kept (and cached on disk) in the compact form below
+# instead of pandas' defaults of Python strings, int64 and float64.
+#
+#   category   pandas Categorical: int8/int16 codes into one copy of each
+#              label.  Closed sets (주야, 요일, 계절, ...) keep their declared
+#              order and reject anything else.
+#   count      non-negative integers in the declared width; a value that
+#              does not fit is a validation error, never a silent wrap
+#   float      float32 for accident coordinates (< 1 m at Korean
+#              longitudes); float64 where values are shown in tooltips or
+#              compared to the files' 10 significant digits
+#   datetime   '발생년월일시', written as %Y%m%d%H
+#   text       plain strings, for values unique per row (black-spot WKT)
+#
+#   python schema.py report [--columns]    # footprint per dataset, default dtypes vs schema
+
+import argparse
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# '발생년월일시' is stored as e.g. 2021062406
+DATETIME_FORMAT = '%Y%m%d%H'
+
+# Bump when conform() changes what it produces for the same declaration
+SCHEMA_VERSION = 1
+
+Column = namedtuple('Column', ['kind', 'dtype', 'categories', 'nullable'], defaults=(None, None, False))
+
+KINDS = ('category', 'count', 'float', 'datetime', 'text')
+
+WEEKDAYS = ('월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일')
+
+# Column -> declaration, in file order
+ACCIDENT_SCHEMA = {
+    '주야': Column('category', categories=('주간', '야간')),
+    '요일': Column('category', categories=WEEKDAYS),
+    '사망자수': Column('count', 'int8'),
+    '사상자수': Column('count', 'int16'),
+    '중상자수': Column('count', 'int16'),
+    '경상자수': Column('count', 'int16'),
+    '부상신고자수': Column('count', 'int16'),
+    '발생지시도': Column('category'),
+    '사고유형_대분류': Column('category'),
+    '사고유형_중분류': Column('category'),
+    '사고유형': Column('category'),
+    '법규위반': Column('category'),
+    '도로형태_대분류': Column('category'),
+    '도로형태': Column('category'),
+    '당사자종별_1당_대분류': Column('category'),
+    '당사자종별_2당_대분류': Column('category'),
+    'x좌표값': Column('float', 'float32'),
+    'y좌표값': Column('float', 'float32'),
+    '계절': Column('category', categories=('봄', '여름', '가을', '겨울')),
+    # Accidents snapped to no segment have neither (segment_match.py)
+    '사고 발생 VDS_CD': Column('category', nullable=True),
+    '사고발생 line': Column('category', nullable=True),
+    '발생년월일시': Column('datetime'),
+    '교통량': Column('count', 'int32'),
+    '계절별/교통량(봄)': Column('float', 'float64', nullable=True),
+    '계절별/교통량(여름)': Column('float', 'float64', nullable=True),
+    '계절별/교통량(가을)': Column('float', 'float64', nullable=True),
+    '계절별/교통량(겨울)': Column('float', 'float64', nullable=True),
+}
+
+# final.csv: the accident columns without the VDS traffic join
+FINAL_SCHEMA = {name: column for name, column in ACCIDENT_SCHEMA.items()
+                if name != '교통량' and not name.startswith('계절별/')}
+
+BLACK_SPOT_SCHEMA = {
+    'VDS_CD': Column('category'),
+    'TRFFCVLM': Column('count', 'int32'),
+    'SPD_AVG': Column('float', 'float64'),
+    'OCCPNCY': Column('float', 'float64'),
+    'Start or End': Column('category', categories=('S', 'E')),
+    'point': Column('float', 'float64'),
+    'geometry': Column('text'),
+    'length': Column('count', 'int32'),
+    'count': Column('count', 'int16'),
+    'black-spot': Column('float', 'float64'),
+}
+
+
+class SchemaError(ValueError):
+    # Every problem found in a frame, joined with '; '
+    def __init__(self, problems, source=''):
+        self.problems = list(problems)
+        prefix = f'{source}: ' if source else ''
+        super().__init__(prefix + '; '.join(self.problems))
+
+
+def schema_key(schema):
+    # JSON-able form of a declaration, part of the datasets cache key
+    return [SCHEMA_VERSION] + [[name, *column] for name, column in schema.items()]
+
+
+def datetime_columns(schema):
+    return tuple(name for name, column in schema.items() if column.kind == 'datetime')
+
+
+def csv_dtypes(schema):
+    # read_csv dtypes that skip the Python-string stage for categories
+    return {name: 'category' for name, column in schema.items() if column.kind == 'category'}
+
+
+def _conform_column(name, values, column, problems):
+    # values in the declared type, or None after appending to problems
+    if column.kind == 'datetime':
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.to_datetime(values.astype(str), format=DATETIME_FORMAT, errors='coerce')
+        if values.isna().any():
+            problems.append(f'{name}: {int(values.isna().sum())} unparseable timestamps')
+            return None
+        return values
+
+    if column.kind in ('category', 'text'):
+        if not column.nullable and values.isna().any():
+            problems.append(f'{name}: {int(values.isna().sum())} missing values')
+            return None
+        if column.kind == 'text':
+            return values.astype(object)
+        if column.categories is None:
+            return values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+        unknown = sorted(set(values.dropna()) - set(column.categories))
+        if unknown:
+            problems.append(f'{name}: unknown values {unknown}')
+            return None
+        return values.astype(pd.CategoricalDtype(column.categories))
+
+    numeric = pd.to_numeric(values, errors='coerce')
+    bad = numeric.isna() & values.notna() if column.nullable else numeric.isna()
+    if bad.any():
+        problems.append(f'{name}: {int(bad.sum())} non-numeric values')
+        return None
+    if column.kind == 'count':
+        if (numeric < 0).any() or (numeric % 1 != 0).any():
+            problems.append(f'{name}: counts must be non-negative integers')
+            return None
+        if len(numeric) and numeric.max() > np.iinfo(column.dtype).max:
+            problems.append(f'{name}: {numeric.max()} does not fit {column.dtype}')
+            return None
+    return numeric.astype(column.dtype)
+
+
+def conform(frame, schema, source=''):
+    # The frame with the schema's columns in its order and dtypes; raises
+    # SchemaError listing every problem found
+    problems = []
+    missing = [name for name in schema if name not in frame.columns]
+    extra = [name for name in frame.columns if name not in schema]
+    if missing:
+        problems.append(f'missing columns: {missing}')
+    if extra:
+        problems.append(f'unexpected columns: {extra}')
+    if problems:
+        raise SchemaError(problems, source)
+
+    columns = {name: _conform_column(name, frame[name], column, problems) for name, column in schema.items()}
+    if problems:
+        raise SchemaError(problems, source)
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+
+def concat(frames, schema):
+    # pd.concat that keeps category columns categorical: frames coded
+    # against different labels get the union of them first
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0]
+    frames = [frame.copy(deep=False) for frame in frames]
+    for name, column in schema.items():
+        if column.kind != 'category' or column.categories is not None:
+            continue
+        labels = pd.api.types.union_categoricals([frame[name] for frame in frames]).categories
+        for frame in frames:
+            frame[name] = frame[name].cat.set_categories(labels)
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_usage(frame):
+    # Bytes per column, strings included
+    return frame.memory_usage(index=False, deep=True)
+
+
+def report(show_columns=False):
+    from datasets import (ACCIDENT_CSV, BLACK_SPOT_CSV, FINAL_CSV, _resolve, black_spot_years, load_black_spot,
+                          load_base_accidents, load_base_final)
+
+    datasets = [(ACCIDENT_CSV, 'cp949', load_base_accidents), (FINAL_CSV, 'cp949', load_base_final)]
+    datasets += [(BLACK_SPOT_CSV.format(year=year), None, lambda year=year: load_black_spot(year))
+                 for year in black_spot_years()]
+    print(f"{'dataset':<36}{'rows':>10}{'default MB':>12}{'schema MB':>11}{'ratio':>8}")
+    for file_name, encoding, load in datasets:
+        before = memory_usage(pd.read_csv(_resolve(file_name), encoding=encoding))
+        frame = load()
+        after = memory_usage(frame)
+        print(f'{file_name:<36}{len(frame):>10,}{before.sum() / 1e6:>12.2f}{after.sum() / 1e6:>11.2f}'
+              f'{before.sum() / max(after.sum(), 1):>7.1f}x')
+        if show_columns:
+            for name in after.index:
+                print(f'  {name:<34}{"":>10}{before[name] / 1e6:>12.3f}{after[name] / 1e6:>11.3f}'
+                      f'{before[name] / max(after[name], 1):>7.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='데이터셋 스키마')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report_parser = subparsers.add_parser('report', help='memory footprint per dataset, default dtypes vs schema')
+    report_parser.add_argument('--columns', action='store_true', help='break the footprint down per column')
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        report(args.columns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 연도별 블랙스팟 구간 저장소
+#
+# Every black-spot file describes the same VDS segments, but each year was
+# loaded (and its WKT parsed) as an independent table, and the files do not
+# even agree on column order (2021: TRFFCVLM, SPD_AVG, OCCPNCY; 2022:
+# TRFFCVLM, OCCPNCY, SPD_AVG).  SegmentStore aligns them by column name into
+# one index keyed by VDS_CD:
+#
+#   - per segment, once: VDS_CD, geometry (text and parsed LineStrings),
+#     length, 'Start or End', as listed by the first year added with it
+#   - per year: one float64 array per measure column (TRFFCVLM, SPD_AVG,
+#     OCCPNCY, point, count, black-spot), NaN where the segment is absent
+#   - per year, only where a later file disagrees with the first listing (a
+#     re-surveyed or re-drawn segment): that year's geometry, length and
+#     'Start or End' of those segments.  Without a year, a segment is
+#     described as the latest year listing it does.
+#
+# Adding a year costs that year's measure arrays plus the geometry of
+# segments not seen before or changed.  Year-over-year deltas and ranks are
+# computed over the (years x segments) matrices in one pass.
+#
+#   python segment_store.py [--column black-spot] [--top 20]
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from datasets import black_spot_years, load_black_spot
+from schema import BLACK_SPOT_SCHEMA, conform
+from wkt_lines import concatenate, parse_linestrings
+
+KEY_COLUMN = 'VDS_CD'
+# Shared by every year of a segment
+SEGMENT_COLUMNS = ('geometry', 'length', 'Start or End')
+# Measured per year
+YEAR_COLUMNS = ('TRFFCVLM', 'SPD_AVG', 'OCCPNCY', 'point', 'count', 'black-spot')
+# Column order of the frames handed back (the 2021 file's order, and the
+# one schema.BLACK_SPOT_SCHEMA declares)
+FILE_COLUMNS = tuple(BLACK_SPOT_SCHEMA)
+
+
+def align_columns(df):
+    # One year's table in FILE_COLUMNS order, matched by name rather than
+    # position; missing columns are an error, extra ones are dropped
+    missing = [column for column in FILE_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f'black-spot table is missing columns: {missing}')
+    if df[KEY_COLUMN].duplicated().any():
+        raise ValueError(f'duplicate {KEY_COLUMN} in black-spot table')
+    return df[list(FILE_COLUMNS)]
+
+
+class SegmentStore:
+
+    def __init__(self):
+        self.codes = np.empty(0, dtype=object)
+        self.positions = {}
+        self.segments = {column: np.empty(0, dtype=object) for column in SEGMENT_COLUMNS}
+        self.lines = parse_linestrings(np.empty(0, dtype=object))
+        # year -> (rows, {column: values}, LineStrings) of the segments whose
+        # SEGMENT_COLUMNS differ in that year's file from self.segments
+        self.revisions = {}
+        self.years = []
+        # column -> {year: float64 array over every segment}
+        self.data = {column: {} for column in YEAR_COLUMNS}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def lookup(self, code):
+        # Row of one VDS_CD, or -1
+        return self.positions.get(code, -1)
+
+    def rows(self, codes):
+        # Rows of many VDS_CDs (-1 for unknown ones)
+        get = self.positions.get
+        return np.fromiter((get(code, -1) for code in codes), dtype=np.int64, count=len(codes))
+
+    def add_year(self, year, df):
+        if year in self.years:
+            raise ValueError(f'year {year} is already in the store')
+        df = align_columns(df)
+        codes = df[KEY_COLUMN].to_numpy(dtype=object)
+        rows = self.rows(codes)
+
+        known = np.flatnonzero(rows >= 0)
+        new = np.flatnonzero(rows < 0)
+        if len(known):
+            self._revise(year, rows[known], df.iloc[known])
+        if len(new):
+            rows[new] = np.arange(len(self), len(self) + len(new))
+            self.positions.update(zip(codes[new].tolist(), rows[new].tolist()))
+            self.codes = np.concatenate([self.codes, codes[new]])
+            for column in SEGMENT_COLUMNS:
+                self.segments[column] = np.concatenate([self.segments[column],
+                                                        df[column].to_numpy(dtype=object)[new]])
+            # Only the new segments' WKT is parsed
+            self.lines = concatenate([self.lines, parse_linestrings(df['geometry'].to_numpy()[new])])
+            for by_year in self.data.values():
+                for other in by_year:
+                    by_year[other] = np.concatenate([by_year[other], np.full(len(new), np.nan)])
+
+        for column in YEAR_COLUMNS:
+            values = np.full(len(self), np.nan)
+            values[rows] = df[column].to_numpy(dtype=np.float64)
+            self.data[column][year] = values
+        self.years = sorted(self.years + [year])
+        return self
+
+    def _revise(self, year, rows, df):
+        # Keeps the year's own segment columns where they differ from the
+        # stored ones
+        changed = np.zeros(len(rows), dtype=bool)
+        for column in SEGMENT_COLUMNS:
+            changed |= self.segments[column][rows] != df[column].to_numpy(dtype=object)
+        if changed.any():
+            changed_df = df.iloc[np.flatnonzero(changed)]
+            self.revisions[year] = (rows[changed],
+                                    {column: changed_df[column].to_numpy(dtype=object) for column in SEGMENT_COLUMNS},
+                                    parse_linestrings(changed_df['geometry'].to_numpy()))
+
+    def _revised_rows(self, year):
+        # [(year, positions in its revision)] that apply to a listing: the
+        # year's own, or (None) each segment's latest year that lists it.  A
+        # year without a revision for a segment lists it as self.segments
+        # does, since that first listing never changes.
+        if year is not None:
+            return [(year, slice(None))] if year in self.revisions else []
+        latest = np.full(len(self), -1)
+        for other in self.years:
+            latest[self.present(other)] = other
+        applied = []
+        for other, (rows, _, _) in sorted(self.revisions.items()):
+            positions = np.flatnonzero(latest[rows] == other)
+            if len(positions):
+                applied.append((other, positions))
+        return applied
+
+    def segment_column(self, column, year=None):
+        # A SEGMENT_COLUMNS column over every segment as the year's file
+        # lists it (None: as the latest year listing each segment does)
+        values = self.segments[column]
+        revised = self._revised_rows(year)
+        if revised:
+            values = values.copy()
+            for other, positions in revised:
+                rows, columns, _ = self.revisions[other]
+                values[rows[positions]] = columns[column][positions]
+        return values
+
+    def segment_lines(self, rows=None, year=None):
+        # Parsed geometry of rows (default: every segment) as the year's file
+        # lists it (None: as the latest year listing each segment does)
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        revised = self._revised_rows(year)
+        if not revised:
+            return self.lines.take(rows)
+        parts, index, size = [self.lines], np.arange(len(self)), len(self)
+        for other, positions in revised:
+            revised_rows, _, lines = self.revisions[other]
+            index[revised_rows[positions]] = size + np.arange(len(revised_rows))[positions]
+            parts.append(lines)
+            size += len(lines)
+        return concatenate(parts).take(index[rows])
+
+    def present(self, year):
+        # Segments listed in that year's file
+        return ~np.isnan(self.data['TRFFCVLM'][year])
+
+    def column(self, column, year):
+        return self.data[column][year]
+
+    def matrix(self, column, years=None):
+        # (years x segments) float64
+        years = self.years if years is None else years
+        return np.vstack([self.data[column][year] for year in years])
+
+    def delta(self, column, start, end):
+        # end - start per segment; NaN unless the segment is in both years
+        return self.data[column][end] - self.data[column][start]
+
+    def ranks(self, column, years=None, ascending=False):
+        # Rank of every segment within each year (1 = highest by default;
+        # ties share the best rank, absent segments are NaN)
+        values = self.matrix(column, years)
+        return pd.DataFrame(values.T).rank(method='min', ascending=ascending).to_numpy().T
+
+    def rank_change(self, column, start, end):
+        # Places climbed from start to end (positive = moved up the ranking)
+        ranks = self.ranks(column, [start, end])
+        return ranks[0] - ranks[1]
+
+    def frame(self, year):
+        # That year's table as load_black_spot() gives it (FILE_COLUMNS
+        # order, schema dtypes)
+        rows = np.flatnonzero(self.present(year))
+        df = pd.DataFrame({KEY_COLUMN: self.codes[rows]})
+        for column in FILE_COLUMNS[1:]:
+            if column in SEGMENT_COLUMNS:
+                df[column] = self.segment_column(column, year)[rows]
+            else:
+                df[column] = self.data[column][year][rows]
+        return conform(df, BLACK_SPOT_SCHEMA)
+
+    def changed_hotspots(self, start, end, column='black-spot', top=None):
+        # Segments whose value changed between two years, largest change first:
+        # both years' values and ranks, the delta and the rank change
+        before, after = self.data[column][start], self.data[column][end]
+        change = after - before
+        ranks = self.ranks(column, [start, end])
+        rows = np.flatnonzero(np.nan_to_num(change) != 0)
+        rows = rows[np.argsort(-np.abs(change[rows]), kind='stable')]
+        if top is not None:
+            rows = rows[:top]
+        return pd.DataFrame({
+            'row': rows,
+            KEY_COLUMN: self.codes[rows],
+            f'{column} {start}': before[rows],
+            f'{column} {end}': after[rows],
+            'delta': change[rows],
+            f'rank {start}': ranks[0][rows],
+            f'rank {end}': ranks[1][rows],
+            'rank change': ranks[0][rows] - ranks[1][rows],
+        })
+
+
+def load_store(years=None):
+    # Every black-spot year found in DATA_DIR, in one store
+    store = SegmentStore()
+    for year in (black_spot_years() if years is None else years):
+        store.add_year(year, load_black_spot(year))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='연도별 블랙스팟 구간 변화')
+    parser.add_argument('--years', type=int, nargs=2, metavar=('START', 'END'),
+                        help='default: the first and last year in DATA_DIR')
+    parser.add_argument('--column', default='black-spot', choices=YEAR_COLUMNS)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    store = load_store()
+    start, end = args.years or (store.years[0], store.years[-1])
+    for year in store.years:
+        same = store.frame(year).equals(align_columns(load_black_spot(year)))
+        print(f'{year}          {int(store.present(year).sum()):>6,} segments  (round trip {"ok" if same else "differs"})')
+    print(f'segments      {len(store):>6,}  ({len(store.lines.coords):,} points stored once)')
+    for year, (rows, _, _) in sorted(store.revisions.items()):
+        print(f'{year}          {len(rows):>6,} segments re-listed with different geometry, length or S/E')
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(store.changed_hotspots(start, end, args.column, args.top).drop(columns='row').to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 워커 간 공유 데이터
+#
+# gunicorn forks its workers from one master.  What the dashboard serves is
+# prepared once as plain files -- the death-analysis cube as .npy arrays
+# under SHARED_DIR, every rendered deck map with its gzip/brotli encodings in
+# the build cache (build_cache.py) -- and workers attach read-only: the cube
+# is memory-mapped, the maps are streamed from the files
+# (map_routes.StoredMapEntry).  Their pages then exist once in the OS page
+# cache instead of once per worker heap.  Dataset columns
+# (coordinates, categorical codes) are already .npy files in the datasets
+# cache; datasets.load_encoded() maps them the same way.
+#
+#   python shared.py prepare                  # what gunicorn.conf.py runs
+#   python shared.py report [--workers 4]     # per-worker RSS, shared vs not
+#
+# ANALYSIS_SHARED_DATA=0 turns the sharing off (every worker builds its own
+# cube; maps still come from the build cache unless ANALYSIS_BUILD_DIR is
+# empty).
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Resolved like datasets.CACHE_DIR; repeated so that importing the app does
+# not import pandas (numpy, too, is only imported where the cube is touched)
+DATA_DIR = os.environ.get('ANALYSIS_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+SHARED_DIR = os.environ.get('ANALYSIS_SHARED_DIR', os.path.join(_CACHE_DIR, 'shared'))
+
+ENABLED = os.environ.get('ANALYSIS_SHARED_DATA', '1') != '0'
+
+# Bump when the cube layout changes
+CUBE_VERSION = 1
+
+
+def write_cube(cube, cube_dir):
+    # Same tmp-dir-then-rename pattern as datasets.write_cache
+    import numpy as np
+
+    parent = os.path.dirname(cube_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    measures = []
+    for position, (measure, values) in enumerate(cube.data.items()):
+        file_name = f'measure_{position}.npy'
+        np.save(os.path.join(tmp_dir, file_name), np.ascontiguousarray(values))
+        measures.append({'name': measure, 'file': file_name})
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump({'labels': cube.labels, 'measures': measures}, file, ensure_ascii=False)
+
+    try:
+        os.rename(tmp_dir, cube_dir)
+    except OSError:
+        # Another worker finished first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def attach_cube(cube_dir):
+    # Read-only memory-mapped cube; queries never write to it
+    import numpy as np
+
+    from death_cube import DeathCube
+
+    with open(os.path.join(cube_dir, 'meta.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    data = {
+        measure['name']: np.load(os.path.join(cube_dir, measure['file']), mmap_mode='r')
+        for measure in meta['measures']
+    }
+    return DeathCube(meta['labels'], data)
+
+
+def shared_cube(name, version, build):
+    cube_dir = os.path.join(SHARED_DIR, f'{name}-{CUBE_VERSION}-{version[:16]}')
+    if not os.path.isdir(cube_dir):
+        write_cube(build(), cube_dir)
+    return attach_cube(cube_dir)
+
+
+def prepare():
+    # Everything the workers attach to: cube, figure cache, rendered maps and
+    # the live feed's ingest process.  Called in the gunicorn master before
+    # it forks (gunicorn.conf.py); the tile indexes, density grids and the
+    # cross-filter bitmaps are built here too and inherited copy-on-write.
+    from app import app, cross_filter, death_analysis, share_vds_feed
+
+    death_analysis()
+    cross_filter()
+    map_routes = app.server.extensions['map_routes']
+    for name in map_routes.renderers:
+        map_routes.entry(name)
+    tile_routes = app.server.extensions['tile_routes']
+    for name in tile_routes.builders:
+        tile_routes.index(name)
+    density_routes = app.server.extensions['density_routes']
+    for name in density_routes.builders:
+        density_routes.grid(name)
+    share_vds_feed()
+
+
+def memory_usage():
+    # kB figures of the current process.  Pss splits every shared page between
+    # the processes mapping it, so summing it over workers gives their real
+    # footprint; Rss counts shared pages in full for each of them.
+    usage = {}
+    with open('/proc/self/smaps_rollup', 'r') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                usage[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': usage['Rss'],
+        'pss_kb': usage['Pss'],
+        'private_kb': usage['Private_Clean'] + usage['Private_Dirty'],
+        'shared_kb': usage['Shared_Clean'] + usage['Shared_Dirty'],
+    }
+
+
+def _serve_everything(app):
+    # What a worker holds after serving each page once
+    import base64
+
+    from app import DEATH_CHARTS, VALID_USERNAME_PASSWORD_PAIRS, death_analysis
+
+    user, password = next(iter(VALID_USERNAME_PASSWORD_PAIRS.items()))
+    headers = {'Authorization': 'Basic ' + base64.b64encode(f'{user}:{password}'.encode()).decode(),
+               'Accept-Encoding': 'gzip'}
+    client = app.server.test_client()
+    map_routes = app.server.extensions['map_routes']
+    for path in ['/', '/_dash-layout'] + [map_routes.url(name) for name in map_routes.renderers]:
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, (path, response.status_code)
+        response.close()
+    _, figure_cache = death_analysis()
+    for chart in DEATH_CHARTS:
+        figure_cache.get_figure(chart, {})
+
+
+def _worker(app, barrier, results):
+    _serve_everything(app)
+    barrier.wait()
+    results.put(memory_usage())
+    # Stay alive until every worker has measured, so the sharing is real
+    barrier.wait()
+
+
+def measure_workers(workers):
+    # Runs in a fresh interpreter: imports the app like a preloading master,
+    # prepares the shared data when enabled, then forks the workers
+    import multiprocessing
+
+    from app import app
+
+    if ENABLED:
+        prepare()
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(app, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    usage = [results.get() for _ in processes]
+    barrier.wait()
+    for process in processes:
+        process.join()
+    return {'master': memory_usage(), 'workers': usage}
+
+
+def report(workers):
+    modes = {}
+    for mode, enabled in (('private', '0'), ('shared', '1')):
+        env = dict(os.environ, ANALYSIS_SHARED_DATA=enabled)
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '_measure', '--workers', str(workers)],
+                                capture_output=True, text=True, check=True, env=env)
+        modes[mode] = json.loads(result.stdout.strip().splitlines()[-1])
+    return modes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='워커 간 공유 데이터')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('prepare', help='build the shared cube, figures and maps')
+    report_parser = subparsers.add_parser('report', help='per-worker RSS with and without sharing')
+    report_parser.add_argument('--workers', type=int, default=4)
+    report_parser.add_argument('--json', help='write the report to this file')
+    # One side of the report, run in a fresh interpreter
+    subparsers.add_parser('_measure').add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == 'prepare':
+        prepare()
+        return
+    if args.command == '_measure':
+        print(json.dumps(measure_workers(args.workers)))
+        return
+
+    modes = report(args.workers)
+    print(f"{'':<10}{'worker':>8}{'RSS MB':>10}{'PSS MB':>10}{'private MB':>12}{'shared MB':>11}")
+    for mode, result in modes.items():
+        for position, usage in enumerate(result['workers']):
+            print(f"{mode:<10}{position:>8}{usage['rss_kb'] / 1024:>10.1f}{usage['pss_kb'] / 1024:>10.1f}"
+                  f"{usage['private_kb'] / 1024:>12.1f}{usage['shared_kb'] / 1024:>11.1f}")
+        total_pss = sum(usage['pss_kb'] for usage in result['workers']) + result['master']['pss_kb']
+        print(f"{mode:<10}{'total':>8}{'':>10}{total_pss / 1024:>10.1f}   (PSS of master + workers)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(modes, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 콜드 스타트 측정
+#
+# stage() records wall time of named startup / first-use stages inside the
+# process, and reports wall / CPU time to metrics.py.  Run as a script it
+# measures a real cold start in a fresh interpreter: per-module import times
+# (from -X importtime), the stages recorded while importing app.py, and the
+# first requests that trigger the deferred work (layout, figures, maps).
+#
+#   python startup.py [--json startup_report.json]
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+STAGES = []
+_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name):
+    start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        with _lock:
+            STAGES.append((name, seconds))
+        metrics.observe_stage(name, seconds, time.thread_time() - cpu_start)
+
+
+# Runs in the child interpreter; prints a JSON report on the last line
+_CHILD = '''
+import base64, json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter() - start
+
+import startup
+user, password = next(iter(app.VALID_USERNAME_PASSWORD_PAIRS.items()))
+headers = {'Authorization': 'Basic ' + base64.b64encode(f'{user}:{password}'.encode()).decode()}
+client = app.server.test_client()
+map_routes = app.server.extensions['map_routes']
+paths = ['/', '/_dash-layout'] + [map_routes.url(name) for name in map_routes.versions]
+for path in paths:
+    with startup.stage(f'first GET {path.split("?")[0]}'):
+        status = client.get(path, headers=headers).status_code
+    assert status == 200, (path, status)
+print(json.dumps({'import_app': imported, 'stages': startup.STAGES}))
+'''
+
+
+def _parse_importtime(stderr, top):
+    # "import time: self [us] | cumulative | imported package"; nested imports
+    # are indented by two more spaces per level, only top-level ones are kept
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            modules.append((name.strip(), int(cumulative_us) / 1e6))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return modules[:top]
+
+
+def measure_cold_start(top=15):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _CHILD],
+                            capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    child = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'total_seconds': total,
+        'import_app_seconds': child['import_app'],
+        'stages': [{'name': name, 'seconds': seconds} for name, seconds in child['stages']],
+        'modules': [{'name': name, 'seconds': seconds} for name, seconds in _parse_importtime(result.stderr, top)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='콜드 스타트 측정')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--top', type=int, default=15, help='number of top-level modules to list')
+    args = parser.parse_args()
+
+    report = measure_cold_start(args.top)
+    print(f"{'interpreter + import app + first requests':<48}{report['total_seconds']:>9.3f} s")
+    print(f"{'import app':<48}{report['import_app_seconds']:>9.3f} s")
+    print('\nstages')
+    for item in report['stages']:
+        print(f"  {item['name']:<46}{item['seconds']:>9.3f} s")
+    print('\ntop-level imports (cumulative)')
+    for item in report['modules']:
+        print(f"  {item['name']:<46}{item['seconds']:>9.3f} s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
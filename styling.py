@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 라인 색상 / 두께 계산
+#
+# Vectorized replacement for the row-wise calculate_color / calculate_width
+# helpers.  A numeric column becomes an (n, 4) uint8 RGBA array and the
+# 'Start or End' column becomes a width array, each in a single pass.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# min_color / max_color are used for values at or beyond the thresholds;
+# everything in between is interpolated linearly from start to end.
+ColorRamp = namedtuple('ColorRamp', ['min_color', 'max_color', 'start', 'end', 'nan_color'])
+
+# 최소값은 흰색, 최대값은 빨간색, 그 사이는 노란색 -> 빨간색
+BLACK_SPOT_RAMP = ColorRamp(
+    min_color=(255, 255, 255, 255),
+    max_color=(255, 0, 0, 255),
+    start=(255, 255, 0, 255),
+    end=(255, 0, 0, 255),
+    nan_color=(0, 0, 0, 0),
+)
+
+# 연도별 변화: 증가는 빨간색, 감소는 파란색 (변화가 클수록 진하게), 변화 없음은 회색
+INCREASE_RAMP = ColorRamp(
+    min_color=(255, 210, 210, 255),
+    max_color=(255, 0, 0, 255),
+    start=(255, 210, 210, 255),
+    end=(255, 0, 0, 255),
+    nan_color=(0, 0, 0, 0),
+)
+DECREASE_RAMP = ColorRamp(
+    min_color=(210, 210, 255, 255),
+    max_color=(0, 80, 255, 255),
+    start=(210, 210, 255, 255),
+    end=(0, 80, 255, 255),
+    nan_color=(0, 0, 0, 0),
+)
+UNCHANGED_COLOR = (128, 128, 128, 96)
+
+# 사망사고 밀도: 낮은 곳은 투명, 옅은 노란색 -> 진한 빨간색
+DENSITY_RAMP = ColorRamp(
+    min_color=(0, 0, 0, 0),
+    max_color=(255, 0, 0, 230),
+    start=(255, 255, 0, 70),
+    end=(255, 0, 0, 230),
+    nan_color=(0, 0, 0, 0),
+)
+
+# 'Start or End' 값에 포함된 문자 -> 두께 배수 (먼저 일치하는 항목 우선)
+BASE_WIDTH = 2
+SEGMENT_WIDTH_MULTIPLIERS = (('E', 48), ('S', 38))
+
+
+def ramp_colors(values, ramp=BLACK_SPOT_RAMP, vmin=None, vmax=None):
+    values = np.asarray(values, dtype=np.float64)
+    low = np.nanmin(values) if vmin is None else vmin
+    high = np.nanmax(values) if vmax is None else vmax
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = (values - low) / (high - low)
+
+    start = np.asarray(ramp.start, dtype=np.float64)
+    end = np.asarray(ramp.end, dtype=np.float64)
+    # start * (1 - r) + end * r keeps channels that do not change exact, so
+    # truncation matches int(255 * (1 - r)) from the original helper
+    interior = start * (1 - ratio[:, None]) + end * ratio[:, None]
+    interior = np.where(start == end, start, interior)
+
+    colors = np.empty((len(values), 4), dtype=np.uint8)
+    inside = ~np.isnan(ratio)
+    colors[inside] = np.clip(interior[inside], 0, 255).astype(np.uint8)
+    colors[values <= low] = ramp.min_color
+    # The maximum wins when every value is equal, as before
+    colors[values >= high] = ramp.max_color
+    colors[np.isnan(values)] = ramp.nan_color
+    return colors
+
+
+def segment_widths(kinds, base_width=BASE_WIDTH, multipliers=SEGMENT_WIDTH_MULTIPLIERS):
+    # Only the handful of distinct labels are inspected in Python
+    codes, uniques = pd.factorize(pd.Series(kinds, copy=False))
+    table = np.full(len(uniques) + 1, base_width, dtype=np.int64)
+    for position, label in enumerate(uniques):
+        for marker, multiplier in multipliers:
+            if marker in str(label):
+                table[position] = base_width * multiplier
+                break
+    # -1 (missing) picks the trailing base width
+    return table[codes]
+
+
+def style_segments(values, kinds, ramp=BLACK_SPOT_RAMP, vmin=None, vmax=None,
+                   base_width=BASE_WIDTH, multipliers=SEGMENT_WIDTH_MULTIPLIERS):
+    return (ramp_colors(values, ramp=ramp, vmin=vmin, vmax=vmax),
+            segment_widths(kinds, base_width=base_width, multipliers=multipliers))
+
+
+def delta_colors(delta, increase=INCREASE_RAMP, decrease=DECREASE_RAMP, unchanged=UNCHANGED_COLOR):
+    # Both directions share one scale: the largest absolute change
+    delta = np.asarray(delta, dtype=np.float64)
+    magnitude = np.abs(delta)
+    scale = np.nanmax(magnitude) if np.isfinite(magnitude).any() else 0.0
+    colors = np.empty((len(delta), 4), dtype=np.uint8)
+    colors[:] = unchanged
+    if scale > 0:
+        up, down = delta > 0, delta < 0
+        colors[up] = ramp_colors(magnitude[up], ramp=increase, vmin=0, vmax=scale)
+        colors[down] = ramp_colors(magnitude[down], ramp=decrease, vmin=0, vmax=scale)
+    return colors
@@ -0,0 +1,52 @@
+import importlib
+import json
+
+import pytest
+from plotly.utils import PlotlyJSONEncoder
+
+import app as app_module
+import datasets
+import shared
+from app import (BLACK_SPOT_YEARS, CHANGE_YEARS, CHART_DROPDOWN_CHOICES, MAP_IFRAMES, _black_spot_years,
+                 register_maps)
+from map_routes import DensityRoutes, LiveRoutes, MapRoutes, TileRoutes
+
+
+@pytest.fixture
+def app_without_2021(tmp_path, monkeypatch):
+    # The app module as imported with a data directory whose first year is 2022
+    for year in (2022, 2023):
+        (tmp_path / f'black spot {year}e,s.csv').write_text('')
+    monkeypatch.setattr(shared, 'DATA_DIR', str(tmp_path))
+    yield importlib.reload(app_module)
+    monkeypatch.undo()
+    importlib.reload(app_module)
+
+
+def test_black_spot_years_match_datasets(tmp_path, monkeypatch):
+    for name in ('black spot 2019e,s.csv', 'black spot 2023e,s.csv', 'black spot 2023e,s.csv.bak',
+                 'black spot 23e,s.csv', 'final.csv'):
+        (tmp_path / name).write_text('')
+    monkeypatch.setattr(datasets, 'DATA_DIR', str(tmp_path))
+    assert _black_spot_years(str(tmp_path)) == tuple(datasets.black_spot_years()) == (2019, 2023)
+
+
+def test_one_map_per_year():
+    assert BLACK_SPOT_YEARS == tuple(datasets.black_spot_years())
+    names = [f'black-spot-{year}' for year in BLACK_SPOT_YEARS]
+    options = [option['value'] for option in CHART_DROPDOWN_CHOICES['black-spot']['options']]
+    map_routes = MapRoutes()
+    register_maps(map_routes, TileRoutes(), LiveRoutes(), DensityRoutes())
+    for name in names:
+        assert name in options and name in MAP_IFRAMES and name in map_routes.renderers
+    assert ('black-spot-change' in map_routes.renderers) == (CHANGE_YEARS is not None)
+
+
+def test_default_chart_is_the_first_year(app_without_2021):
+    app = app_without_2021
+    assert app.BLACK_SPOT_YEARS == (2022, 2023)
+    layout = app.build_layout({}, {})
+    assert layout['chart-dropdown'].value == app.CHART_DROPDOWN_CHOICES['black-spot']['value'] == ['black-spot-2022']
+    assert 'black-spot-2021' not in json.dumps(app.CHART_DROPDOWN_CHOICES)
+    assert 'black-spot-2021' not in json.dumps(layout, cls=PlotlyJSONEncoder)
+    assert 'black-spot-2021' not in app.MAP_IFRAMES
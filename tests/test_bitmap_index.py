@@ -0,0 +1,124 @@
+import base64
+import json
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bitmap_index import build_index, decode_filters, encode_filters, filter_pairs
+
+COLUMNS = ('year', '주야', '요일', '발생지시도', '법규위반')
+
+
+@pytest.fixture(scope='module')
+def accidents():
+    rng = np.random.default_rng(0)
+    rows = 5000
+    df = pd.DataFrame({
+        '발생년월일시': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 2 * 365 * 24, rows), unit='h'),
+        '주야': rng.choice(['주간', '야간'], rows),
+        '요일': rng.choice(['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일'], rows),
+        '발생지시도': rng.choice(['경기', '경북', '충남', '강원'], rows),
+        '법규위반': rng.choice(['과속', '안전거리 미확보', '안전운전 의무 불이행', None], rows),
+    })
+    df['발생지시도'] = df['발생지시도'].astype('category')
+    return df
+
+
+def pandas_mask(df, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in filters.items():
+        if not values:
+            continue
+        series = df['발생년월일시'].dt.year if column == 'year' else df[column]
+        mask &= series.isin(values).to_numpy()
+    return mask
+
+
+@pytest.mark.parametrize('filters', [
+    {'주야': ['야간']},
+    {'year': [2022], '요일': ['토요일', '일요일']},
+    {'발생지시도': ['경기', '강원'], '법규위반': ['과속'], '주야': ['주간']},
+    {'법규위반': ['없는 값']},
+    {'발생지시도': ['경기', '없는 값'], '주야': []},
+])
+def test_mask_matches_isin(accidents, filters):
+    index = build_index(accidents, COLUMNS)
+    expected = pandas_mask(accidents, filters)
+    assert np.array_equal(index.mask(filters), expected)
+    assert index.count(filters) == int(expected.sum())
+
+
+def test_no_filter_selects_everything(accidents):
+    index = build_index(accidents, COLUMNS)
+    assert index.mask({}) is None
+    assert index.mask({'주야': []}) is None
+    assert index.count(None) == len(accidents)
+
+
+def test_missing_values_match_nothing(accidents):
+    index = build_index(accidents, COLUMNS)
+    chosen = index.labels['법규위반']
+    assert index.count({'법규위반': chosen}) == int(accidents['법규위반'].notna().sum())
+
+
+def test_counts_per_label(accidents):
+    index = build_index(accidents, COLUMNS)
+    filters = {'주야': ['야간']}
+    expected = accidents[pandas_mask(accidents, filters)]['요일'].value_counts()
+    assert index.counts('요일', filters) == {label: int(expected.get(label, 0)) for label in index.labels['요일']}
+
+
+def test_token_round_trip():
+    filters = {'year': [2022, 2021], '주야': ['야간'], '요일': []}
+    assert decode_filters(encode_filters(filters)) == {'year': [2021, 2022], '주야': ['야간']}
+    assert encode_filters({}) == encode_filters({'주야': []}) == ''
+    assert decode_filters('') == {}
+
+
+def _token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+@pytest.mark.parametrize('token', [
+    '!!!',
+    _token({'주야': ['야간']}),
+    _token([['주야', '야간']]),
+    _token([['주야', [['야간']]]]),
+    _token([['주야', [{'a': 1}]]]),
+    _token([['주야', [True]]]),
+    _token([[1, ['야간']]]),
+    _token([['주야', ['야간'], 'extra']]),
+])
+def test_invalid_tokens(token):
+    with pytest.raises(ValueError):
+        decode_filters(token)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node')
+def test_browser_key_and_token_match_python():
+    # app.FILTER_KEY_JS is what the figure-request callback and the map
+    # iframes run in the browser
+    from app import FILTER_KEY_JS
+
+    dimensions = ['year', '주야', '발생지시도', '법규위반']
+    cases = [
+        [None, None, None, None],
+        [[2022, 2021], ['야간'], [], None],
+        [[2021, 10, 9], None, ['충남', '경기', '강원'], ['안전운전 의무 불이행', '과속']],
+    ]
+    script = FILTER_KEY_JS + f'''
+        const dimensions = {json.dumps(dimensions)};
+        const cases = {json.dumps(cases, ensure_ascii=False)};
+        console.log(JSON.stringify(cases.map(values => {{
+            const [, key] = filterKey(dimensions, values);
+            return [key, filterToken(key)];
+        }})));
+    '''
+    output = subprocess.run(['node', '-e', script], capture_output=True, check=True, text=True).stdout
+    for (key, token), values in zip(json.loads(output), cases):
+        filters = dict(zip(dimensions, values))
+        assert key == json.dumps(filter_pairs(filters), ensure_ascii=False, separators=(',', ':'))
+        assert token == encode_filters(filters)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import CHART_BUILDERS, CHART_MARGINALS
+from death_cube import COUNT_MEASURE, DIMENSIONS, build_cube, cube_rows
+
+SEASONS = {12: '겨울', 1: '겨울', 2: '겨울', 3: '봄', 4: '봄', 5: '봄',
+           6: '여름', 7: '여름', 8: '여름', 9: '가을', 10: '가을', 11: '가을'}
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    count = 3000
+    when = pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 2 * 365 * 24, count), unit='h')
+    df = pd.DataFrame({
+        '발생년월일시': when,
+        '계절': when.month.map(SEASONS),
+        '주야': rng.choice(['주간', '야간'], count),
+        '발생지시도': rng.choice(['경기', '경북', '충남'], count),
+        '사고유형_대분류': rng.choice(['차대차', '차량단독'], count),
+        '사망자수': rng.integers(0, 3, count),
+        '사상자수': rng.integers(1, 6, count),
+        '교통량': rng.integers(1000, 50000, count),
+    })
+    return df
+
+
+@pytest.fixture(scope='module')
+def rows(frame):
+    return cube_rows(frame)
+
+
+def grouped(frame, measure, by, filters):
+    # The cube's answer the slow way
+    when = frame['발생년월일시'].dt
+    df = frame.assign(year=when.year, month=when.month, weekday=when.dayofweek, hour=when.hour,
+                      **{COUNT_MEASURE: 1})
+    for dim, wanted in filters.items():
+        df = df[df[dim].isin(wanted)]
+    if not by:
+        return df[measure].sum()
+    return df.groupby(list(by))[measure].sum()
+
+
+@pytest.mark.parametrize('by, filters', [
+    ((), {}),
+    (('계절',), {}),
+    (('year', 'month'), {'발생지시도': ['경기']}),
+    (('hour', 'weekday'), {'주야': ['야간'], 'year': [2022]}),
+    (('발생지시도',), {'발생지시도': ['충남', '경기'], 'month': [1, 2, 12]}),
+])
+def test_query_matches_groupby(frame, by, filters):
+    cube = build_cube(frame)
+    for measure in (COUNT_MEASURE, '사망자수', '교통량'):
+        result = cube.query(measure, by=by, filters=filters)
+        expected = grouped(frame, measure, by, filters)
+        if by:
+            axes = [cube.axis_labels(dim, filters) for dim in by]
+            expected = expected.reindex(pd.MultiIndex.from_product(axes) if len(by) > 1 else axes[0], fill_value=0)
+            expected = expected.to_numpy().reshape([len(labels) for labels in axes])
+        np.testing.assert_allclose(result, expected)
+
+
+def test_labels(frame):
+    cube = build_cube(frame)
+    assert cube.dimensions == DIMENSIONS
+    assert cube.labels['계절'] == ['봄', '여름', '가을', '겨울']
+    assert cube.labels['weekday'] == list(range(7))
+    assert cube.labels['발생지시도'] == ['경기', '경북', '충남']
+    # In the filter's order, as query() lays the axis out
+    assert cube.axis_labels('발생지시도', {'발생지시도': ['충남', '경기']}) == ['충남', '경기']
+    with pytest.raises(KeyError):
+        cube.query('사망자수', by=('요일',))
+
+
+@pytest.mark.parametrize('by', [(), ('계절',), ('year', 'month'), ('month', 'year'), ('weekday',), ('hour',),
+                                ('weekday', 'hour')])
+def test_marginals_match_full_cube(rows, by):
+    mask = np.random.default_rng(1).random(len(rows)) < 0.3
+    full, marginals = rows.cube(mask), rows.marginals(CHART_MARGINALS, mask)
+    for measure in (COUNT_MEASURE, '사망자수', '교통량'):
+        np.testing.assert_allclose(marginals.query(measure, by=by), full.query(measure, by=by))
+    filters = {'weekday': [5, 6]} if 'hour' in by else {}
+    np.testing.assert_allclose(marginals.query('사망자수', by=by, filters=filters),
+                               full.query('사망자수', by=by, filters=filters))
+
+
+def test_charts_from_marginals(rows):
+    mask = np.arange(len(rows)) % 3 == 0
+    full, marginals = rows.cube(mask), rows.marginals(CHART_MARGINALS, mask)
+    for build in CHART_BUILDERS.values():
+        assert build(marginals).to_json() == build(full).to_json()
+
+
+def test_marginals_refuse_other_breakdowns(rows):
+    marginals = rows.marginals(CHART_MARGINALS)
+    assert marginals.dimensions == DIMENSIONS
+    with pytest.raises(KeyError):
+        marginals.query('사망자수', by=('주야',))
+    with pytest.raises(KeyError):
+        marginals.query('사망자수', by=('hour',), filters={'month': [1]})
@@ -0,0 +1,63 @@
+import os
+
+import plotly.graph_objects as go
+
+import figure_cache
+from figure_cache import FigureCache, cache_key, figure_version
+
+
+def builders():
+    calls = []
+
+    def bar(cube, filters=None):
+        calls.append(filters)
+        return go.Figure(go.Bar(x=list(cube), y=[len(filters or {})] * len(cube)))
+
+    return {'bar': bar}, calls
+
+
+def test_cache_key_ignores_order_and_empty_filters():
+    assert cache_key('bar', {'주야': ['야간', '주간'], '요일': []}) == cache_key('bar', {'주야': ['주간', '야간']})
+    assert cache_key('bar', {}) == cache_key('bar', None)
+
+
+def test_version_follows_data_and_code(monkeypatch):
+    version = figure_version('data-1')
+    assert figure_version('data-1') == version
+    assert figure_version('data-2') != version
+    monkeypatch.setattr(figure_cache, 'FIGURE_VERSION', figure_cache.FIGURE_VERSION + 1)
+    assert figure_version('data-1') != version
+
+
+def test_memory_and_disk_hits(tmp_path):
+    chart_builders, calls = builders()
+    cache = FigureCache(chart_builders, [1, 2], version='v1', disk_dir=str(tmp_path))
+    payload = cache.get_json('bar', {'주야': ['야간']})
+    assert cache.get_json('bar', {'주야': ['야간']}) is payload
+    assert cache.get_figure('bar', {'주야': ['야간']})['data'][0]['type'] == 'bar'
+
+    # Another worker: served from disk, not rebuilt
+    other = FigureCache(chart_builders, [1, 2], version='v1', disk_dir=str(tmp_path))
+    assert other.get_json('bar', {'주야': ['야간']}) == payload
+    assert len(calls) == 1 and other.stats()['disk_hits'] == 1
+
+    # A new version does not read the old files
+    FigureCache(chart_builders, [1, 2], version='v2', disk_dir=str(tmp_path)).get_json('bar', {'주야': ['야간']})
+    assert len(calls) == 2
+
+
+def test_disk_is_capped(tmp_path):
+    chart_builders, _ = builders()
+    cache = FigureCache(chart_builders, [1], version='v1', disk_dir=str(tmp_path), maxsize=2, disk_maxsize=5)
+    for value in range(12):
+        cache.get_json('bar', {'year': [value]})
+        assert len(os.listdir(tmp_path)) <= 5
+    assert len(cache.entries) == 2
+
+
+def test_without_orjson(monkeypatch, tmp_path):
+    monkeypatch.setattr(figure_cache, 'orjson', None)
+    monkeypatch.setattr(figure_cache, 'JSON_ENGINE', 'json')
+    chart_builders, _ = builders()
+    cache = FigureCache(chart_builders, [1], disk_dir=str(tmp_path))
+    assert cache.get_figure('bar')['data'][0]['x'] == [1]
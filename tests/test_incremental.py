@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+import datasets
+import incremental
+from datasets import ACCIDENT_CSV, FINAL_CSV, data_digest, load_final
+from death_cube import build_cube
+from schema import ACCIDENT_SCHEMA, FINAL_SCHEMA
+
+
+def accidents(regions, stamp=2021062406):
+    # Raw rows in the accident file's layout, one per region
+    values = {'category': 'A', 'count': 1, 'float': 127.5, 'datetime': stamp}
+    return pd.DataFrame([{name: (region if name == '발생지시도' else
+                                 column.categories[0] if column.categories else values[column.kind])
+                          for name, column in ACCIDENT_SCHEMA.items()} for region in regions])
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(datasets, 'CACHE_DIR', str(tmp_path / 'cache'))
+    for module in (datasets, incremental):
+        monkeypatch.setattr(module, 'ACCIDENT_BATCH_DIR', str(tmp_path / 'batches'))
+    base = accidents(['경기', '경북'])
+    base.to_csv(tmp_path / ACCIDENT_CSV, index=False, encoding='cp949')
+    base[list(FINAL_SCHEMA)].to_csv(tmp_path / FINAL_CSV, index=False, encoding='cp949')
+    return tmp_path
+
+
+def test_appended_batches_reach_the_dashboard_data(data_dir):
+    before = data_digest(FINAL_CSV)
+    assert before == datasets.source_digest(FINAL_CSV)
+
+    aggregates = incremental.append_accidents(accidents(['서울'], stamp=2023010112), path=str(data_dir / 'agg.npz'))
+    final = load_final()
+    assert final['발생지시도'].tolist() == ['경기', '경북', '서울']
+    assert list(final.columns) == list(FINAL_SCHEMA)
+    # Every cube, index and map keyed on final.csv is rebuilt
+    assert data_digest(FINAL_CSV) != before
+    cube = build_cube(final)
+    assert cube.query('사고건수') == aggregates.cube.query('사고건수') == 3
+
+    # Appending the same batch again changes nothing
+    incremental.append_accidents(accidents(['서울'], stamp=2023010112), path=str(data_dir / 'agg.npz'))
+    assert len(load_final()) == 3
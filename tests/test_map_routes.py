@@ -0,0 +1,56 @@
+import os
+import stat
+
+import pytest
+from flask import Flask
+
+from map_routes import CACHE_CONTROL, FILE_MODE, MapRoutes, StoredMapEntry
+
+
+@pytest.fixture
+def client():
+    server = Flask(__name__)
+    routes = MapRoutes().register(server)
+    routes.add('static-map', '<html>static</html>')
+    routes.add_lazy('lazy-map', lambda: '<html>lazy</html>', 'abcdef0123456789')
+    routes.add_variants('lazy-map', lambda token: f'<html>{token}</html>')
+    return server.test_client(), routes
+
+
+@pytest.mark.parametrize('name, token', [('static-map', ''), ('lazy-map', ''), ('lazy-map', 'W1tdXQ')])
+def test_versioned_urls_are_immutable(client, name, token):
+    client, routes = client
+    url = routes.url(name, token)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == CACHE_CONTROL
+    assert response.headers['Cache-Control'].startswith('private')
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+@pytest.mark.parametrize('url', ['/maps/static-map.html', '/maps/lazy-map.html', '/maps/lazy-map.html?v=0000',
+                                 '/maps/lazy-map~W1tdXQ.html'])
+def test_unversioned_urls_are_revalidated(client, url):
+    client, _ = client
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_unknown_map(client):
+    client, _ = client
+    assert client.get('/maps/missing.html').status_code == 404
+
+
+def test_stored_maps_follow_the_umask(tmp_path):
+    # What build_cache.prebuild writes through load_or_render
+    def render():
+        return {'html': '<html>' + 'x' * 4096 + '</html>', 'bin': b'\0' * 4096}
+
+    entries = StoredMapEntry.load_or_render(str(tmp_path), 'black-spot-2022', 'abc123', render)
+    assert set(entries) == {'html', 'bin'}
+    files = os.listdir(tmp_path)
+    assert any(name.endswith('.meta.json') for name in files) and not any(name.endswith('.tmp') for name in files)
+    for name in files:
+        assert stat.S_IMODE(os.stat(tmp_path / name).st_mode) == FILE_MODE, name
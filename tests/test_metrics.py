@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import textwrap
+
+from flask import Flask, Response
+
+import metrics
+
+
+def test_render_sums_snapshots():
+    registry = metrics.Registry()
+    counter = registry.add(metrics.Counter('calls_total', 'Calls', ('callback',)))
+    histogram = registry.add(metrics.Histogram('seconds', 'Seconds', ('callback',), buckets=(1, 10)))
+    counter.inc(('a',), 2)
+    histogram.observe(('a',), 0.5)
+    first = registry.snapshot()
+    counter.inc(('b',))
+    histogram.observe(('a',), 5)
+    text = registry.render([first, registry.snapshot()])
+    assert 'calls_total{callback="a"} 4.0' in text
+    assert 'calls_total{callback="b"} 1.0' in text
+    assert 'seconds_bucket{callback="a",le="1.0"} 2' in text
+    assert 'seconds_bucket{callback="a",le="10.0"} 3' in text
+    assert 'seconds_sum{callback="a"} 6.0' in text
+
+
+def test_response_bytes_drop_filter_tokens():
+    server = Flask(__name__)
+    server.add_url_rule('/maps/<name>.<extension>', 'deck_map', lambda name, extension: Response('x' * 10))
+    metrics.register(server)
+    client = server.test_client()
+    client.get('/maps/death-analysis~W1siyJdXQ.html')
+    client.get('/maps/death-analysis~W1sieWVhciJdXQ.html')
+    names = {labels for labels in metrics.HTTP_BYTES.snapshot() if labels[0] == 'deck_map'}
+    assert names == {('deck_map', 'death-analysis.html')}
+
+
+def test_workers_are_summed(tmp_path):
+    # Forked like gunicorn workers, in a separate interpreter so that the
+    # fork hook stays out of the test process
+    script = textwrap.dedent(f'''
+        import os
+        import metrics
+
+        metrics.CACHE_REQUESTS.inc(('figure', 'hit'), 5)  # the master's own
+        metrics.multiprocess({str(tmp_path)!r})
+        children = []
+        for worker in range(3):
+            pid = os.fork()
+            if pid == 0:
+                for _ in range(worker + 1):
+                    metrics.CACHE_REQUESTS.inc(('figure', 'hit'))
+                metrics.flush()
+                os._exit(0)
+            children.append(pid)
+        for pid in children:
+            os.waitpid(pid, 0)
+        print(metrics.REGISTRY.render(metrics.collect()))
+    ''')
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, check=True, text=True).stdout
+    assert 'analysis_cache_requests_total{cache="figure",result="hit"} 11.0' in output
+    assert len(list(tmp_path.glob('*.json'))) == 4
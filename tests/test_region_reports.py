@@ -0,0 +1,11 @@
+import os
+import stat
+
+import region_reports
+
+
+def test_files_follow_the_umask(tmp_path):
+    path = tmp_path / 'assets' / 'page.html'
+    assert region_reports._write(str(path), 'page') == 4
+    assert stat.S_IMODE(os.stat(path).st_mode) == region_reports.FILE_MODE == 0o666 & ~region_reports._UMASK
+    assert os.listdir(path.parent) == ['page.html']
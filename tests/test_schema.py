@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import Column, SchemaError, concat, conform
+
+SCHEMA = {
+    '주야': Column('category', categories=('주간', '야간')),
+    '발생지시도': Column('category'),
+    '사망자수': Column('count', 'int8'),
+    'x좌표값': Column('float', 'float32'),
+    '발생년월일시': Column('datetime'),
+    '사고 발생 VDS_CD': Column('category', nullable=True),
+    'geometry': Column('text'),
+}
+
+
+def frame(**overrides):
+    columns = {
+        '주야': ['주간', '야간'],
+        '발생지시도': ['경기', '경북'],
+        '사망자수': [1, 2],
+        'x좌표값': [127.1, 128.2],
+        '발생년월일시': [2021062406, 2022010123],
+        '사고 발생 VDS_CD': ['0010VDS00100', None],
+        'geometry': ['LINESTRING (0 0, 1 1)', 'LINESTRING (1 1, 2 2)'],
+    }
+    columns.update(overrides)
+    return pd.DataFrame(columns)
+
+
+def test_conform_types():
+    conformed = conform(frame(), SCHEMA)
+    assert list(conformed.columns) == list(SCHEMA)
+    assert list(conformed['주야'].cat.categories) == ['주간', '야간']
+    assert conformed['사망자수'].dtype == np.int8
+    assert conformed['x좌표값'].dtype == np.float32
+    assert conformed['발생년월일시'].tolist() == [pd.Timestamp('2021-06-24 06:00'), pd.Timestamp('2022-01-01 23:00')]
+    assert conformed['사고 발생 VDS_CD'].isna().tolist() == [False, True]
+
+
+def test_missing_and_unexpected_columns():
+    df = frame().drop(columns=['사망자수']).assign(extra=0)
+    with pytest.raises(SchemaError) as raised:
+        conform(df, SCHEMA, 'final.csv')
+    assert raised.value.problems == ["missing columns: ['사망자수']", "unexpected columns: ['extra']"]
+    assert str(raised.value).startswith('final.csv: ')
+
+
+@pytest.mark.parametrize('overrides, problem', [
+    ({'주야': ['주간', '새벽']}, "주야: unknown values ['새벽']"),
+    ({'발생지시도': ['경기', None]}, '발생지시도: 1 missing values'),
+    ({'geometry': [None, 'LINESTRING (1 1, 2 2)']}, 'geometry: 1 missing values'),
+    ({'사망자수': [1, 'two']}, '사망자수: 1 non-numeric values'),
+    ({'사망자수': [1, -1]}, '사망자수: counts must be non-negative integers'),
+    ({'사망자수': [1, 1.5]}, '사망자수: counts must be non-negative integers'),
+    ({'사망자수': [1, 200]}, '사망자수: 200 does not fit int8'),
+    ({'x좌표값': [127.1, None]}, 'x좌표값: 1 non-numeric values'),
+    ({'발생년월일시': [2021062406, 'yesterday']}, '발생년월일시: 1 unparseable timestamps'),
+])
+def test_value_problems(overrides, problem):
+    with pytest.raises(SchemaError) as raised:
+        conform(frame(**overrides), SCHEMA)
+    assert raised.value.problems == [problem]
+
+
+def test_every_problem_is_reported():
+    with pytest.raises(SchemaError) as raised:
+        conform(frame(주야=['낮', '밤'], 사망자수=[-1, 0]), SCHEMA)
+    assert len(raised.value.problems) == 2
+
+
+def test_concat_unions_open_categories():
+    first = conform(frame(), SCHEMA)
+    second = conform(frame(발생지시도=['강원', '경기']), SCHEMA)
+    combined = concat([first, second], SCHEMA)
+    assert isinstance(combined['발생지시도'].dtype, pd.CategoricalDtype)
+    assert combined['발생지시도'].tolist() == ['경기', '경북', '강원', '경기']
@@ -0,0 +1,95 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import BLACK_SPOT_SCHEMA, conform
+from segment_store import SegmentStore
+
+
+def year_frame(codes, values, geometry=None, length=None, kinds=None):
+    count = len(codes)
+    return conform(pd.DataFrame({
+        'VDS_CD': codes,
+        'TRFFCVLM': [100 * (i + 1) for i in range(count)],
+        'SPD_AVG': [80.0] * count,
+        'OCCPNCY': [5.0] * count,
+        'Start or End': kinds or ['S'] * count,
+        'point': [1.0] * count,
+        'geometry': geometry or [f'LINESTRING ({i} 0, {i} 1)' for i in range(count)],
+        'length': length or [1000] * count,
+        'count': [1] * count,
+        'black-spot': values,
+    }), BLACK_SPOT_SCHEMA)
+
+
+@pytest.fixture
+def store():
+    store = SegmentStore()
+    store.add_year(2021, year_frame(['A', 'B', 'C'], [1.0, 2.0, 3.0]))
+    # B is re-drawn and longer in 2022, C is gone, D is new
+    store.add_year(2022, year_frame(
+        ['B', 'A', 'D'], [5.0, 1.0, 4.0],
+        geometry=['LINESTRING (9 9, 9 10, 10 10)', 'LINESTRING (0 0, 0 1)', 'LINESTRING (7 0, 7 1)'],
+        length=[2000, 1000, 1000], kinds=['E', 'S', 'S']))
+    return store
+
+
+def test_empty_store_does_not_warn():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert len(SegmentStore()) == 0
+
+
+def test_each_year_round_trips(store):
+    pd.testing.assert_frame_equal(store.frame(2021), year_frame(['A', 'B', 'C'], [1.0, 2.0, 3.0]))
+    frame = store.frame(2022).set_index('VDS_CD')
+    assert frame.loc['B', 'geometry'] == 'LINESTRING (9 9, 9 10, 10 10)'
+    assert frame.loc['B', 'length'] == 2000
+    assert frame.loc['B', 'Start or End'] == 'E'
+
+
+def test_revisions_only_hold_changed_segments(store):
+    rows, columns, lines = store.revisions[2022]
+    assert store.codes[rows].tolist() == ['B']
+    assert lines.counts.tolist() == [3]
+    assert 2021 not in store.revisions
+
+
+def test_segment_lines_per_year(store):
+    b = store.lookup('B')
+    assert store.segment_lines([b], 2021).coords.tolist() == [[1.0, 0.0], [1.0, 1.0]]
+    assert store.segment_lines([b], 2022).coords.tolist() == [[9.0, 9.0], [9.0, 10.0], [10.0, 10.0]]
+    # As last listed: B from 2022, C (absent in 2022) from 2021
+    latest = store.segment_lines()
+    assert len(latest) == len(store) == 4
+    assert latest.counts.tolist() == [2, 3, 2, 2]
+    assert store.segment_column('Start or End').tolist() == ['S', 'E', 'S', 'S']
+
+
+def test_deltas_align_by_code(store):
+    delta = store.delta('black-spot', 2021, 2022)
+    assert delta[store.rows(['A', 'B'])].tolist() == [0.0, 3.0]
+    assert np.isnan(delta[store.rows(['C', 'D'])]).all()
+
+
+def test_a_year_back_to_the_first_listing_is_the_latest():
+    store = SegmentStore()
+    store.add_year(2020, year_frame(['A'], [1.0], length=[996]))
+    store.add_year(2021, year_frame(['A'], [1.0], length=[1096]))
+    store.add_year(2022, year_frame(['A'], [1.0], length=[996]))
+    assert store.segment_column('length').tolist() == [996]
+    assert store.segment_column('length', 2021).tolist() == [1096]
+
+
+def test_latest_listing_does_not_depend_on_the_order_years_are_added():
+    geometry = {2021: ['LINESTRING (0 0, 0 1)'], 2022: ['LINESTRING (5 5, 5 6, 6 6)']}
+    for order in ((2021, 2022), (2022, 2021)):
+        store = SegmentStore()
+        for year in order:
+            store.add_year(year, year_frame(['A'], [1.0], geometry=geometry[year], length=[year - 1026]))
+        assert store.segment_column('length').tolist() == [996]
+        assert store.segment_column('geometry').tolist() == geometry[2022]
+        assert store.segment_lines().counts.tolist() == [3]
+        assert store.segment_lines(year=2021).counts.tolist() == [2]
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from time_index import CYCLES, GRANULARITIES, TimeIndex
+
+# The bench's pandas query per granularity
+RESAMPLE = {
+    'hour': {'rule': 'H'},
+    'day': {'rule': 'D'},
+    'week': {'rule': 'W-MON', 'label': 'left', 'closed': 'left'},
+    'month': {'rule': 'MS'},
+    'year': {'rule': 'AS'},
+}
+
+
+@pytest.fixture(scope='module')
+def accidents():
+    # 발생년월일시 / 사망자수 / 주야 over two and a half years, starting mid-week
+    # and mid-month, with one missing datetime
+    rng = np.random.default_rng(0)
+    rows = 5000
+    start = pd.Timestamp('2019-07-17 05:00')
+    hours = rng.integers(0, 2.5 * 365 * 24, rows)
+    dt = pd.Series(start + pd.to_timedelta(hours, unit='h') + pd.to_timedelta(rng.integers(0, 60, rows), unit='min'))
+    dt.iloc[7] = pd.NaT
+    return pd.DataFrame({
+        '발생년월일시': dt,
+        '사망자수': rng.integers(1, 4, rows).astype(float),
+        '주야': np.where(rng.random(rows) < 0.4, '야간', '주간'),
+    })
+
+
+@pytest.fixture(scope='module')
+def index(accidents):
+    return TimeIndex(accidents['발생년월일시'], {'사망자수': accidents['사망자수']})
+
+
+def valid(accidents, mask=None):
+    keep = accidents['발생년월일시'].notna().to_numpy()
+    if mask is not None:
+        keep &= mask
+    return accidents['발생년월일시'][keep], accidents['사망자수'][keep]
+
+
+def fill(grouped, cycle):
+    # groupby sums over every value of a cycle (TimeIndex's 0-based positions)
+    first = 1 if cycle == 'month' else 0
+    return grouped.reindex(range(first, first + CYCLES[cycle]), fill_value=0).to_numpy()
+
+
+@pytest.mark.parametrize('granularity', GRANULARITIES)
+def test_series_matches_resample(accidents, index, granularity):
+    dt, deaths = valid(accidents)
+    expected = pd.Series(deaths.to_numpy(), index=pd.DatetimeIndex(dt)).resample(**RESAMPLE[granularity]).sum()
+    labels, values = index.series('사망자수', granularity)
+    np.testing.assert_allclose(values, expected.to_numpy())
+    # pandas labels the first period by its start, TimeIndex by the first hour
+    # in the span
+    first = dt.min().floor('H').to_datetime64()
+    np.testing.assert_array_equal(labels.astype('datetime64[ns]'), np.maximum(expected.index.to_numpy(), first))
+
+
+@pytest.mark.parametrize('granularity', GRANULARITIES)
+def test_series_counts_rows(accidents, index, granularity):
+    dt, _ = valid(accidents)
+    expected = pd.Series(1, index=pd.DatetimeIndex(dt)).resample(**RESAMPLE[granularity]).sum()
+    _, values = index.series(granularity=granularity)
+    np.testing.assert_array_equal(values, expected.to_numpy())
+
+
+def test_unknown_granularity(index):
+    with pytest.raises(ValueError, match='unknown granularity'):
+        index.series(granularity='quarter')
+
+
+@pytest.mark.parametrize('cycle', CYCLES)
+def test_profile_matches_groupby(accidents, index, cycle):
+    dt, deaths = valid(accidents)
+    field = {'hour': dt.dt.hour, 'weekday': dt.dt.weekday, 'month': dt.dt.month}[cycle]
+    np.testing.assert_allclose(index.profile('사망자수', cycle), fill(deaths.groupby(field).sum(), cycle))
+    np.testing.assert_array_equal(index.profile(cycle=cycle), fill(deaths.groupby(field).size(), cycle))
+
+
+@pytest.mark.parametrize('masked', [False, True])
+def test_heatmap_matches_groupby(accidents, index, masked):
+    mask = (accidents['주야'] == '야간').to_numpy() if masked else None
+    dt, deaths = valid(accidents, mask)
+    expected = (deaths.groupby([dt.dt.weekday, dt.dt.hour]).sum()
+                .unstack(fill_value=0).reindex(index=range(7), columns=range(24), fill_value=0))
+    heatmap = index.heatmap('사망자수', mask=mask)
+    assert heatmap.shape == (7, 24)
+    np.testing.assert_allclose(heatmap, expected.to_numpy())
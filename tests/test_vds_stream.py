@@ -0,0 +1,137 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from vds_stream import FIELDS, RollingWindows, parse_lines
+
+CODES = ['0010VDS00100', '0010VDS00200', '0010VDS00300', '0150VDS01000']
+
+
+def readings(count, seed, start=1_700_000_000, span=4 * 3600):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'row': rng.integers(-1, len(CODES), count),
+        'stamp': start + rng.integers(0, span, count),
+        'TRFFCVLM': rng.integers(0, 50, count).astype(float),
+        'SPD_AVG': rng.uniform(20, 110, count),
+        'OCCPNCY': rng.uniform(0, 40, count),
+    })
+
+
+def feed(windows, frame, batches):
+    for batch in np.array_split(frame, batches):
+        windows.update(batch['row'].to_numpy(), batch['stamp'].to_numpy(), batch[list(FIELDS)].to_numpy())
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_aggregates_match_groupby(ordered):
+    frame = readings(20000, seed=1)
+    if ordered:
+        frame = frame.sort_values('stamp', kind='stable')
+    windows = RollingWindows(CODES, window_seconds=3600, bucket_seconds=300)
+    feed(windows, frame, batches=17)
+
+    bucket = frame['stamp'] // 300
+    latest = bucket.max()
+    assert windows.latest == latest
+    # Readings older than the window were dropped on arrival or have expired
+    kept = frame[(frame['row'] >= 0) & (bucket > latest - windows.buckets)]
+    expected = kept.groupby('row').agg(readings=('TRFFCVLM', 'size'), TRFFCVLM=('TRFFCVLM', 'sum'),
+                                       SPD_AVG=('SPD_AVG', 'mean'), OCCPNCY=('OCCPNCY', 'mean'))
+    expected = expected.reindex(range(len(CODES)))
+    aggregates = windows.aggregates()
+    np.testing.assert_allclose(aggregates['readings'], expected['readings'].fillna(0))
+    np.testing.assert_allclose(aggregates['TRFFCVLM'], expected['TRFFCVLM'].fillna(0))
+    for field in ('SPD_AVG', 'OCCPNCY'):
+        np.testing.assert_allclose(aggregates[field], expected[field])
+
+
+def test_series_matches_groupby():
+    frame = readings(5000, seed=2).sort_values('stamp', kind='stable')
+    windows = RollingWindows(CODES, window_seconds=3600, bucket_seconds=300, history_buckets=24)
+    feed(windows, frame, batches=9)
+
+    bucket = frame['stamp'] // 300
+    latest = bucket.max()
+    # Completed buckets still in the history ring, every segment counted
+    held = frame[(frame['row'] >= 0) & (bucket > latest - 24) & (bucket < latest)]
+    expected = held.groupby(held['stamp'] // 300).agg(readings=('TRFFCVLM', 'size'), TRFFCVLM=('TRFFCVLM', 'sum'),
+                                                      SPD_AVG=('SPD_AVG', 'mean'))
+    epochs, counts, values = windows.series()
+    assert epochs.tolist() == expected.index.tolist()
+    np.testing.assert_allclose(counts, expected['readings'])
+    np.testing.assert_allclose(values['TRFFCVLM'], expected['TRFFCVLM'])
+    np.testing.assert_allclose(values['SPD_AVG'], expected['SPD_AVG'])
+    assert windows.series(after=int(epochs[-2]))[0].tolist() == [epochs[-1]]
+
+
+def test_changes_since():
+    windows = RollingWindows(CODES, window_seconds=3600, bucket_seconds=300)
+    rows, stamps, values, malformed = parse_lines([
+        b'0010VDS00100,1700000000,10,80.5,12.0',
+        b'0010VDS00300,1700000010,4,95.0,3.5',
+        b'not,a,reading',
+        b'9999VDS99999,1700000020,1,50,1',
+    ], windows.positions)
+    assert malformed == 1
+    windows.update(rows, stamps, values)
+    first = windows.changes(0)
+    assert first['rows'] == [0, 1, 2, 3]
+    assert windows.stats()['dropped'] == 1
+
+    # Same 5-minute bucket: the window does not move, so only that segment changed
+    rows, stamps, values, _ = parse_lines([b'0010VDS00300,1700000050,6,90.0,4.5'], windows.positions)
+    windows.update(rows, stamps, values)
+    delta = windows.changes(first['seq'])
+    assert delta['rows'] == [2]
+    assert delta['TRFFCVLM'] == [10.0]
+    assert delta['SPD_AVG'] == [92.5]
+
+
+def test_attached_windows_follow_the_writer(tmp_path):
+    writer = RollingWindows(CODES, window_seconds=3600, bucket_seconds=300, directory=str(tmp_path))
+    reader = RollingWindows.attach(str(tmp_path))
+    frame = readings(3000, seed=3).sort_values('stamp', kind='stable')
+    feed(writer, frame, batches=5)
+
+    assert reader.seq == writer.seq == 5
+    assert reader.changes(2) == writer.changes(2)
+    np.testing.assert_array_equal(reader.series()[0], writer.series()[0])
+    with pytest.raises(ValueError):
+        reader.readings[0, 0] = 1
+
+
+def test_reads_retry_when_an_update_lands(tmp_path):
+    windows = RollingWindows(CODES, directory=str(tmp_path))
+    reader = RollingWindows.attach(str(tmp_path))
+    calls = []
+
+    def read():
+        calls.append(1)
+        if len(calls) == 1:
+            # As if the writer applied a whole update during the first read
+            windows.header[0] += 2
+        return len(calls)
+
+    assert reader._read(read) == 2
+
+
+def test_shared_feed_is_ingested_once(tmp_path):
+    import vds_stream
+
+    source = tmp_path / 'feed.txt'
+    source.write_text('0010VDS00100,1700000000,10,80.5,12.0\n0010VDS00300,1700000010,4,95.0,3.5\n')
+    directory = str(tmp_path / 'vds-feed')
+    vds_stream.start_shared_feed(CODES, directory, str(source))
+    try:
+        first, second = vds_stream.attach_feed(directory), vds_stream.attach_feed(directory)
+        deadline = time.monotonic() + 30
+        while first.windows.messages < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert first.changes() == second.changes()
+        assert first.changes()['TRFFCVLM'] == [10.0, 0.0, 4.0, 0.0]
+    finally:
+        vds_stream.stop_shared_feed()
+    assert vds_stream.attach_feed(directory) is None
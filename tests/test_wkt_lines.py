@@ -0,0 +1,81 @@
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wkt_lines import concatenate, parse_linestrings
+
+
+def reference(text):
+    # One line at a time with a regex, the slow way
+    body = re.search(r'\((.*)\)', text)
+    if body is None:
+        return np.empty((0, 2))
+    return np.array([[float(value) for value in point.split()] for point in body.group(1).split(',')])
+
+
+def assert_parsed(values):
+    lines = parse_linestrings(values)
+    assert len(lines) == len(values)
+    for position, text in enumerate(values):
+        start, end = lines.offsets[position], lines.offsets[position + 1]
+        np.testing.assert_array_equal(lines.coords[start:end], reference(text).reshape(-1, 2))
+
+
+def test_typical_column():
+    assert_parsed(pd.Series([
+        'LINESTRING (127.0 37.5, 127.1 37.6, 127.2 37.55)',
+        'LINESTRING (126.9 35.1, 126.95 35.12)',
+    ]))
+
+
+def test_spacing_signs_and_exponents():
+    assert_parsed([
+        'LINESTRING(1 2,3 4)',
+        '  LINESTRING (  -1.5   2e-3 ,\t3E2 -4 )  ',
+        'LINESTRING (0.1 0.2, 0.1 0.2)',
+    ])
+
+
+def test_single_point_and_empty_lines():
+    lines = parse_linestrings(['LINESTRING EMPTY', 'LINESTRING (1 2)', 'LINESTRING EMPTY'])
+    assert lines.counts.tolist() == [0, 1, 0]
+    assert lines.coords.tolist() == [[1.0, 2.0]]
+    assert lines.lengths().tolist() == [0.0, 0.0, 0.0]
+    assert np.isnan(lines.bounds()[0]).all()
+
+
+def test_no_rows():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        lines = parse_linestrings([])
+    assert len(lines) == 0
+    assert lines.coords.shape == (0, 2)
+    assert len(concatenate([lines, parse_linestrings(['LINESTRING (1 2, 3 4)'])])) == 1
+
+
+@pytest.mark.parametrize('values', [
+    ['POINT (1 2)'],
+    ['LINESTRING (1 2, 3 4)', 'MULTILINESTRING ((1 2, 3 4))'],
+    ['LINESTRING (1 2, 3 4) LINESTRING (5 6, 7 8)'],
+    ['LINESTRING (1 2 3, 4 5 6)'],
+    ['LINESTRING (1 2, 3)'],
+    ['LINESTRING (1 2, 3 x)'],
+    ['LINESTRING (1 2, 3 4)', ''],
+    ['LINESTRING (127 37, 127 38) 서울'],
+])
+# numpy warns before the short read is caught
+@pytest.mark.filterwarnings('ignore:string or file could not be read')
+def test_malformed(values):
+    with pytest.raises(ValueError):
+        parse_linestrings(values)
+
+
+def test_take_and_lengths():
+    lines = parse_linestrings(['LINESTRING (0 0, 3 4)', 'LINESTRING EMPTY', 'LINESTRING (0 0, 0 1, 1 1)'])
+    picked = lines.take([2, 0, 1])
+    assert picked.counts.tolist() == [3, 2, 0]
+    assert picked.lengths().tolist() == [2.0, 5.0, 0.0]
+    np.testing.assert_allclose(picked.centroids()[:2], [[0.25, 0.75], [1.5, 2.0]])
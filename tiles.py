@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 사망지점 타일
+#
+# Serves the accident points as XYZ web-mercator tiles from app.server so the
+# browser only ever receives what is inside the viewport.  Points are sorted
+# once by their Morton (Z-order) key at POINT_ZOOM, which makes every tile a
+# contiguous key range found with searchsorted.  Up to AGGREGATE_ZOOM a tile
+# carries grid aggregates instead of raw points: 2**CELL_BITS x 2**CELL_BITS
+# cells per tile with the summed 사상자수 / 사망자수, the accident count and the
+# members' mean position.  Those aggregate levels are precomputed, so a tile
+# stays bounded (at most 4096 features) however many accidents there are.
+#
+# Tiles are GeoJSON FeatureCollections, which is what deck.gl's TileLayer
+# renders by default (one GeoJsonLayer per tile).  They are served by
+# map_routes.TileRoutes.  TileIndex.subset() narrows an index to a
+# cross-filter row mask (bitmap_index.py) without sorting again.
+
+import numpy as np
+
+# Morton keys are built at this zoom: 2 * 24 bits fit in an int64 and a
+# cell is ~2 m across
+POINT_ZOOM = 24
+# Tiles at or below this zoom are aggregated
+AGGREGATE_ZOOM = 10
+# 64 x 64 aggregate cells per tile
+CELL_BITS = 6
+# A raw tile holding more points than this is aggregated as well
+MAX_TILE_POINTS = 4096
+MAX_LATITUDE = 85.0511287798
+
+
+def mercator(lon, lat):
+    # Web-mercator position in [0, 1) x [0, 1), y growing southwards
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) / (2 * np.pi)
+    return x, y
+
+
+def _spread_bits(value):
+    # 0b...dcba -> 0b...0d0c0b0a for up to 32-bit integers
+    value = value.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                        (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        value = (value | (value << np.uint64(shift))) & np.uint64(mask)
+    return value
+
+
+def morton(x, y):
+    # Interleaved tile coordinates; at any zoom, the keys of one tile's
+    # descendants form the range [key << 2d, (key + 1) << 2d)
+    return (_spread_bits(np.asarray(x)) | (_spread_bits(np.asarray(y)) << np.uint64(1))).astype(np.int64)
+
+
+def _widen(values):
+    # Aggregates are sums over up to millions of points: int8 / int16
+    # counts (schema.py) are summed as int64, floats as float64
+    values = np.asarray(values)
+    return values.astype(np.int64 if values.dtype.kind in 'iub' else np.float64)
+
+
+def point_keys(lon, lat, zoom=POINT_ZOOM):
+    x, y = mercator(lon, lat)
+    scale = 1 << zoom
+    tx = np.clip((x * scale).astype(np.int64), 0, scale - 1)
+    ty = np.clip((y * scale).astype(np.int64), 0, scale - 1)
+    return morton(tx, ty)
+
+
+class TileIndex:
+
+    def __init__(self, lon, lat, measures, properties=None):
+        # measures: {name: numeric array} summed in aggregates (사상자수, ...)
+        # properties: {name: array} shown on raw points only (tooltip fields)
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        rows = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        keys = point_keys(lon[rows], lat[rows])
+        sort = np.argsort(keys, kind='stable')
+        order = rows[sort]
+        self._arrange(order, keys[sort], lon[order], lat[order],
+                      {name: _widen(np.asarray(values)[order]) for name, values in measures.items()},
+                      {name: np.asarray(values)[order] for name, values in (properties or {}).items()})
+
+    def _arrange(self, rows, keys, lon, lat, measures, properties):
+        # rows: position of every (sorted) point in the input, for subset()
+        self.rows = rows
+        self.keys = keys
+        self.lon = lon
+        self.lat = lat
+        self.measures = measures
+        self.properties = properties
+        # Aggregate cells per tile zoom, built up front
+        self.levels = {zoom: self._aggregate(slice(None), zoom + CELL_BITS) for zoom in range(AGGREGATE_ZOOM + 1)}
+
+    def subset(self, mask):
+        # Index over the input rows where mask is True (a bitmap_index mask);
+        # the points are already sorted, only the aggregate levels are rebuilt
+        selected = np.asarray(mask, dtype=bool)[self.rows]
+        index = TileIndex.__new__(TileIndex)
+        index._arrange(self.rows[selected], self.keys[selected], self.lon[selected], self.lat[selected],
+                       {name: values[selected] for name, values in self.measures.items()},
+                       {name: values[selected] for name, values in self.properties.items()})
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def center(self):
+        return (float(self.lon.mean()), float(self.lat.mean())) if len(self) else (127.8, 36.3)
+
+    def _aggregate(self, rows, resolution):
+        # Cells of the given zoom resolution over the (sorted) rows; returns
+        # cell keys plus per-cell count, mean position and measure sums
+        shift = 2 * (POINT_ZOOM - min(resolution, POINT_ZOOM))
+        keys = self.keys[rows] >> shift
+        if not len(keys):
+            return {'keys': keys, 'count': np.empty(0, dtype=np.int64), 'lon': np.empty(0), 'lat': np.empty(0),
+                    'measures': {name: np.empty(0) for name in self.measures}}
+        starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+        count = np.diff(np.append(starts, len(keys)))
+        return {
+            'keys': keys[starts],
+            'count': count,
+            'lon': np.add.reduceat(self.lon[rows], starts) / count,
+            'lat': np.add.reduceat(self.lat[rows], starts) / count,
+            'measures': {name: np.add.reduceat(values[rows], starts) for name, values in self.measures.items()},
+        }
+
+    def _key_range(self, z, x, y, resolution):
+        shift = 2 * (resolution - z)
+        tile_key = int(morton(np.array([x]), np.array([y]))[0])
+        return tile_key << shift, (tile_key + 1) << shift
+
+    def tile(self, z, x, y):
+        # GeoJSON FeatureCollection for tile z/x/y
+        if z <= AGGREGATE_ZOOM:
+            cells = self.levels[z]
+            low, high = self._key_range(z, x, y, z + CELL_BITS)
+            start, end = np.searchsorted(cells['keys'], [low, high])
+            return _aggregate_features(cells, slice(start, end))
+
+        low, high = self._key_range(z, x, y, POINT_ZOOM)
+        start, end = (int(position) for position in np.searchsorted(self.keys, [low, high]))
+        if end - start > MAX_TILE_POINTS:
+            cells = self._aggregate(slice(start, end), z + CELL_BITS)
+            return _aggregate_features(cells, slice(None))
+        return self._point_features(slice(start, end))
+
+    def _point_features(self, rows):
+        # Same properties as an aggregate cell of one accident, plus the raw fields
+        columns = {name: values[rows].tolist() for name, values in {**self.measures, **self.properties}.items()}
+        lon, lat = self.lon[rows].tolist(), self.lat[rows].tolist()
+        features = [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon[i], lat[i]]},
+             'properties': dict({name: values[i] for name, values in columns.items()}, 사고건수=1)}
+            for i in range(len(lon))
+        ]
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+def _aggregate_features(cells, rows):
+    count = cells['count'][rows].tolist()
+    lon, lat = cells['lon'][rows].tolist(), cells['lat'][rows].tolist()
+    measures = {name: values[rows].tolist() for name, values in cells['measures'].items()}
+    features = [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon[i], lat[i]]},
+         'properties': dict({name: values[i] for name, values in measures.items()}, 사고건수=count[i])}
+        for i in range(len(count))
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def tile_for(lon, lat, zoom):
+    # XYZ tile containing a lon/lat, handy for checks
+    x, y = mercator(lon, lat)
+    scale = 1 << zoom
+    return zoom, min(int(x * scale), scale - 1), min(int(y * scale), scale - 1)
+
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 발생년월일시 시간 키 인덱스
+#
+# '발생년월일시' is encoded once into an integer hour-of-epoch per row.  Every
+# calendar field is arithmetic on that key (hour = h % 24, weekday =
+# (h // 24 + 3) % 7 since 1970-01-01 was a Thursday, months via
+# datetime64[M]) instead of a .dt accessor per field.
+#
+# TimeIndex additionally sums each measure into one dense hourly series over
+# the span of the data (a single bincount over the rows).  Coarser series --
+# daily, weekly, monthly, yearly -- are reduceat calls over that series, and
+# cyclic profiles and weekday x hour heatmaps are bincounts over it, so a
+# query touches ~10^4 hourly bins however many rows there are.  Queries
+# restricted to a row mask rescan only the masked rows' keys.
+
+import numpy as np
+
+# Calendar fields row_keys() derives, with the cube's label conventions
+# (weekday 0 = Monday, month 1-12)
+FIELDS = ('year', 'month', 'weekday', 'hour')
+# Series granularities, finest first
+GRANULARITIES = ('hour', 'day', 'week', 'month', 'year')
+# Cyclic fields and their number of values
+CYCLES = {'hour': 24, 'weekday': 7, 'month': 12}
+
+_NAT = np.iinfo(np.int64).min
+
+
+def hour_keys(datetimes):
+    # int64 hours since 1970-01-01 00:00; NaT stays np.iinfo(np.int64).min
+    values = np.asarray(datetimes, dtype='datetime64[ns]')
+    return values.astype('datetime64[h]').astype(np.int64)
+
+
+def _fields(hours):
+    # Calendar fields of hour-of-epoch keys
+    days = hours // 24
+    months = hours.astype('datetime64[h]').astype('datetime64[M]').astype(np.int64)
+    return {
+        'year': months // 12 + 1970,
+        'month': months % 12 + 1,
+        'weekday': (days + 3) % 7,
+        'hour': hours % 24,
+        'day': days,
+        # Weeks start on Monday; 1969-12-29 is day -3
+        'week': (days + 3) // 7,
+        'month_index': months,
+    }
+
+
+def row_keys(datetimes):
+    # {field: int64 per row} for FIELDS, from a single hour-of-epoch encoding
+    hours = hour_keys(datetimes)
+    if (hours == _NAT).any():
+        raise ValueError('missing 발생년월일시 values')
+    fields = _fields(hours)
+    return {field: fields[field] for field in FIELDS}
+
+
+class TimeIndex:
+
+    def __init__(self, datetimes, measures=None):
+        # measures: {name: numeric array per row}; queries with measure=None
+        # count rows instead
+        hours = hour_keys(datetimes)
+        valid = hours != _NAT
+        self.start = int(hours[valid].min()) if valid.any() else 0
+        self.span = int(hours[valid].max()) - self.start + 1 if valid.any() else 0
+        # Row -> hourly bin, -1 for missing datetimes
+        self.bins = np.where(valid, hours - self.start, -1).astype(np.int32)
+        self.measures = {name: np.asarray(values, dtype=np.float64) for name, values in (measures or {}).items()}
+
+        self.hourly = {None: self._bincount(None, valid)}
+        for name in self.measures:
+            self.hourly[name] = self._bincount(name, valid)
+
+        # Calendar fields of every hourly bin, and where each coarser period
+        # starts in the hourly series
+        self.fields = _fields(self.start + np.arange(self.span, dtype=np.int64))
+        self.starts = {'hour': np.arange(self.span)}
+        for granularity, field in (('day', 'day'), ('week', 'week'), ('month', 'month_index'), ('year', 'year')):
+            keys = self.fields[field]
+            self.starts[granularity] = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1)) if self.span else keys
+
+    def __len__(self):
+        return len(self.bins)
+
+    def _bincount(self, measure, rows):
+        bins = self.bins[rows]
+        weights = None if measure is None else self.measures[measure][rows]
+        return np.bincount(bins, weights=weights, minlength=self.span).astype(np.float64)
+
+    def _hourly(self, measure, mask):
+        if mask is None:
+            return self.hourly[measure]
+        return self._bincount(measure, np.asarray(mask, dtype=bool) & (self.bins >= 0))
+
+    def series(self, measure=None, granularity='day', mask=None):
+        # (first hour of each period within the span as datetime64[h],
+        # summed values) for every period, empty ones included
+        if granularity not in GRANULARITIES:
+            raise ValueError(f'unknown granularity: {granularity!r} (known: {GRANULARITIES})')
+        hourly = self._hourly(measure, mask)
+        starts = self.starts[granularity]
+        values = np.add.reduceat(hourly, starts) if len(starts) else hourly[:0]
+        labels = (self.start + starts).astype('datetime64[h]')
+        return labels, values
+
+    def profile(self, measure=None, cycle='hour', mask=None):
+        # Sums per hour of day / weekday / month, over the whole span
+        keys = self.fields[cycle] - (1 if cycle == 'month' else 0)
+        return np.bincount(keys, weights=self._hourly(measure, mask), minlength=CYCLES[cycle])
+
+    def heatmap(self, measure=None, rows='weekday', columns='hour', mask=None):
+        # (CYCLES[rows] x CYCLES[columns]) sums, e.g. weekday x hour
+        row_keys = self.fields[rows] - (1 if rows == 'month' else 0)
+        column_keys = self.fields[columns] - (1 if columns == 'month' else 0)
+        size = CYCLES[rows] * CYCLES[columns]
+        counts = np.bincount(row_keys * CYCLES[columns] + column_keys, weights=self._hourly(measure, mask),
+                             minlength=size)
+        return counts.reshape(CYCLES[rows], CYCLES[columns])
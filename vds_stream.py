@@ -0,0 +1,532 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 실시간 VDS 수집
+#
+# Consumes a line-delimited feed of VDS detector readings
+#
+#   VDS_CD,epoch seconds,TRFFCVLM,SPD_AVG,OCCPNCY
+#
+# from a file (followed like tail -f) or a TCP socket, and keeps rolling
+# per-segment window aggregates.  Each segment owns a ring of
+# WINDOW_SECONDS / BUCKET_SECONDS bucket slots (readings, volume, speed and
+# occupancy sums); a slot is reset when a newer bucket lands on it, so memory
+# is fixed at segments x buckets however long the feed runs.  Readings are
+# applied in batches with one bincount per field, and a network-wide series
+# per bucket is kept for the last HISTORY_BUCKETS buckets.
+#
+# Readers pull deltas: changes(since) returns only the segments updated
+# after a sequence number (map_routes.LiveRoutes serves it as JSON, the live
+# map recolours just those paths) and series(after) only the buckets after
+# the one the client has (the dashboard appends them with extendData).
+#
+# Under gunicorn the feed is ingested once: the master starts an ingest
+# process (start_shared_feed) that keeps the windows in .npy files under a
+# directory, and every worker maps them read-only (attach_feed), so all of
+# them serve the same sequence numbers.  A generation counter in the header
+# is odd while an update is being applied; readers retry until they saw the
+# same even value before and after.  The dev server, or a worker that finds
+# no running ingest process, runs the feed in a thread of its own.
+#
+#   ANALYSIS_VDS_FEED=feed.txt | host:port       # what the dashboard reads
+#   python vds_stream.py serve --port 9100 --rate 5000   # socket stand-in
+#   python vds_stream.py write feed.txt --messages 100000
+#   python vds_stream.py bench --messages 1000000
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
+
+FEED_SOURCE = os.environ.get('ANALYSIS_VDS_FEED')
+
+FIELDS = ('TRFFCVLM', 'SPD_AVG', 'OCCPNCY')
+WINDOW_SECONDS = 3600
+BUCKET_SECONDS = 300
+# Network-wide series kept for the live chart (one day of buckets)
+HISTORY_BUCKETS = 288
+
+READ_SIZE = 1 << 16
+# A partial batch is applied after this long without a full read
+FLUSH_SECONDS = 0.2
+# Following a file: wait this long at EOF before reading again
+POLL_SECONDS = 0.5
+
+# Header slots of the shared state
+_GENERATION, _LATEST, _SEQ, _MESSAGES, _DROPPED, _MALFORMED = range(6)
+# The ingest process started by this (master) process, if any
+_ingest = None
+
+
+def parse_lines(lines, positions):
+    # (rows, timestamps, (n, 3) values) of the well-formed lines; rows are -1
+    # for codes not in `positions` ({VDS_CD bytes: row}).  Also returns the
+    # number of malformed lines.
+    rows, stamps, values = [], [], []
+    malformed = 0
+    get = positions.get
+    for line in lines:
+        parts = line.split(b',')
+        if len(parts) != 5:
+            malformed += len(line.strip()) > 0
+            continue
+        try:
+            stamp, volume, speed, occupancy = int(parts[1]), float(parts[2]), float(parts[3]), float(parts[4])
+        except ValueError:
+            malformed += 1
+            continue
+        rows.append(get(parts[0], -1))
+        stamps.append(stamp)
+        values.append((volume, speed, occupancy))
+    return (np.array(rows, dtype=np.int64), np.array(stamps, dtype=np.int64),
+            np.array(values, dtype=np.float64).reshape(-1, 3), malformed)
+
+
+class _Header:
+    # An int slot of RollingWindows.header
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, windows, owner=None):
+        return self if windows is None else int(windows.header[self.slot])
+
+    def __set__(self, windows, value):
+        windows.header[self.slot] = value
+
+
+def _state_array(directory, mode, name, shape, dtype, fill):
+    if directory is None:
+        return np.full(shape, fill, dtype=dtype)
+    path = os.path.join(directory, f'{name}.npy')
+    if mode != 'w+':
+        return np.load(path, mmap_mode=mode)
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    array[...] = fill
+    return array
+
+
+class RollingWindows:
+
+    latest = _Header(_LATEST)
+    seq = _Header(_SEQ)
+    messages = _Header(_MESSAGES)
+    dropped = _Header(_DROPPED)
+    malformed = _Header(_MALFORMED)
+
+    def __init__(self, codes, window_seconds=WINDOW_SECONDS, bucket_seconds=BUCKET_SECONDS,
+                 history_buckets=HISTORY_BUCKETS, directory=None, mode='w+'):
+        # In memory, or as .npy files under `directory`: created there with
+        # mode 'w+', mapped with 'r+' (the ingest process) or 'r' (workers)
+        self.codes = list(codes)
+        self.positions = {str(code).encode('utf-8'): row for row, code in enumerate(self.codes)}
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(window_seconds // bucket_seconds, 1)
+        self.directory = directory
+        create = directory is None or mode == 'w+'
+        if directory is not None and create:
+            with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as file:
+                json.dump({'codes': self.codes, 'window_seconds': window_seconds, 'bucket_seconds': bucket_seconds,
+                           'history_buckets': history_buckets}, file, ensure_ascii=False)
+        array = partial(_state_array, directory, mode)
+        shape = (len(self.codes), self.buckets)
+        self.header = array('header', (6,), np.int64, 0)
+        # Bucket number each slot currently holds (-1: empty)
+        self.epoch = array('epoch', shape, np.int64, -1)
+        self.readings = array('readings', shape, np.float64, 0)
+        self.sums = array('sums', (len(FIELDS),) + shape, np.float64, 0)
+        # Network-wide totals per bucket, ring of history_buckets
+        self.history_epoch = array('history_epoch', (history_buckets,), np.int64, -1)
+        self.history_readings = array('history_readings', (history_buckets,), np.float64, 0)
+        self.history_sums = array('history_sums', (len(FIELDS), history_buckets), np.float64, 0)
+        self.changed = array('changed', (len(self.codes),), np.int64, 0)
+        if create:
+            self.latest = -1
+        self.lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, directory, writable=False):
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        return cls(meta['codes'], meta['window_seconds'], meta['bucket_seconds'], meta['history_buckets'],
+                   directory=directory, mode='r+' if writable else 'r')
+
+    @contextmanager
+    def _writing(self):
+        with self.lock:
+            self.header[_GENERATION] += 1
+            try:
+                yield
+            finally:
+                self.header[_GENERATION] += 1
+
+    def _read(self, read):
+        # read() on a consistent state: retried while an update is being
+        # applied or landed during the read
+        while True:
+            generation = int(self.header[_GENERATION])
+            if not generation % 2:
+                result = read()
+                if int(self.header[_GENERATION]) == generation:
+                    return result
+            time.sleep(0)
+
+    def _reset(self, epoch, readings, sums, index, buckets):
+        stale = epoch[index] != buckets
+        if stale.any():
+            stale_index = tuple(axis[stale] for axis in index)
+            epoch[stale_index] = buckets[stale]
+            readings[stale_index] = 0
+            sums[(slice(None),) + stale_index] = 0
+
+    def update(self, rows, stamps, values):
+        # Fold a batch of readings in; unknown segments and readings older
+        # than the window are dropped
+        buckets = stamps // self.bucket_seconds
+        with self._writing():
+            self.messages += len(rows)
+            latest = max(self.latest, int(buckets.max())) if len(buckets) else self.latest
+            keep = (rows >= 0) & (buckets > latest - self.buckets)
+            self.dropped += int(len(rows) - keep.sum())
+            rows, buckets, values = rows[keep], buckets[keep], values[keep]
+            self.seq += 1
+            if latest != self.latest:
+                # The window moved: every segment's aggregate may have changed
+                self.latest = latest
+                self.changed[:] = self.seq
+            if not len(rows):
+                return
+
+            slots = buckets % self.buckets
+            self._reset(self.epoch, self.readings, self.sums, (rows, slots), buckets)
+            size = self.epoch.size
+            flat = rows * self.buckets + slots
+            self.readings += np.bincount(flat, minlength=size).reshape(self.epoch.shape)
+            for field in range(len(FIELDS)):
+                self.sums[field] += np.bincount(flat, weights=values[:, field], minlength=size).reshape(self.epoch.shape)
+            self.changed[np.unique(rows)] = self.seq
+
+            recent = buckets > latest - len(self.history_epoch)
+            buckets, values = buckets[recent], values[recent]
+            history = buckets % len(self.history_epoch)
+            self._reset(self.history_epoch, self.history_readings, self.history_sums, (history,), buckets)
+            self.history_readings += np.bincount(history, minlength=len(self.history_epoch))
+            for field in range(len(FIELDS)):
+                self.history_sums[field] += np.bincount(history, weights=values[:, field],
+                                                        minlength=len(self.history_epoch))
+
+    def aggregates(self, rows=None):
+        # {field: per-segment value over the window}: TRFFCVLM summed,
+        # SPD_AVG and OCCPNCY averaged over readings (NaN without any)
+        rows = np.arange(len(self.codes)) if rows is None else rows
+        live = self.epoch[rows] > self.latest - self.buckets
+        readings = (self.readings[rows] * live).sum(axis=1)
+        sums = (self.sums[:, rows] * live).sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {'readings': readings, 'TRFFCVLM': sums[0], 'SPD_AVG': sums[1] / readings,
+                    'OCCPNCY': sums[2] / readings}
+
+    def changes(self, since=0):
+        # JSON-ready delta: the segments updated after sequence `since`
+        def read():
+            rows = np.flatnonzero(self.changed > since)
+            return rows, self.aggregates(rows), self.seq, self.latest
+
+        rows, aggregates, seq, latest = self._read(read)
+        payload = {'seq': seq, 'window_end': (latest + 1) * self.bucket_seconds if latest >= 0 else None,
+                   'rows': rows.tolist()}
+        for name, values in aggregates.items():
+            payload[name] = [None if np.isnan(value) else round(value, 3) for value in values.tolist()]
+        return payload
+
+    def series(self, after=-1):
+        # Network-wide buckets newer than bucket `after`, oldest first:
+        # (bucket numbers, readings, {field: total or mean})
+        def read():
+            latest = self.latest
+            held = np.flatnonzero((self.history_epoch > after)
+                                  & (self.history_epoch > latest - len(self.history_epoch)))
+            held = held[np.argsort(self.history_epoch[held])]
+            # The newest bucket is still filling up
+            held = held[self.history_epoch[held] < latest]
+            return self.history_epoch[held], self.history_readings[held], self.history_sums[:, held]
+
+        epochs, readings, sums = self._read(read)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return epochs, readings, {'TRFFCVLM': sums[0], 'SPD_AVG': sums[1] / readings,
+                                      'OCCPNCY': sums[2] / readings}
+
+    def stats(self):
+        return {'messages': self.messages, 'dropped': self.dropped, 'malformed': self.malformed,
+                'seq': self.seq, 'segments': len(self.codes), 'buckets': self.buckets}
+
+
+async def _file_chunks(path, follow):
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(READ_SIZE)
+            if chunk:
+                yield chunk
+            elif follow:
+                # Lets run() flush what is pending before waiting
+                yield b''
+                await asyncio.sleep(POLL_SECONDS)
+            else:
+                return
+
+
+async def _socket_chunks(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            chunk = await reader.read(READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        writer.close()
+
+
+def open_source(source, follow=True):
+    # host:port is a socket, anything else a file path
+    host, _, port = source.rpartition(':')
+    if host and port.isdigit() and not os.path.exists(source):
+        return _socket_chunks(host, int(port))
+    return _file_chunks(source, follow)
+
+
+class LiveFeed:
+
+    def __init__(self, windows, source, follow=True):
+        self.windows = windows
+        self.source = source
+        self.follow = follow
+        self.error = None
+        self.thread = None
+
+    def _apply(self, lines):
+        rows, stamps, values, malformed = parse_lines(lines, self.windows.positions)
+        self.windows.malformed += malformed
+        self.windows.update(rows, stamps, values)
+
+    async def run(self):
+        # Reads chunk-wise; complete lines are applied once READ_SIZE worth
+        # has arrived or FLUSH_SECONDS passed, so the per-message cost is the
+        # line parse plus a share of one vectorized update
+        pending = []
+        rest = b''
+        flushed = time.monotonic()
+        async for chunk in open_source(self.source, self.follow):
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop()
+            pending.extend(lines)
+            if len(pending) >= 4096 or (pending and time.monotonic() - flushed > FLUSH_SECONDS):
+                self._apply(pending)
+                pending = []
+                flushed = time.monotonic()
+        self._apply(pending + ([rest] if rest else []))
+
+    def _run_forever(self):
+        try:
+            asyncio.run(self.run())
+        except Exception as error:  # noqa: BLE001 -- reported through changes()
+            self.error = repr(error)
+            if self.windows.directory is not None:
+                with open(os.path.join(self.windows.directory, 'error.txt'), 'w', encoding='utf-8') as file:
+                    file.write(self.error)
+
+    def start(self):
+        # Runs the event loop in a daemon thread of the calling process (the
+        # ingest process, or a worker without one; threads do not survive the
+        # fork from the master)
+        self.thread = threading.Thread(target=self._run_forever, name=f'vds-feed {self.source}', daemon=True)
+        self.thread.start()
+        return self
+
+    def _error(self):
+        # Attached feeds learn of the ingest process' failure from its file
+        if self.error is None and self.windows.directory is not None:
+            try:
+                with open(os.path.join(self.windows.directory, 'error.txt'), 'r', encoding='utf-8') as file:
+                    return file.read()
+            except OSError:
+                pass
+        return self.error
+
+    def changes(self, since=0):
+        payload = self.windows.changes(since)
+        error = self._error()
+        if error:
+            payload['error'] = error
+        return payload
+
+    def series_points(self, after=-1):
+        # Completed buckets after bucket `after` as chart points (bucket start
+        # times in ISO format, mean speed, total volume) plus the last bucket
+        epochs, _, values = self.windows.series(after)
+        seconds = epochs * self.windows.bucket_seconds
+        return {
+            'x': [time.strftime('%Y-%m-%d %H:%M', time.localtime(second)) for second in seconds.tolist()],
+            'SPD_AVG': [None if np.isnan(value) else round(value, 2) for value in values['SPD_AVG'].tolist()],
+            'TRFFCVLM': values['TRFFCVLM'].tolist(),
+            'last': int(epochs[-1]) if len(epochs) else after,
+        }
+
+
+def start_feed(codes, source=FEED_SOURCE):
+    # The dashboard's feed over the given segment codes, or None when no
+    # source is configured
+    if not source:
+        return None
+    return LiveFeed(RollingWindows(codes), source).start()
+
+
+def start_shared_feed(codes, directory, source=FEED_SOURCE):
+    # Creates the windows under `directory` and starts the one process that
+    # ingests the feed into them (the gunicorn master, before it forks);
+    # None when no source is configured
+    global _ingest
+    if not source:
+        return None
+    stop_shared_feed()
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    RollingWindows(codes, directory=directory)
+    _ingest = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'ingest', directory,
+                                '--source', source, '--parent', str(os.getpid())])
+    with open(os.path.join(directory, 'pid'), 'w', encoding='utf-8') as file:
+        file.write(str(_ingest.pid))
+    return _ingest
+
+
+def stop_shared_feed():
+    global _ingest
+    if _ingest is not None and _ingest.poll() is None:
+        _ingest.terminate()
+        _ingest.wait()
+    _ingest = None
+
+
+def attach_feed(directory):
+    # Read-only view of the windows the ingest process fills, or None when
+    # it is not running
+    try:
+        with open(os.path.join(directory, 'pid'), 'r', encoding='utf-8') as file:
+            os.kill(int(file.read()), 0)
+        windows = RollingWindows.attach(directory)
+    except (OSError, ValueError):
+        return None
+    return LiveFeed(windows, source=None)
+
+
+def ingest(directory, source, parent):
+    # The ingest process: runs the feed into the shared windows until its
+    # parent (the gunicorn master) is gone.  It outlives a failed or finished
+    # feed so that workers keep serving the state and the error.
+    LiveFeed(RollingWindows.attach(directory, writable=True), source).start()
+    while os.getppid() == parent:
+        time.sleep(1)
+
+
+def synthetic_lines(codes, messages, start=None, rate=1000, seed=0):
+    # Feed lines for `messages` readings spread over the codes, timestamped
+    # as if arriving at `rate` per second
+    rng = np.random.default_rng(seed)
+    start = int(time.time()) if start is None else start
+    rows = rng.integers(0, len(codes), messages)
+    stamps = start + np.arange(messages) // max(rate, 1)
+    volume = rng.poisson(40, messages)
+    speed = np.clip(rng.normal(90, 15, messages), 0, 160).round(1)
+    occupancy = np.clip(rng.normal(2, 1, messages), 0, 100).round(2)
+    codes = np.asarray(codes, dtype=object)
+    return [f'{code},{stamp},{v},{s},{o}\n' for code, stamp, v, s, o in
+            zip(codes[rows].tolist(), stamps.tolist(), volume.tolist(), speed.tolist(), occupancy.tolist())]
+
+
+async def serve(codes, host, port, rate):
+    # Socket stand-in for the detector feed: every client receives `rate`
+    # readings per second, timestamped now
+    async def handle(reader, writer):
+        seed = 0
+        try:
+            while True:
+                lines = synthetic_lines(codes, rate, rate=rate, seed=seed)
+                writer.write(''.join(lines).encode('utf-8'))
+                await writer.drain()
+                seed += 1
+                await asyncio.sleep(1)
+        except (ConnectionError, asyncio.CancelledError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def _segment_codes():
+    from segment_store import load_store
+    return load_store().codes.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='실시간 VDS 수집')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='socket stand-in streaming synthetic readings')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=9100)
+    serve_parser.add_argument('--rate', type=int, default=5000, help='readings per second per client')
+    write_parser = subparsers.add_parser('write', help='write a synthetic feed file')
+    write_parser.add_argument('path')
+    write_parser.add_argument('--messages', type=int, default=100_000)
+    write_parser.add_argument('--rate', type=int, default=5000)
+    bench_parser = subparsers.add_parser('bench', help='ingest a synthetic feed file as fast as possible')
+    bench_parser.add_argument('--messages', type=int, default=1_000_000)
+    bench_parser.add_argument('--rate', type=int, default=5000)
+    # What start_shared_feed runs
+    ingest_parser = subparsers.add_parser('ingest')
+    ingest_parser.add_argument('directory')
+    ingest_parser.add_argument('--source', required=True)
+    ingest_parser.add_argument('--parent', type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        ingest(args.directory, args.source, args.parent)
+        return
+    codes = _segment_codes()
+    if args.command == 'serve':
+        print(f'serving {args.rate:,} readings/s on {args.host}:{args.port}')
+        asyncio.run(serve(codes, args.host, args.port, args.rate))
+        return
+    if args.command == 'write':
+        with open(args.path, 'w', encoding='utf-8') as file:
+            file.writelines(synthetic_lines(codes, args.messages, rate=args.rate))
+        return
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8') as file:
+        file.writelines(synthetic_lines(codes, args.messages, rate=args.rate))
+        file.flush()
+        feed = LiveFeed(RollingWindows(codes), file.name, follow=False)
+        start = time.perf_counter()
+        asyncio.run(feed.run())
+        seconds = time.perf_counter() - start
+    changes = feed.changes()
+    stats = feed.windows.stats()
+    print(f'messages      {stats["messages"]:>12,}  ({stats["dropped"]:,} dropped, {stats["malformed"]:,} malformed)')
+    print(f'ingested in   {seconds:>12.3f} s  ({stats["messages"] / seconds:,.0f} messages/s, one core)')
+    print(f'window state  {feed.windows.sums.nbytes + feed.windows.readings.nbytes + feed.windows.epoch.nbytes:>12,} bytes'
+          f'  ({stats["segments"]} segments x {stats["buckets"]} buckets)')
+    print(f'live segments {sum(value is not None for value in changes["SPD_AVG"]):>12,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# WKT LINESTRING 파서
+#
+# Reads a column of 'LINESTRING (x y, x y, ...)' text (the black-spot
+# 'geometry' column or the accident '사고발생 line' column) into one
+# contiguous float64 coordinate buffer plus an offsets array, GeoArrow
+# style: the points of line i are coords[offsets[i]:offsets[i + 1]].
+# No shapely object is created per row.
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+class LineStrings:
+
+    def __init__(self, coords, offsets):
+        self.coords = coords
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def take(self, indices):
+        indices = np.asarray(indices)
+        counts = self.counts[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # Index of every point of every selected line, in order
+        starts = np.repeat(self.offsets[:-1][indices] - offsets[:-1], counts)
+        return LineStrings(self.coords[starts + np.arange(offsets[-1])], offsets)
+
+    def paths(self):
+        # Per-row [[x, y], ...] lists for pydeck's get_path; the float
+        # conversion happens once for the whole buffer
+        flat = self.coords.tolist()
+        offsets = self.offsets.tolist()
+        return [flat[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def _segments(self):
+        # Segment ending at point k (k > 0 within its line); the first point of
+        # every line gets a zero-length segment so per-line sums stay aligned
+        coords = self.coords
+        start = np.empty_like(coords)
+        start[1:] = coords[:-1]
+        first = self.offsets[:-1][self.counts > 0]
+        start[first] = coords[first]
+        return start, coords
+
+    def _reduce(self, ufunc, values, empty):
+        counts = self.counts
+        result = np.full((len(self),) + values.shape[1:], empty, dtype=np.float64)
+        nonempty = counts > 0
+        if nonempty.any():
+            result[nonempty] = ufunc.reduceat(values, self.offsets[:-1][nonempty], axis=0)
+        return result
+
+    def lengths(self, geodesic=False):
+        start, end = self._segments()
+        if geodesic:
+            # Haversine distance in metres, for lon/lat coordinates
+            lon1, lat1 = np.radians(start[:, 0]), np.radians(start[:, 1])
+            lon2, lat2 = np.radians(end[:, 0]), np.radians(end[:, 1])
+            a = (np.sin((lat2 - lat1) / 2) ** 2
+                 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+            segment = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+        else:
+            segment = np.hypot(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+        return self._reduce(np.add, segment, 0.0)
+
+    def centroids(self):
+        # Length-weighted segment midpoints, the same definition shapely uses;
+        # zero-length lines fall back to the mean of their points
+        start, end = self._segments()
+        segment = np.hypot(end[:, 0] - start[:, 0], end[:, 1] - start[:, 1])
+        weighted = self._reduce(np.add, (start + end) / 2 * segment[:, None], 0.0)
+        total = self._reduce(np.add, segment, 0.0)
+        point_mean = self._reduce(np.add, self.coords, np.nan) / self.counts[:, None]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centroid = weighted / total[:, None]
+        return np.where((total > 0)[:, None], centroid, point_mean)
+
+    def bounds(self):
+        # (minx, miny, maxx, maxy) per line
+        mins = self._reduce(np.minimum, self.coords, np.nan)
+        maxs = self._reduce(np.maximum, self.coords, np.nan)
+        return np.hstack([mins, maxs])
+
+
+def concatenate(parts):
+    # One LineStrings holding the lines of every part, in order
+    parts = list(parts)
+    if not parts:
+        return LineStrings(np.empty((0, 2)), np.zeros(1, dtype=np.int64))
+    offsets = [parts[0].offsets]
+    for part in parts[1:]:
+        offsets.append(part.offsets[1:] + offsets[-1][-1])
+    return LineStrings(np.concatenate([part.coords for part in parts]), np.concatenate(offsets))
+
+
+# Everything that is not part of a number becomes whitespace for np.fromstring
+_SEPARATORS = bytes.maketrans(b'(),\n', b'    ')
+
+
+def _per_row(positions, row_ends):
+    # Number of positions falling inside each row of the joined buffer
+    return np.diff(np.searchsorted(positions, row_ends), prepend=0)
+
+
+def parse_linestrings(values):
+    # object: an empty list would otherwise make pandas guess float64 (and warn)
+    values = pd.Series(values, dtype=object, copy=False).astype(str).tolist()
+    if not values:
+        return LineStrings(np.empty((0, 2)), np.zeros(1, dtype=np.int64))
+    try:
+        joined = '\n'.join(value.strip() for value in values).encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError('LINESTRING text must be ASCII') from None
+    raw = np.frombuffer(joined, dtype=np.uint8)
+
+    # The whole column is scanned as one byte buffer instead of row by row
+    row_ends = np.append(np.flatnonzero(raw == ord('\n')), len(raw))
+    row_starts = np.minimum(np.concatenate([[0], row_ends[:-1] + 1]), max(len(raw) - 1, 0))
+    opened = _per_row(np.flatnonzero(raw == ord('(')), row_ends)
+    commas = _per_row(np.flatnonzero(raw == ord(',')), row_ends)
+    not_lines = raw[row_starts] != ord('L') if len(raw) else np.ones(len(values), dtype=bool)
+    if not_lines.any():
+        bad = values[int(np.argmax(not_lines))]
+        raise ValueError(f'not a LINESTRING: {bad[:80]!r}')
+    if joined.count(b'LINESTRING') != len(values) or (opened > 1).any():
+        raise ValueError('expected exactly one LINESTRING per row')
+
+    counts = np.where(opened == 1, commas + 1, 0)
+    numbers = joined.replace(b'LINESTRING', b' ').replace(b'EMPTY', b' ').translate(_SEPARATORS)
+    flat = np.fromstring(numbers, dtype=np.float64, sep=' ') if numbers.strip() else np.empty(0)
+    if flat.size != 2 * counts.sum():
+        # A short read means a malformed number or non-2D coordinates
+        raise ValueError('LINESTRING text is not a list of 2D coordinates')
+
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return LineStrings(flat.reshape(-1, 2), offsets)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# 연도별 black-spot 지도 파이프라인
+#
+# One pipeline for every black-spot year file instead of a copy per year:
+# load the year, parse its WKT, style the segments and render the map, each
+# year in its own process.  Results come back in the order of the years
+# given, so N years take about the wall time of the slowest one on a machine
+# with N cores.
+#
+#   render_years(years)   artifacts of each year, rendered now
+#   build_years(years)    the same through the build cache (build_cache.py):
+#                         built years are skipped, the files are returned
+#
+#   python year_maps.py [--years 2021 2022] [--output binary|pydeck] [--workers 4]
+#
+# 'binary' maps are the dashboard's (page + typed-array buffer + tooltip
+# table, stored under the names app.py serves them by); 'pydeck' maps are
+# the notebook's self-contained to_html pages.  app.py renders and keys its
+# black-spot-<year> maps with render_year and map_key, so a map built here
+# is the one the dashboard serves, and the other way round.
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import build_cache
+
+OUTPUTS = ('binary', 'pydeck')
+# Build cache name of each year's map, per output
+MAP_NAMES = {
+    'binary': 'black-spot-{year}',
+    'pydeck': 'korea_path{year}_layer',
+}
+
+
+def map_name(year, output='binary'):
+    return MAP_NAMES[output].format(year=year)
+
+
+def map_key(year, output='binary'):
+    # Build key of a year's map: render_year reads that year's file only
+    from datasets import BLACK_SPOT_CSV
+
+    return build_cache.map_key((BLACK_SPOT_CSV.format(year=year),), output)
+
+
+def render_year(year, output='binary'):
+    # One year's artifacts: {'html', 'bin', 'json'} or the page HTML
+    from maps import render_black_spot, render_black_spot_binary
+
+    if output == 'binary':
+        return render_black_spot_binary(year, map_name(year, output))
+    return render_black_spot(year)
+
+
+def build_year(year, output='binary', directory=None):
+    # {extension: path} of the year's map in the build cache, rendered only
+    # when its key is not built yet
+    from map_routes import StoredMapEntry
+
+    entries = StoredMapEntry.load_or_render(directory or build_cache.BUILD_DIR, map_name(year, output),
+                                            map_key(year, output),
+                                            partial(render_year, year, output))
+    return {extension: entry.paths[None] for extension, entry in entries.items()}
+
+
+def _run(task, years, workers):
+    # task over years, in a process pool when there is more than one of each
+    workers = min(workers or os.cpu_count() or 1, len(years))
+    if workers <= 1:
+        return [task(year) for year in years]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(task, years))
+
+
+def render_years(years, output='binary', workers=None):
+    return _run(partial(render_year, output=output), list(years), workers)
+
+
+def build_years(years, output='binary', directory=None, workers=None):
+    return _run(partial(build_year, output=output, directory=directory), list(years), workers)
+
+
+def main():
+    from datasets import black_spot_years
+
+    parser = argparse.ArgumentParser(description='연도별 black-spot 지도 파이프라인')
+    parser.add_argument('--years', type=int, nargs='+', help='default: every black-spot file in the data directory')
+    parser.add_argument('--output', choices=OUTPUTS, default='binary')
+    parser.add_argument('--workers', type=int, help='processes (default: one per core)')
+    parser.add_argument('--dir', default=build_cache.BUILD_DIR, help='build cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='render every year, store nothing')
+    args = parser.parse_args()
+
+    years = args.years or black_spot_years()
+    start = time.perf_counter()
+    if args.no_cache or not args.dir:
+        results = render_years(years, args.output, args.workers)
+        for year, artifacts in zip(years, results):
+            files = artifacts if isinstance(artifacts, dict) else {'html': artifacts}
+            sizes = {extension: len(content) for extension, content in files.items()}
+            print(f'{year}  {sizes}')
+    else:
+        for year, paths in zip(years, build_years(years, args.output, args.dir, args.workers)):
+            print(f'{year}  {paths["html"]}')
+    print(f'{len(years)} years in {time.perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()